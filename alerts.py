@@ -0,0 +1,283 @@
+"""Price alerts.
+
+Rule kinds (value in brackets):
+
+    above / below        the price crosses a level           [price]
+    move_up / move_down  the move since the previous close   [percent, positive]
+                         rises past +value% / falls past -value%
+    ma_above / ma_below  the price crosses its moving average [days]
+
+Rules are indexed by symbol. Levels and move thresholds sit in sorted lists,
+so a quote is checked with binary searches for the range the price (or
+move) went through since that symbol's last quote: O(log n + fired) however
+many rules the symbol has. MA rules are grouped by window, one comparison per
+distinct window. A rule fires when its condition becomes true, not for as
+long as it stays true, and at most once per cooldown.
+
+Rules are kept in data/alerts.json with the next rule id, so ids are never
+reused after a delete; fired alerts are appended to data/alerts.jsonl, from
+which the cooldowns are restored after a restart.
+
+The engine is shared by every session of the app while only the session
+whose rerun evaluated a quote sees evaluate()'s result. Fired alerts are
+therefore numbered, and each session asks since(seen) for the ones it has
+not shown yet.
+"""
+import json
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+from datetime import datetime
+
+_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+ALERTS_PATH = os.environ.get("PORTFOLIO_ALERTS", os.path.join(_DATA_DIR, "alerts.json"))
+DEFAULT_COOLDOWN = 3600.0
+
+KINDS = ("above", "below", "move_up", "move_down", "ma_above", "ma_below")
+_LEVEL_KINDS = ("above", "below", "move_up", "move_down")
+
+
+def describe(rule):
+    kind, value = rule["kind"], rule["value"]
+    if kind in ("above", "below"):
+        return f"{rule['symbol']} {kind} {value:g}"
+    if kind in ("move_up", "move_down"):
+        return f"{rule['symbol']} {'up' if kind == 'move_up' else 'down'} {value:g}% on the day"
+    return f"{rule['symbol']} crosses {'above' if kind == 'ma_above' else 'below'} its {int(value)}-day average"
+
+
+class _SymbolRules:
+    """One symbol's rules in sorted (threshold, rule id) lists plus its last quote"""
+
+    __slots__ = ("levels", "ma", "price", "prev_close", "move", "ma_side")
+
+    def __init__(self):
+        self.levels = {kind: [] for kind in _LEVEL_KINDS}
+        self.ma = {}              # window -> {"ma_above": {ids}, "ma_below": {ids}}
+        self.price = None
+        self.prev_close = None
+        self.move = None
+        self.ma_side = {}         # window -> price was above the average
+
+    def add(self, rule):
+        kind = rule["kind"]
+        if kind in self.levels:
+            # Falls are stored negated so every list is checked the same way
+            value = -rule["value"] if kind == "move_down" else rule["value"]
+            insort(self.levels[kind], (value, rule["id"]))
+        else:
+            self.ma.setdefault(int(rule["value"]), {"ma_above": set(), "ma_below": set()})[kind].add(rule["id"])
+
+    def remove(self, rule):
+        kind = rule["kind"]
+        if kind in self.levels:
+            value = -rule["value"] if kind == "move_down" else rule["value"]
+            entries = self.levels[kind]
+            i = bisect_left(entries, (value, rule["id"]))
+            if i < len(entries) and entries[i] == (value, rule["id"]):
+                del entries[i]
+        else:
+            groups = self.ma.get(int(rule["value"]))
+            if groups:
+                groups[kind].discard(rule["id"])
+                if not groups["ma_above"] and not groups["ma_below"]:
+                    del self.ma[int(rule["value"])]
+                    self.ma_side.pop(int(rule["value"]), None)
+
+    def empty(self):
+        return not self.ma and not any(self.levels.values())
+
+    @staticmethod
+    def _rising(entries, old, new):
+        """Ids with a threshold in (old, new]; all <= new when old is unknown"""
+        if old is not None and new <= old:
+            return []
+        lo = 0 if old is None else bisect_right(entries, (old, float("inf")))
+        return [rule_id for _, rule_id in entries[lo:bisect_right(entries, (new, float("inf")))]]
+
+    @staticmethod
+    def _falling(entries, old, new):
+        """Ids with a threshold in [new, old); all >= new when old is unknown"""
+        if old is not None and new >= old:
+            return []
+        hi = len(entries) if old is None else bisect_left(entries, (old, float("-inf")))
+        return [rule_id for _, rule_id in entries[bisect_left(entries, (new, float("-inf"))):hi]]
+
+    def crossed(self, price, prev_close=None, averages=None):
+        """Rule ids whose condition became true with this quote"""
+        fired = self._rising(self.levels["above"], self.price, price)
+        fired += self._falling(self.levels["below"], self.price, price)
+        self.price = price
+        if prev_close:
+            if prev_close != self.prev_close:
+                self.prev_close, self.move = prev_close, None   # a new session
+            move = (price / prev_close - 1) * 100
+            fired += self._rising(self.levels["move_up"], self.move, move)
+            fired += self._falling(self.levels["move_down"], self.move, move)
+            self.move = move
+        for window, groups in self.ma.items():
+            average = (averages or {}).get(window)
+            if average is None:
+                continue
+            above = price > average
+            if self.ma_side.get(window) != above:
+                fired += groups["ma_above" if above else "ma_below"]
+                self.ma_side[window] = above
+        return fired
+
+
+class AlertEngine:
+    """Rules indexed by symbol, evaluated against batches of quotes"""
+
+    def __init__(self, path=ALERTS_PATH, cooldown=DEFAULT_COOLDOWN):
+        self.path = path
+        self.log_path = os.path.splitext(path)[0] + ".jsonl"
+        self.cooldown = cooldown
+        self._lock = threading.RLock()
+        self._rules = {}
+        self._index = {}
+        self._last_fired = {}
+        self._recent = deque(maxlen=200)
+        self._fired = 0       # alerts fired by this process, numbering since()
+        self._next_id = 1
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            data = {}
+        rules = data.get("rules", [])
+        for rule in rules:
+            self._insert(rule)
+        try:
+            with open(self.log_path, encoding="utf-8") as f:
+                fired = [json.loads(line) for line in deque(f, maxlen=10000)]
+        except FileNotFoundError:
+            fired = []
+        for alert in fired:
+            self._last_fired[alert["rule"]] = alert["ts"]
+        self._recent.extend(fired)
+        # Files written before next_id was kept: skip every id seen in the log too
+        self._next_id = max(
+            [data.get("next_id", 1)] + [r["id"] + 1 for r in rules] + [a["rule"] + 1 for a in fired]
+        )
+        # Rules deleted in a run that did not save next_id left their cooldowns behind
+        self._last_fired = {i: ts for i, ts in self._last_fired.items() if i in self._rules}
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"next_id": self._next_id, "rules": list(self._rules.values())}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
+
+    def _insert(self, rule):
+        self._rules[rule["id"]] = rule
+        self._index.setdefault(rule["symbol"], _SymbolRules()).add(rule)
+
+    def add_rule(self, symbol, kind, value, note=""):
+        if kind not in KINDS:
+            raise ValueError(f"unknown alert kind {kind!r}")
+        value = float(value)
+        if value <= 0 or (kind.startswith("ma_") and value < 2):
+            raise ValueError("alert value must be positive (at least 2 days for averages)")
+        with self._lock:
+            rule = {"id": self._next_id, "symbol": symbol.upper(), "kind": kind, "value": value,
+                    "note": note, "created": datetime.now().isoformat(timespec="seconds")}
+            self._next_id += 1
+            self._insert(rule)
+            self._save()
+        return rule
+
+    def remove_rule(self, rule_id):
+        with self._lock:
+            rule = self._rules.pop(rule_id, None)
+            if rule is None:
+                return False
+            self._last_fired.pop(rule_id, None)
+            rules = self._index[rule["symbol"]]
+            rules.remove(rule)
+            if rules.empty():
+                del self._index[rule["symbol"]]
+            self._save()
+        return True
+
+    def rules(self, symbol=None):
+        with self._lock:
+            return [dict(r) for r in self._rules.values() if symbol is None or r["symbol"] == symbol]
+
+    def symbols(self):
+        with self._lock:
+            return list(self._index)
+
+    def ma_windows(self, symbol):
+        """Moving-average lengths the symbol's rules need in evaluate()"""
+        with self._lock:
+            rules = self._index.get(symbol)
+            return sorted(rules.ma) if rules else []
+
+    def evaluate(self, quotes, now=None):
+        """Check a batch of quotes and return the alerts that fired.
+
+        quotes maps symbol -> {"price": ..., "prev_close": ... (for moves),
+        "averages": {days: value} (for MA rules)}. Symbols without rules
+        cost one dict lookup.
+        """
+        now = time.time() if now is None else now
+        fired = []
+        with self._lock:
+            for symbol, quote in quotes.items():
+                rules = self._index.get(symbol)
+                price = quote.get("price")
+                if rules is None or price is None or price != price:
+                    continue
+                for rule_id in rules.crossed(price, quote.get("prev_close"), quote.get("averages")):
+                    if now - self._last_fired.get(rule_id, float("-inf")) < self.cooldown:
+                        continue
+                    self._last_fired[rule_id] = now
+                    rule = self._rules[rule_id]
+                    fired.append({
+                        "rule": rule_id, "symbol": symbol, "kind": rule["kind"], "value": rule["value"],
+                        "price": price, "message": describe(rule), "note": rule["note"],
+                        "time": datetime.fromtimestamp(now).isoformat(timespec="seconds"), "ts": now,
+                    })
+            if fired:
+                self._recent.extend(fired)
+                self._fired += len(fired)
+                os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.writelines(json.dumps(a, ensure_ascii=False) + "\n" for a in fired)
+        return fired
+
+    def recent(self, limit=50):
+        """The latest fired alerts, newest first"""
+        with self._lock:
+            return list(self._recent)[::-1][:limit]
+
+    def since(self, seen=None):
+        """(alerts fired after number seen, oldest first; the number to pass next time).
+
+        seen=None starts a new reader at the current alert without returning any.
+        """
+        with self._lock:
+            if seen is None:
+                return [], self._fired
+            new = min(self._fired - seen, len(self._recent))
+            return (list(self._recent)[-new:] if new > 0 else []), self._fired
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_alert_engine():
+    """The engine shared by the whole process"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = AlertEngine()
+        return _engine
@@ -1,15 +1,20 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import yfinance as yf
-import requests
 from datetime import datetime, timedelta
-from matplotlib.ticker import FuncFormatter
-
-# Set font for international support
-plt.rcParams["font.family"] = ["Arial", "DejaVu Sans", "Liberation Sans"]
-plt.rcParams["axes.unicode_minus"] = False  # Solve the problem of negative sign display
+from lazy_import import lazy_module
+from asset_registry import get_registry
+from data_provider import get_provider
+from single_flight import get_coalescer
+from portfolio_analytics import sector_label, sector_breakdown
+
+def _setup_pyplot(plt):
+    # Set font for international support
+    plt.rcParams["font.family"] = ["Arial", "DejaVu Sans", "Liberation Sans"]
+    plt.rcParams["axes.unicode_minus"] = False  # Solve the problem of negative sign display
+
+# Heavy libraries are imported by the first section that uses them
+pd = lazy_module("pandas")
+plt = lazy_module("matplotlib.pyplot", on_load=_setup_pyplot)
+requests = lazy_module("requests")
 
 # --------- Session State Initialization ---------
 if "your_picks" not in st.session_state:
@@ -34,28 +39,31 @@ tabs = st.tabs(["Create Portfolio", "News Aggregation", "Portfolio Analysis", "S
 # --------- Utility Functions ---------
 def is_crypto(symbol):
     """Check if it is a cryptocurrency"""
-    return "-USD" in symbol or symbol in ["BTC", "ETH", "BNB"]
+    return get_registry().asset_type(symbol) == "Cryptocurrency"
 
 def is_etf(symbol):
     """Check if it is an ETF"""
-    etf_list = ["SPY", "VOO", "QQQ", "IWM", "DIA"]  # Common ETF list
-    return symbol in etf_list
+    return get_registry().asset_type(symbol) == "ETF"
 
 def get_asset_type(symbol):
     """Get asset type"""
-    if is_crypto(symbol):
-        return "Cryptocurrency"
-    elif is_etf(symbol):
-        return "ETF"
-    else:
-        return "Stock"
+    return get_registry().asset_type(symbol)
+
+# Upstream calls go through the process-wide coalescer, so concurrent
+# sessions asking for the same data share one request
+def _fetch(kind, key, fn, *args, **kwargs):
+    return get_coalescer().do(kind, key, fn, *args, **kwargs)
+
+def fetch_history(symbol, period, interval="1d"):
+    return _fetch("yfinance.history", (symbol, period, interval), get_provider().history, symbol, period, interval)
+
+def fetch_news(endpoint, params):
+    return _fetch(f"worldnews.{endpoint}", tuple(sorted(params.items())), get_provider().news, endpoint, params)
 
 def safe_get_ticker_info(symbol):
     """Safely get stock information with retry mechanism"""
     try:
-        ticker = yf.Ticker(symbol)
-        info = ticker.info
-        return info
+        return _fetch("yfinance.info", symbol, get_provider().info, symbol)
     except Exception as e:
         st.warning(f"Failed to get information for {symbol}: {str(e)}")
         return None
@@ -231,8 +239,6 @@ with tabs[0]:
 
 # --------- 新闻聚合功能 ---------
 def get_news(symbols, page=1, page_size=12, keyword=None, filter_type="All Holdings"):
-    API_KEY = "6d6d5f5d55b64eab94814259cb0a0841"
-    url = "https://api.worldnewsapi.com/search-news"
     keywords = " OR ".join(symbols)
     query = keyword if keyword else keywords
     earliest_date = (datetime.now() - timedelta(days=30)).isoformat()
@@ -244,12 +250,9 @@ def get_news(symbols, page=1, page_size=12, keyword=None, filter_type="All Holdi
         "page-size": page_size,
         "earliest-publish-date": earliest_date
     }
-    headers = {"x-api-key": API_KEY}
     try:
         with st.spinner("Fetching news..."):
-            resp = requests.get(url, params=params, headers=headers, timeout=10)
-            resp.raise_for_status()
-            data = resp.json()
+            data = fetch_news("search-news", params)
         news_list = []
         for item in data.get("news", []):
             symbol_in_news = next((s for s in symbols if s in item.get("title", "")), "OTHER")
@@ -370,37 +373,18 @@ with tabs[1]:
 
 # --------- 投资分析工具函数 ---------
 def get_sector(symbol):
-    """从yfinance获取行业信息，失败则使用默认映射"""
+    """从yfinance获取行业信息，失败则使用分类注册表"""
     info = safe_get_ticker_info(symbol)
     if info and "sector" in info:
-        sector_map = {
-            "Technology": "科技",
-            "Consumer Cyclical": "消费周期",
-            "Financial Services": "金融服务",
-            "Healthcare": "医疗健康",
-            "Energy": "能源",
-            "Consumer Defensive": "必选消费",
-            "Industrials": "工业",
-            "Real Estate": "房地产",
-            "Utilities": "公用事业",
-            "Communication Services": "通信服务",
-            "Basic Materials": "基础材料"
-        }
-        return sector_map.get(info["sector"], info["sector"])
-    # 默认映射
-    default_map = {
-        "AAPL": "科技", "MSFT": "科技", "NVDA": "科技", "GOOGL": "科技", 
-        "AMZN": "消费", "TSLA": "汽车", "SPY": "ETF", "BTC-USD": "加密货币"
-    }
-    return default_map.get(symbol, "综合")
+        return sector_label(info["sector"])
+    return sector_label(get_registry().get(symbol, "sector"))
 
 def get_beta(symbol):
     """获取贝塔值"""
     info = safe_get_ticker_info(symbol)
     if info and "beta" in info and info["beta"] is not None:
         return round(info["beta"], 2)
-    default_map = {"AAPL": 1.2, "MSFT": 1.1, "NVDA": 2.27, "GOOGL": 1.0, "AMZN": 1.3, "TSLA": 1.8, "BTC-USD": 1.39}
-    return default_map.get(symbol, 1.0)
+    return get_registry().value(symbol, "beta", 1.0)
 
 def get_pe(symbol):
     """获取市盈率"""
@@ -409,16 +393,14 @@ def get_pe(symbol):
     info = safe_get_ticker_info(symbol)
     if info and "trailingPE" in info and info["trailingPE"] is not None:
         return round(info["trailingPE"], 2)
-    default_map = {"AAPL": 39.95, "MSFT": 32.1, "NVDA": 53.01, "GOOGL": 28.7, "AMZN": 41.2, "TSLA": 70.5}
-    return default_map.get(symbol, 20)
+    return get_registry().value(symbol, "pe", 20)
 
 def get_market_cap(symbol):
     """获取市值（亿美元）"""
     info = safe_get_ticker_info(symbol)
     if info and "marketCap" in info and info["marketCap"] is not None:
         return round(info["marketCap"] / 1e8, 1)  # 转换为亿美元
-    default_map = {"AAPL": 30000, "MSFT": 25000, "NVDA": 15000, "GOOGL": 18000, "AMZN": 17000, "TSLA": 8000, "BTC-USD": 9000}
-    return default_map.get(symbol, 5000)
+    return get_registry().value(symbol, "market_cap", 5000)
 
 def get_dividend(symbol):
     """获取股息率（%）"""
@@ -427,8 +409,7 @@ def get_dividend(symbol):
     info = safe_get_ticker_info(symbol)
     if info and "dividendYield" in info and info["dividendYield"] is not None:
         return round(info["dividendYield"] * 100, 2)  # 转换为百分比
-    default_map = {"AAPL": 0.6, "MSFT": 0.8, "NVDA": 0.1, "GOOGL": 0, "AMZN": 0, "TSLA": 0}
-    return default_map.get(symbol, 0)
+    return get_registry().value(symbol, "dividend", 0)
 
 # 第三页：投资分析
 with tabs[2]:
@@ -451,10 +432,8 @@ with tabs[2]:
     st.subheader("Asset Allocation Analysis")
     analysis_tabs = st.tabs(["Asset Type", "Sector Distribution", "Region Distribution"])
     with analysis_tabs[0]:
-        type_data = {}
-        for s in holdings:
-            asset_type = get_asset_type(s)
-            type_data[asset_type] = type_data.get(asset_type, 0) + weights[s]
+        registry = get_registry()
+        type_data = registry.breakdown(holdings, weights, "asset_type")
         fig, ax = plt.subplots(figsize=(8, 6))
         wedges, texts, autotexts = ax.pie(
             type_data.values(), 
@@ -466,11 +445,9 @@ with tabs[2]:
         ax.set_title('Asset Type Distribution (by weight)')
         st.pyplot(fig)
     with analysis_tabs[1]:
-        sector_data = {}
-        for s in holdings:
-            if get_asset_type(s) != "ETF" and not is_crypto(s):
-                sector = get_sector(s)
-                sector_data[sector] = sector_data.get(sector, 0) + weights[s]
+        # 注册表中缺少行业的股票只查询一次，由 sector_breakdown 批量写回注册表
+        missing = [s for s in holdings if registry.asset_type(s) == "Stock" and not registry.get(s, "sector")]
+        sector_data = sector_breakdown(holdings, weights, {s: safe_get_ticker_info(s) for s in missing})
         fig, ax = plt.subplots(figsize=(8, 6))
         wedges, texts, autotexts = ax.pie(
             sector_data.values(), 
@@ -482,15 +459,7 @@ with tabs[2]:
         ax.set_title('Sector Distribution (by weight)')
         st.pyplot(fig)
     with analysis_tabs[2]:
-        region_data = {"US": 0, "Europe": 0, "Asia": 0, "Other": 0}
-        us_stocks = ["AAPL", "MSFT", "NVDA", "GOOGL", "AMZN", "TSLA", "SPY"]
-        for s in holdings:
-            if s in us_stocks:
-                region_data["US"] += weights[s]
-            elif s in ["BTC-USD", "ETH-USD"]:
-                region_data["Other"] += weights[s]
-            else:
-                region_data["Asia"] += weights[s]
+        region_data = registry.breakdown(holdings, weights, "region")
         fig, ax = plt.subplots(figsize=(8, 6))
         wedges, texts, autotexts = ax.pie(
             region_data.values(), 
@@ -562,8 +531,7 @@ with tabs[3]:
     # 获取行情数据
     try:
         with st.spinner(f"获取{symbol}数据中..."):
-            ticker = yf.Ticker(symbol)
-            hist = ticker.history(period=period_map[period], interval="1d")
+            hist = fetch_history(symbol, period_map[period], "1d")
             
             # 显示价格信息
             if not hist.empty:
@@ -573,7 +541,7 @@ with tabs[3]:
                 pct_change = (change / prev_price * 100) if prev_price != 0 else 0
                 
                 # 获取标的基本信息
-                info = ticker.info
+                info = safe_get_ticker_info(symbol) or {}
                 name = info.get("shortName", symbol)
                 st.subheader(f"{name} ({symbol})")
                 st.metric(
@@ -598,8 +566,7 @@ with tabs[3]:
                 
                 # 添加对比标的
                 for cs in compare_symbols:
-                    cs_ticker = yf.Ticker(cs)
-                    cs_hist = cs_ticker.history(period=period_map[period], interval="1d")
+                    cs_hist = fetch_history(cs, period_map[period], "1d")
                     ax.plot(cs_hist.index, cs_hist["Close"], label=cs, linestyle='--')
                 
                 # 添加技术指标
@@ -630,7 +597,7 @@ with tabs[3]:
 
                 # 公司新闻/事件
                 st.subheader("Latest News")
-                news = ticker.news if hasattr(ticker, "news") else []
+                news = _fetch("yfinance.news", symbol, get_provider().ticker_news, symbol)
                 if news:
                     for n in news[:5]:
                         publish_time = datetime.fromtimestamp(n.get("providerPublishTime", 0)/1000).strftime('%Y-%m-%d')
@@ -658,8 +625,7 @@ with tabs[3]:
             cols = st.columns(3)
             for i, s in enumerate(port_holdings):
                 try:
-                    t = yf.Ticker(s)
-                    h = t.history(period="1d", interval="1d")
+                    h = fetch_history(s, "1d", "1d")
                     if not h.empty:
                         p = h["Close"].iloc[-1]
                         prev_p = h["Close"].iloc[-2] if len(h) > 1 else p
@@ -674,48 +640,26 @@ with tabs[3]:
         st.info("No portfolios available for monitoring")
 
 # --------- 新闻API示例函数 ---------
+def _example_news(endpoint, params):
+    try:
+        return fetch_news(endpoint, params)
+    except requests.HTTPError as e:
+        return f"Error: {e.response.status_code}"
+
 def search_news():
-    url = "https://api.worldnewsapi.com/search-news?text=earth+quake&language=en&earliest-publish-date=2024-04-01"
-    api_key = "6d6d5f5d55b64eab94814259cb0a0841"
-    headers = {'x-api-key': api_key}
-    response = requests.get(url, headers=headers)
-    if response.status_code == 200:
-        return response.json()
-    else:
-        return f"Error: {response.status_code}"
+    return _example_news("search-news", {"text": "earth quake", "language": "en", "earliest-publish-date": "2024-04-01"})
 
 # Top News
 def top_news():
-    url = "https://api.worldnewsapi.com/top-news?source-country=us&language=en&date=2024-05-29"
-    api_key = "6d6d5f5d55b64eab94814259cb0a0841"
-    headers = {'x-api-key': api_key}
-    response = requests.get(url, headers=headers)
-    if response.status_code == 200:
-        return response.json()
-    else:
-        return f"Error: {response.status_code}"
+    return _example_news("top-news", {"source-country": "us", "language": "en", "date": "2024-05-29"})
 
 # Retrieve News
 def retrieve_news():
-    url = "https://api.worldnewsapi.com/retrieve-news?ids=2352,2354"
-    api_key = "6d6d5f5d55b64eab94814259cb0a0841"
-    headers = {'x-api-key': api_key}
-    response = requests.get(url, headers=headers)
-    if response.status_code == 200:
-        return response.json()
-    else:
-        return f"Error: {response.status_code}"
+    return _example_news("retrieve-news", {"ids": "2352,2354"})
 
 # Extract News
 def extract_news():
-    url = "https://api.worldnewsapi.com/extract-news?url=https://nypost.com/2024/04/02/us-news/lawmakers-demand-to-know-if-taxpayers-funded-al-shabaab-terrorist/"
-    api_key = "6d6d5f5d55b64eab94814259cb0a0841"
-    headers = {'x-api-key': api_key}
-    response = requests.get(url, headers=headers)
-    if response.status_code == 200:
-        return response.json()
-    else:
-        return f"Error: {response.status_code}"
+    return _example_news("extract-news", {"url": "https://nypost.com/2024/04/02/us-news/lawmakers-demand-to-know-if-taxpayers-funded-al-shabaab-terrorist/"})
 
 # Example usage
 if __name__ == "__main__":
@@ -0,0 +1,214 @@
+"""Asset classification registry.
+
+Maps every known symbol to its asset class, sector, region, market-cap bucket
+and currency, plus the fallback fundamentals used when yfinance has no data.
+The table is loaded from data/asset_registry.csv into one symbol -> row index
+dict and one array per column, so a lookup is a dict hit plus an array read and
+an allocation breakdown is a single grouped sum (np.bincount). Rows added with
+update() are written back to the file, unless the registry was opened with
+persist=False (batch jobs that must not change the tracked file).
+"""
+import csv
+import os
+import threading
+
+from lazy_import import lazy_module
+
+np = lazy_module("numpy")  # loaded with the table, not when the apps import this module
+
+REGISTRY_PATH = os.environ.get(
+    "PORTFOLIO_REGISTRY",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "asset_registry.csv")
+)
+
+# Categorical columns are stored as integer codes into a label list
+CATEGORY_FIELDS = ("asset_type", "sector", "region", "cap_bucket", "currency")
+# Numeric columns are stored as float64 arrays, NaN when unknown
+NUMERIC_FIELDS = ("beta", "pe", "market_cap", "dividend")
+COLUMNS = ("symbol",) + CATEGORY_FIELDS + NUMERIC_FIELDS
+
+CRYPTO_BASES = ("BTC", "ETH", "BNB")
+
+
+def _fallback_row(symbol):
+    """Classification for symbols that are not in the registry file"""
+    if symbol.endswith("-USD") or symbol in CRYPTO_BASES:
+        return {"asset_type": "Cryptocurrency", "sector": "", "region": "Other", "cap_bucket": "", "currency": "USD"}
+    return {"asset_type": "Stock", "sector": "", "region": "Other", "cap_bucket": "", "currency": ""}
+
+
+class _Table:
+    """Immutable snapshot of the registry (swapped as a whole on refresh)"""
+
+    def __init__(self, rows):
+        self.symbols = list(rows)
+        self.index = {s: i for i, s in enumerate(self.symbols)}
+        self.labels = {}
+        self.label_index = {}
+        self.codes = {}
+        for field in CATEGORY_FIELDS:
+            labels = []
+            label_index = {}
+            codes = np.empty(len(self.symbols), dtype=np.int32)
+            for i, s in enumerate(self.symbols):
+                label = rows[s].get(field, "") or ""
+                if label not in label_index:
+                    label_index[label] = len(labels)
+                    labels.append(label)
+                codes[i] = label_index[label]
+            self.labels[field] = labels
+            self.label_index[field] = label_index
+            self.codes[field] = codes
+        self.values = {}
+        for field in NUMERIC_FIELDS:
+            self.values[field] = np.array([_to_float(rows[s].get(field)) for s in self.symbols], dtype=np.float64)
+
+
+def _read(path):
+    rows = {}
+    if os.path.exists(path):
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                symbol = row.pop("symbol", "").strip().upper()
+                if symbol:
+                    rows[symbol] = row
+    return rows
+
+
+def _write(path, rows):
+    """Replace the data file with rows in one step (readers never see half a file)"""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, COLUMNS, extrasaction="ignore")
+        writer.writeheader()
+        for symbol, row in rows.items():
+            writer.writerow({**row, "symbol": symbol})
+    os.replace(tmp, path)
+
+
+def _to_float(value):
+    if value is None or value == "":
+        return np.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class AssetRegistry:
+    """Symbol -> classification lookups backed by hash-indexed arrays"""
+
+    def __init__(self, path=REGISTRY_PATH, persist=True):
+        self.path = path
+        self.persist = persist
+        self._lock = threading.Lock()
+        self._rows = {}
+        self._table = _Table({})
+        self.refresh()
+
+    def refresh(self, path=None):
+        """Reload the whole registry from the data file"""
+        rows = _read(path or self.path)
+        with self._lock:
+            self._rows = rows
+            self._table = _Table(rows)
+
+    def update(self, rows):
+        """Bulk upsert {symbol: {field: value}}, rebuild the arrays once and write the file back.
+
+        The file is re-read first, so rows another process added since this
+        one loaded it are kept. A file that cannot be written (read-only
+        install), or a registry opened with persist=False, leaves the update
+        in memory only.
+        """
+        with self._lock:
+            merged = dict(self._rows)
+            merged.update(_read(self.path))
+            for symbol, fields in rows.items():
+                symbol = symbol.upper()
+                row = dict(merged.get(symbol) or _fallback_row(symbol))
+                row.update({k: v for k, v in fields.items() if v is not None})
+                merged[symbol] = row
+            self._rows = merged
+            self._table = _Table(merged)
+            if not self.persist:
+                return
+            try:
+                _write(self.path, merged)
+            except OSError:
+                pass
+
+    def __contains__(self, symbol):
+        return symbol in self._table.index
+
+    def __len__(self):
+        return len(self._table.symbols)
+
+    def get(self, symbol, field):
+        """Categorical field for a symbol ("" when unknown)"""
+        table = self._table
+        i = table.index.get(symbol)
+        if i is None:
+            return _fallback_row(symbol)[field]
+        return table.labels[field][table.codes[field][i]]
+
+    def value(self, symbol, field, default=None):
+        """Numeric field for a symbol, or default when missing"""
+        table = self._table
+        i = table.index.get(symbol)
+        if i is None:
+            return default
+        v = table.values[field][i]
+        return default if np.isnan(v) else float(v)
+
+    def classify(self, symbol):
+        """All categorical fields for a symbol as a dict"""
+        return {field: self.get(symbol, field) for field in CATEGORY_FIELDS}
+
+    def asset_type(self, symbol):
+        return self.get(symbol, "asset_type")
+
+    def codes(self, symbols, field):
+        """(codes array, labels) of a categorical field for many symbols at once"""
+        table = self._table
+        labels = list(table.labels[field])
+        label_index = dict(table.label_index[field])
+        codes = np.empty(len(symbols), dtype=np.int64)
+        for j, s in enumerate(symbols):
+            i = table.index.get(s)
+            if i is not None:
+                codes[j] = table.codes[field][i]
+            else:
+                label = _fallback_row(s)[field]
+                if label not in label_index:
+                    label_index[label] = len(labels)
+                    labels.append(label)
+                codes[j] = label_index[label]
+        return codes, labels
+
+    def values(self, symbols, field):
+        """Numeric field for many symbols as a float64 array, NaN when missing"""
+        table = self._table
+        column = table.values[field]
+        return np.array([column[table.index[s]] if s in table.index else np.nan for s in symbols], dtype=np.float64)
+
+    def breakdown(self, holdings, weights, field):
+        """Sum weights per label of a categorical field, e.g. region -> weight.
+
+        Labels are returned in registry order so the result is deterministic.
+        """
+        codes, labels = self.codes(holdings, field)
+        w = np.array([float(weights[s]) for s in holdings], dtype=np.float64)
+        sums = np.bincount(codes, weights=w, minlength=len(labels))
+        return {labels[k]: float(sums[k]) for k in np.flatnonzero(sums)}
+
+
+_registry = None
+
+
+def get_registry():
+    """Process-wide registry, loaded on first use"""
+    global _registry
+    if _registry is None:
+        _registry = AssetRegistry()
+    return _registry
@@ -0,0 +1,249 @@
+"""Rerun latency benchmark for streamlit_app.py.
+
+Drives the app with Streamlit's AppTest harness against the deterministic
+StubProvider, with one portfolio of 5, 50, 500 and 5,000 holdings. For each
+size it performs one interaction per tab and records, per rerun:
+
+    wall_s          wall time of the rerun
+    provider_calls  upstream calls by kind (info, history, news, ...)
+    peak_mem_mb     peak memory during the rerun (see --memory)
+
+Usage:
+    python benchmarks/bench_rerun.py                      # run and compare with baseline
+    python benchmarks/bench_rerun.py --sizes 5 50         # subset of sizes
+    python benchmarks/bench_rerun.py --update-baseline    # store the result as the new baseline
+
+--memory rss (default) samples the process resident set size in a background
+thread and adds no overhead to the rerun; --memory tracemalloc reports the
+peak of Python allocations instead but slows reruns down about 3x, so wall
+times from such runs are not comparable with an rss baseline.
+
+Exits with status 1 when a rerun is slower than the baseline by more than
+--tolerance (and --min-delta seconds) or makes more provider calls.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import warnings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# The app's modules read their data paths from the environment when first
+# imported, so they are imported only after _isolate_data() has set them
+from stub_provider import StubProvider, synthetic_symbols  # noqa: E402
+
+APP_PATH = os.path.join(ROOT, "streamlit_app.py")
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+BASELINE_PATH = os.path.join(ROOT, "benchmarks", "baseline_rerun.json")
+DEFAULT_SIZES = (5, 50, 500, 5000)
+PORTFOLIO_NAME = "Bench Portfolio"
+
+
+def _find(widgets, label):
+    for w in widgets:
+        if w.label == label:
+            return w
+    raise LookupError(f"widget not found: {label}")
+
+
+# (tab, scenario, action) -- each action triggers exactly one rerun
+SCENARIOS = [
+    ("Create Portfolio", "quick add asset", lambda at: _find(at.button, "AAPL +").click()),
+    ("News Aggregation", "load more", lambda at: _find(at.button, "Load more").click()),
+    ("Portfolio Analysis", "select portfolio", lambda at: _find(at.selectbox, "Select portfolio").select(PORTFOLIO_NAME)),
+    ("Stock Analysis", "change period", lambda at: _find(at.selectbox, "选择时间周期").select("1年")),
+    ("Stock Analysis", "monitor portfolio", lambda at: _find(at.selectbox, "Select portfolio to monitor").select(PORTFOLIO_NAME)),
+]
+
+
+def _isolate_data(state_dir):
+    """Point the app's data files into state_dir, so the benchmark never writes to the repo's data/"""
+    registry = os.path.join(state_dir, "asset_registry.csv")
+    shutil.copy(os.path.join(ROOT, "data", "asset_registry.csv"), registry)
+    os.environ.update(
+        PORTFOLIO_REGISTRY=registry,
+        PORTFOLIO_NEWS_DB=os.path.join(state_dir, "news.db"),
+        PORTFOLIO_CACHE=os.path.join(state_dir, "cache"),
+        PORTFOLIO_FUNDAMENTALS=os.path.join(state_dir, "fundamentals.npz"),
+        PORTFOLIO_ALERTS=os.path.join(state_dir, "alerts.json"),
+        PORTFOLIO_STORE=os.path.join(state_dir, "portfolios.json"),
+        PORTFOLIO_METRICS_FILE=os.path.join(state_dir, "metrics.prom"),
+    )
+
+
+def _portfolio(n):
+    holdings = synthetic_symbols(n)
+    return {"name": PORTFOLIO_NAME, "holdings": holdings, "weights": {s: 100.0 / n for s in holdings}}
+
+
+def _rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        import resource
+        # ru_maxrss is the process-lifetime peak (KB on Linux, bytes on macOS)
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss if sys.platform == "darwin" else rss * 1024
+
+
+class PeakMemory:
+    """Peak memory while the block runs, in bytes"""
+
+    def __init__(self, mode, interval=0.005):
+        self.mode = mode
+        self.interval = interval
+        self.peak = 0
+
+    def _sample(self):
+        while not self._done.wait(self.interval):
+            self.peak = max(self.peak, _rss_bytes())
+
+    def __enter__(self):
+        if self.mode == "tracemalloc":
+            tracemalloc.reset_peak()
+        elif self.mode == "rss":
+            self.peak = _rss_bytes()
+            self._done = threading.Event()
+            self._thread = threading.Thread(target=self._sample, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self.mode == "tracemalloc":
+            self.peak = tracemalloc.get_traced_memory()[1]
+        elif self.mode == "rss":
+            self._done.set()
+            self._thread.join()
+            self.peak = max(self.peak, _rss_bytes())
+
+
+def _measure(at, stub, action=None, memory="rss", timeout=600):
+    stub.reset()
+    with PeakMemory(memory) as mem:
+        start = time.perf_counter()
+        if action is not None:
+            action(at)
+        at.run(timeout=timeout)
+        wall = time.perf_counter() - start
+    peak = mem.peak
+    if at.exception:
+        raise RuntimeError(f"app raised: {at.exception[0].value}")
+    return {
+        "wall_s": round(wall, 4),
+        "provider_calls": dict(sorted(stub.calls.items())),
+        "peak_mem_mb": round(peak / 2 ** 20, 2),
+    }
+
+
+def run_size(n, latency=0.0, memory="rss"):
+    from streamlit.testing.v1 import AppTest
+    from data_provider import set_provider
+
+    stub = StubProvider(latency=latency)
+    set_provider(stub)
+    at = AppTest.from_file(APP_PATH, default_timeout=600)
+    at.session_state["portfolios"] = [_portfolio(n)]
+    at.session_state["current_portfolio"] = PORTFOLIO_NAME
+    reruns = {"Initial render / first run": _measure(at, stub, memory=memory)}
+    for tab, scenario, action in SCENARIOS:
+        reruns[f"{tab} / {scenario}"] = _measure(at, stub, action, memory)
+    return reruns
+
+
+def compare(result, baseline, tolerance, min_delta):
+    """List of human-readable regressions against the baseline"""
+    regressions = []
+    for size, reruns in result["results"].items():
+        for name, current in reruns.items():
+            base = baseline.get("results", {}).get(size, {}).get(name)
+            if not base:
+                continue
+            slower = current["wall_s"] - base["wall_s"]
+            if slower > min_delta and current["wall_s"] > base["wall_s"] * (1 + tolerance):
+                regressions.append(f"[{size}] {name}: {base['wall_s']:.3f}s -> {current['wall_s']:.3f}s")
+            calls, base_calls = sum(current["provider_calls"].values()), sum(base["provider_calls"].values())
+            if calls > base_calls:
+                regressions.append(f"[{size}] {name}: provider calls {base_calls} -> {calls}")
+    return regressions
+
+
+def main(argv=None):
+    if os.environ.get("PYTHONHASHSEED") != "0" and argv is None:
+        # set() order decides e.g. the default stock in Stock Analysis, and with
+        # it how many calls a rerun makes; pin it so runs are comparable
+        os.environ["PYTHONHASHSEED"] = "0"
+        os.execv(sys.executable, [sys.executable] + sys.argv)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds injected into every provider call")
+    parser.add_argument("--memory", choices=("rss", "tracemalloc", "off"), default="rss")
+    parser.add_argument("--output", help="result JSON path (default benchmarks/results/rerun-<time>.json)")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown")
+    parser.add_argument("--min-delta", type=float, default=0.05, help="ignore slowdowns below this many seconds")
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.WARNING)
+    warnings.filterwarnings("ignore")
+    if args.memory == "tracemalloc":
+        tracemalloc.start()
+    state_dir = tempfile.mkdtemp(prefix="bench-rerun-")
+    _isolate_data(state_dir)
+
+    result = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "latency": args.latency,
+            "memory": args.memory,
+        },
+        "results": {},
+    }
+    for n in args.sizes:
+        print(f"--- {n} holdings")
+        reruns = run_size(n, args.latency, args.memory)
+        result["results"][str(n)] = reruns
+        for name, r in reruns.items():
+            calls = sum(r["provider_calls"].values())
+            print(f"{name:<45} {r['wall_s']:>8.3f}s {calls:>7} calls {r['peak_mem_mb']:>9.1f} MB")
+    shutil.rmtree(state_dir, ignore_errors=True)
+
+    output = args.output or os.path.join(RESULTS_DIR, time.strftime("rerun-%Y%m%d-%H%M%S.json"))
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    print(f"Results written to {output}")
+
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print("No baseline to compare against (run with --update-baseline)")
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(result, baseline, args.tolerance, args.min_delta)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    if not regressions:
+        print("No regressions against baseline")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
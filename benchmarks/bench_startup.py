@@ -0,0 +1,192 @@
+"""Startup-time benchmark for the three entry points.
+
+For each app this measures, in fresh interpreters:
+
+    import_s       module-level imports of the script, from `python -X importtime`
+                   (sum of the cumulative times of the top-level imports)
+    top_imports    the slowest top-level imports behind import_s
+    first_paint_s  process launch until the first element reaches the screen:
+                   the first delta sent by the Streamlit script, or the Tk
+                   window's first update() (needs $DISPLAY)
+
+Usage:
+    python benchmarks/bench_startup.py                    # all apps, 5 runs each
+    python benchmarks/bench_startup.py --apps streamlit_app.py --repeat 10
+    python benchmarks/bench_startup.py --root ../old-checkout  # measure another tree
+
+Median values are printed and written to benchmarks/results/startup-<time>.json.
+Compare two trees (e.g. a `git worktree` of the previous commit) to see the
+effect of a change.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+DEFAULT_APPS = ("streamlit_app.py", "app(1).py", "test(1).py")
+TK_APPS = ("test(1).py",)
+
+_IMPORT_LINE = re.compile(r"^(import|from)\s")
+_IMPORTTIME = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+# Runs a Streamlit script once under AppTest and prints the wall-clock time of
+# the first delta (element) it sends; data comes from the benchmark stub.
+_STREAMLIT_PAINT = """
+import logging, sys, time, warnings
+logging.disable(logging.WARNING)
+warnings.filterwarnings("ignore")
+sys.path[:0] = [{root!r}, {bench!r}]
+from streamlit.runtime.scriptrunner_utils.script_run_context import ScriptRunContext
+first = []
+_enqueue = ScriptRunContext.enqueue
+def enqueue(self, msg):
+    if not first and msg.HasField("delta"):
+        first.append(time.time())
+    return _enqueue(self, msg)
+ScriptRunContext.enqueue = enqueue
+from data_provider import set_provider
+from stub_provider import StubProvider
+set_provider(StubProvider())
+from streamlit.testing.v1 import AppTest
+AppTest.from_file({path!r}, default_timeout=600).run()
+print("FIRST_PAINT", first[0] if first else "nan")
+"""
+
+# Builds the Tk app without entering mainloop and prints when its first frame is drawn
+_TK_PAINT = """
+import runpy, sys, time
+sys.path.insert(0, {root!r})
+ns = runpy.run_path({path!r}, run_name="bench_startup")
+import tkinter as tk
+root = tk.Tk()
+app = ns["InvestmentPortfolioApp"](root)
+root.update()
+print("FIRST_PAINT", time.time())
+root.destroy()
+"""
+
+
+def header_imports(path):
+    """Module-level import statements of a script, in order"""
+    with open(path, encoding="utf-8") as f:
+        return [line.rstrip() for line in f if _IMPORT_LINE.match(line)]
+
+
+def _importtime(root, code):
+    """{top-level module: cumulative seconds} for running code with -X importtime"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=root, capture_output=True, text=True, env={**os.environ, "PYTHONPATH": root}
+    )
+    if proc.returncode:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    top = {}
+    for line in proc.stderr.splitlines():
+        m = _IMPORTTIME.match(line)
+        if m and len(m.group(3)) == 1:  # one space of indent = imported directly
+            top[m.group(4)] = top.get(m.group(4), 0) + int(m.group(2)) / 1e6
+    return top
+
+
+def measure_imports(root, path):
+    """(total seconds, {top-level module: cumulative seconds}) of the script's imports"""
+    interpreter = _importtime(root, "pass")  # site, encodings, ... imported before any script
+    top = {m: s for m, s in _importtime(root, "\n".join(header_imports(path))).items() if m not in interpreter}
+    return sum(top.values()), top
+
+
+def measure_first_paint(root, path):
+    """Seconds from launching the process to the app's first paint, or None if it cannot run here"""
+    name = os.path.basename(path)
+    if name in TK_APPS:
+        if not os.environ.get("DISPLAY") and sys.platform.startswith("linux"):
+            return None, "no $DISPLAY"
+        code = _TK_PAINT.format(root=root, path=path)
+    else:
+        code = _STREAMLIT_PAINT.format(root=root, bench=os.path.join(ROOT, "benchmarks"), path=path)
+    start = time.time()
+    proc = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True)
+    m = re.search(r"^FIRST_PAINT (\S+)$", proc.stdout, re.M)
+    if proc.returncode or not m or m.group(1) == "nan":
+        lines = (proc.stderr or proc.stdout).strip().splitlines()
+        return None, lines[-1] if lines else f"exit status {proc.returncode}"
+    return float(m.group(1)) - start, None
+
+
+def _syntax_error(path):
+    """Why the script does not compile, or None"""
+    with open(path, encoding="utf-8") as f:
+        source = f.read()
+    try:
+        compile(source, path, "exec")
+    except SyntaxError as e:
+        return f"{type(e).__name__} at line {e.lineno}: {e.msg}"
+    return None
+
+
+def bench_app(root, name, repeat):
+    path = os.path.join(root, name)
+    imports, paints, tops, note = [], [], [], _syntax_error(path)
+    # The import lines of a script that cannot run say nothing about its startup
+    for _ in range(0 if note else repeat):
+        try:
+            total, top = measure_imports(root, path)
+        except RuntimeError as e:
+            note = str(e)
+            break
+        imports.append(total)
+        tops.append(top)
+        paint, note = measure_first_paint(root, path)
+        if paint is not None:
+            paints.append(paint)
+    result = {
+        "import_s": round(statistics.median(imports), 4) if imports else None,
+        "first_paint_s": round(statistics.median(paints), 4) if paints else None,
+        "top_imports": {},
+        "note": note,
+    }
+    if tops:
+        modules = {m for top in tops for m in top}
+        medians = {m: statistics.median(top.get(m, 0.0) for top in tops) for m in modules}
+        result["top_imports"] = {m: round(s, 4) for m, s in sorted(medians.items(), key=lambda kv: -kv[1])[:8]}
+    return result
+
+
+def _fmt(seconds):
+    return f"{seconds:8.3f}s" if seconds is not None else "       -"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--apps", nargs="+", default=list(DEFAULT_APPS))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--root", default=ROOT, help="tree containing the apps (default: this checkout)")
+    parser.add_argument("--output", help="result JSON path (default benchmarks/results/startup-<time>.json)")
+    args = parser.parse_args(argv)
+    root = os.path.abspath(args.root)
+
+    result = {"meta": {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "root": root, "repeat": args.repeat}, "results": {}}
+    for name in args.apps:
+        r = result["results"][name] = bench_app(root, name, args.repeat)
+        print(f"{name:<20} imports {_fmt(r['import_s'])}   first paint {_fmt(r['first_paint_s'])}")
+        for module, seconds in r["top_imports"].items():
+            print(f"    {module:<40} {seconds:8.3f}s")
+        if r["note"]:
+            print(f"    note: {r['note']}")
+
+    output = args.output or os.path.join(RESULTS_DIR, time.strftime("startup-%Y%m%d-%H%M%S.json"))
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    print(f"Results written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""Deterministic in-memory data provider for benchmarks.
+
+Implements the data_provider interface with synthetic but realistically
+shaped responses (ticker .info dicts, OHLCV frames, news JSON) generated from
+a per-symbol seed, so runs are reproducible and need no network or fixtures.
+Every call is counted per kind; an optional fixed latency can be injected.
+"""
+import threading
+import time
+import zlib
+from collections import Counter
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+# Trading days per yfinance period string
+PERIOD_DAYS = {"1d": 1, "5d": 5, "1mo": 21, "3mo": 63, "6mo": 126, "ytd": 200, "1y": 252, "2y": 504, "5y": 1260, "10y": 2520, "max": 2520}
+END_DATE = "2026-01-02"
+SECTORS = ["Technology", "Financial Services", "Healthcare", "Energy", "Consumer Cyclical", "Industrials"]
+
+
+def _rng(*parts):
+    return np.random.default_rng(zlib.crc32("|".join(map(str, parts)).encode("utf-8")))
+
+
+def synthetic_symbols(n):
+    """n distinct made-up tickers: SYM00000, SYM00001, ..."""
+    return [f"SYM{i:05d}" for i in range(n)]
+
+
+class StubProvider:
+    mode = "stub"
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = Counter()
+        self._lock = threading.Lock()
+
+    def _count(self, kind):
+        with self._lock:
+            self.calls[kind] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def reset(self):
+        with self._lock:
+            self.calls.clear()
+
+    def info(self, symbol, priority=None):
+        self._count("info")
+        rng = _rng("info", symbol)
+        return {
+            "symbol": symbol,
+            "shortName": f"{symbol} Inc.",
+            "sector": SECTORS[int(rng.integers(len(SECTORS)))],
+            "beta": round(float(rng.uniform(0.5, 2.0)), 2),
+            "trailingPE": round(float(rng.uniform(8, 60)), 2),
+            "marketCap": int(rng.uniform(1e9, 3e12)),
+            "dividendYield": round(float(rng.uniform(0, 0.04)), 4),
+            "regularMarketPrice": round(float(rng.uniform(10, 500)), 2),
+        }
+
+    def _frame(self, symbol, period, interval):
+        days = PERIOD_DAYS.get(period, 252)
+        if interval == "1wk":
+            days = max(1, days // 5)
+        rng = _rng("history", symbol)
+        index = pd.bdate_range(end=END_DATE, periods=days, tz="America/New_York", name="Date")
+        close = float(rng.uniform(10, 500)) * np.exp(np.cumsum(rng.normal(0, 0.02, days)))
+        spread = close * rng.uniform(0, 0.02, days)
+        return pd.DataFrame({
+            "Open": close + rng.normal(0, 1, days) * spread,
+            "High": close + spread,
+            "Low": close - spread,
+            "Close": close,
+            "Volume": rng.integers(1e5, 1e7, days),
+        }, index=index)
+
+    def history(self, symbol, period, interval="1d", priority=None):
+        self._count("history")
+        return self._frame(symbol, period, interval)
+
+    def download(self, symbol, period, interval="1d", priority=None):
+        self._count("download")
+        return self._frame(symbol, period, interval)
+
+    def ticker_news(self, symbol, priority=None):
+        self._count("ticker_news")
+        return [
+            {"title": f"{symbol} headline {i}", "link": f"https://example.com/{symbol}/{i}",
+             "publisher": "Example Wire", "providerPublishTime": 1767225600 - i * 3600}
+            for i in range(5)
+        ]
+
+    def news(self, endpoint, params, priority=None, timeout=10):
+        self._count("news")
+        if endpoint == "retrieve-news":
+            return {"news": [
+                {"id": int(i), "text": f"Synthetic article {int(i) - 100000}. " * 40}
+                for i in str(params.get("ids", "")).split(",") if i
+            ]}
+        page_size = int(params.get("page-size", 10))
+        page = int(params.get("page", 1))
+        query = params.get("q") or params.get("text") or ""
+        terms = [t for t in query.split(" OR ") if t] or ["market"]
+        # 10 pages of articles, one an hour back from now, newest first;
+        # the publish-date bounds select from them like the real API
+        latest = datetime.now().replace(minute=0, second=0, microsecond=0)
+        since = params.get("earliest-publish-date")
+        until = params.get("latest-publish-date")
+        matching = [
+            n for n in range(10 * page_size)
+            if (not since or latest - timedelta(hours=n) >= datetime.fromisoformat(since))
+            and (not until or latest - timedelta(hours=n) <= datetime.fromisoformat(until))
+        ]
+        news = []
+        for n in matching[(page - 1) * page_size:page * page_size]:
+            term = terms[n % len(terms)]
+            news.append({
+                "id": 100000 + n,
+                "title": f"{term} shares move on synthetic news {n}",
+                "text": f"Synthetic article {n} about {term}. " * 40,
+                "url": f"https://example.com/news/{n}",
+                "publish_date": (latest - timedelta(hours=n)).strftime("%Y-%m-%d %H:%M:%S"),
+                "authors": ["Bench Writer"],
+            })
+        return {"news": news, "total_results": len(matching)}
@@ -0,0 +1,487 @@
+"""Market data and news providers with record/replay support.
+
+Every upstream call the apps make goes through one provider object:
+
+    info(symbol)                      yf.Ticker(symbol).info
+    history(symbol, period, interval) yf.Ticker(symbol).history(...)
+    download(symbol, period, interval) yf.download(...)
+    ticker_news(symbol)               yf.Ticker(symbol).news
+    news(endpoint, params)            World News API JSON (search-news, ...)
+
+The provider is picked with the PORTFOLIO_DATA_MODE environment variable:
+
+    live    (default) call the upstreams through the shared rate limiter,
+            reading through the local cache (see below)
+    record  call the upstreams and save every response under the fixture dir
+    replay  serve saved responses only, with injected latency; no network
+
+In live mode responses are kept in a local cache (PORTFOLIO_CACHE, default
+data/cache) and served from there while younger than their kind's max age
+in CACHE_MAX_AGE: .info and the one-year daily bars behind the risk figures
+for 26 hours, so a nightly warm run (warm_cache.py) covers the next day;
+other price history and news for 5 minutes, so quotes stay current.
+PORTFOLIO_CACHE_MAX_AGE overrides it with one number of hours for every kind
+or "kind=hours,..." pairs (e.g. "news=0.5,history:1y=48"); 0 turns the
+cache off. Every .info response that really comes from yfinance is also
+kept as a dated snapshot for the valuation history (fundamentals_store.py).
+
+PORTFOLIO_FIXTURES sets the fixture directory (default data/fixtures).
+PORTFOLIO_REPLAY_LATENCY is either "recorded" (sleep as long as the original
+call took, the default), a number of seconds, or "kind=seconds,..." pairs such
+as "info=0.3,history=0.5,news=0.8". PORTFOLIO_REPLAY_LATENCY_SCALE multiplies
+whatever latency was chosen.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from lazy_import import lazy_module
+from rate_limit import get_limiter, NORMAL
+
+fundamentals_store = lazy_module("fundamentals_store")  # NumPy is only needed once .info is fetched
+
+WORLD_NEWS_API_KEY = os.environ.get("WORLD_NEWS_API_KEY", "6d6d5f5d55b64eab94814259cb0a0841")
+WORLD_NEWS_API_BASE = "https://api.worldnewsapi.com"
+
+FIXTURE_DIR = os.environ.get(
+    "PORTFOLIO_FIXTURES",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "fixtures")
+)
+CACHE_DIR = os.environ.get(
+    "PORTFOLIO_CACHE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "cache")
+)
+# Hours a cached response is served for, by kind; "history:<period>" entries
+# take precedence over "history" for that period
+CACHE_MAX_AGE = {
+    "info": 26.0,
+    "history:1y": 26.0,
+    "history": 5 / 60,
+    "download": 5 / 60,
+    "ticker_news": 5 / 60,
+    "news": 5 / 60,
+}
+
+NEWS_PAGE_SIZE = 10
+NEWS_LOOKBACK_DAYS = 30
+# Crypto pairs are searched for by name (BTC-USD -> Bitcoin)
+NEWS_SEARCH_TERMS = {"BTC-USD": "Bitcoin", "ETH-USD": "Ethereum"}
+
+# Request parameters that change on every call (relative dates, credentials)
+# and are left out of fixture keys so recordings keep matching on replay.
+VOLATILE_PARAMS = ("earliest-publish-date", "latest-publish-date", "api-key")
+# The live cache keeps the date bounds: a refresh, a gap fill and an older
+# page of the same query are different responses.
+SECRET_PARAMS = ("api-key",)
+
+
+class FixtureMissing(LookupError):
+    """Replay mode was asked for a response that was never recorded"""
+
+
+def news_query(symbols, keyword=None):
+    """The search-news query for a portfolio's news (or a keyword search)"""
+    return keyword if keyword else " OR ".join(NEWS_SEARCH_TERMS.get(s, s) for s in symbols)
+
+
+def news_search_params(symbols, page=1, page_size=NEWS_PAGE_SIZE, keyword=None, since=None, until=None):
+    """World News search-news parameters for a portfolio's news page.
+
+    since / until bound the publish dates (API date strings); without since
+    the search goes back NEWS_LOOKBACK_DAYS.
+    """
+    # Truncated to the hour so concurrent sessions build identical requests
+    earliest_date = (datetime.now() - timedelta(days=NEWS_LOOKBACK_DAYS)).replace(minute=0, second=0, microsecond=0)
+    params = {
+        "q": news_query(symbols, keyword),
+        "language": "en",
+        "sort": "date",
+        "page": page,
+        "page-size": page_size,
+        "earliest-publish-date": since or earliest_date.isoformat()
+    }
+    if until:
+        params["latest-publish-date"] = until
+    return params
+
+
+def news_retrieve_params(ids):
+    """World News retrieve-news parameters for full articles by API id"""
+    return {"ids": ",".join(str(i) for i in ids)}
+
+
+class LiveProvider:
+    """Calls yfinance and World News API directly"""
+
+    mode = "live"
+
+    def info(self, symbol, priority=NORMAL):
+        import yfinance as yf
+        info = get_limiter("yfinance").call(lambda: yf.Ticker(symbol).info, priority=priority)
+        try:
+            # Dated snapshot for the valuation history (fundamentals_store.py)
+            fundamentals_store.get_fundamentals_store().record(symbol, info)
+        except Exception:
+            pass  # the history is a by-product; never fail the .info call over it
+        return info
+
+    def history(self, symbol, period, interval="1d", priority=NORMAL):
+        import yfinance as yf
+        return get_limiter("yfinance").call(
+            lambda: yf.Ticker(symbol).history(period=period, interval=interval), priority=priority
+        )
+
+    def download(self, symbol, period, interval="1d", priority=NORMAL):
+        import yfinance as yf
+        return get_limiter("yfinance").call(
+            yf.download, symbol, period=period, interval=interval, progress=False, priority=priority
+        )
+
+    def ticker_news(self, symbol, priority=NORMAL):
+        import yfinance as yf
+        def fetch():
+            ticker = yf.Ticker(symbol)
+            return ticker.news if hasattr(ticker, "news") else []
+        return get_limiter("yfinance").call(fetch, priority=priority)
+
+    def news(self, endpoint, params, priority=NORMAL, timeout=10):
+        import requests
+        def fetch():
+            resp = requests.get(
+                f"{WORLD_NEWS_API_BASE}/{endpoint}", params=params,
+                headers={"x-api-key": WORLD_NEWS_API_KEY}, timeout=timeout
+            )
+            resp.raise_for_status()
+            return resp.json()
+        return get_limiter("worldnews").call(fetch, priority=priority)
+
+
+# --------- Fixture storage ---------
+def fixture_key(kind, *parts, drop=VOLATILE_PARAMS):
+    """Stable key for a call; dict parts are sorted and the params in drop left out"""
+    norm = []
+    for part in parts:
+        if isinstance(part, dict):
+            part = sorted((k, v) for k, v in part.items() if k not in drop)
+        norm.append(part)
+    return json.dumps([kind] + norm, default=str, separators=(",", ":"))
+
+
+def cache_key(kind, *parts):
+    """Key for the live response cache: like fixture_key, but only credentials are dropped"""
+    return fixture_key(kind, *parts, drop=SECRET_PARAMS)
+
+
+def _frame_to_json(df):
+    index = df.index
+    tz = getattr(index, "tz", None)
+    return {
+        "__frame__": True,
+        "tz": str(tz) if tz is not None else None,
+        "unit": getattr(index, "unit", None),
+        "index": [int(v) for v in index.asi8] if hasattr(index, "asi8") else index.tolist(),
+        "index_name": index.name,
+        "columns": [str(c) if not isinstance(c, tuple) else list(c) for c in df.columns],
+        "dtypes": [str(t) for t in df.dtypes],
+        "data": [df.iloc[:, i].tolist() for i in range(df.shape[1])],
+    }
+
+
+def _frame_from_json(obj):
+    import pandas as pd
+    unit = obj.get("unit")
+    if unit is None:
+        index = pd.Index(obj["index"])
+    elif obj["tz"]:
+        index = pd.to_datetime(obj["index"], unit=unit, utc=True).tz_convert(obj["tz"]).as_unit(unit)
+    else:
+        index = pd.to_datetime(obj["index"], unit=unit).as_unit(unit)
+    index.name = obj.get("index_name")
+    columns = [tuple(c) if isinstance(c, list) else c for c in obj["columns"]]
+    df = pd.DataFrame({i: pd.Series(col, index=index) for i, col in enumerate(obj["data"])}, index=index)
+    df = df.astype({i: t for i, t in enumerate(obj["dtypes"])})
+    df.columns = pd.MultiIndex.from_tuples(columns) if columns and isinstance(columns[0], tuple) else columns
+    return df
+
+
+def _encode(value):
+    if hasattr(value, "to_numpy") and hasattr(value, "columns"):
+        return _frame_to_json(value)
+    return value
+
+
+def _decode(value):
+    if isinstance(value, dict) and value.get("__frame__"):
+        return _frame_from_json(value)
+    return value
+
+
+class FixtureStore:
+    """One JSON file per recorded call: <dir>/<kind>/<sha1 of key>.json"""
+
+    def __init__(self, root=FIXTURE_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+
+    def path(self, kind, key):
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.root, kind, f"{digest}.json")
+
+    def save(self, kind, key, value, elapsed):
+        path = self.path(kind, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        record = {"key": key, "elapsed": elapsed, "recorded_at": time.time(), "value": _encode(value)}
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False, default=str)
+        with self._lock:
+            os.replace(tmp, path)
+
+    def recorded_at(self, kind, key):
+        """Epoch seconds the call was saved, or None if it never was"""
+        try:
+            return os.path.getmtime(self.path(kind, key))
+        except OSError:
+            return None
+
+    def load(self, kind, key):
+        """(value, elapsed seconds) or raise FixtureMissing"""
+        path = self.path(kind, key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                record = json.load(f)
+        except FileNotFoundError:
+            raise FixtureMissing(key) from None
+        return _decode(record["value"]), record.get("elapsed", 0.0)
+
+
+class RecordingProvider:
+    """Live calls whose responses (and timings) are saved as fixtures"""
+
+    mode = "record"
+
+    def __init__(self, store=None, live=None):
+        self.store = store or FixtureStore()
+        self.live = live or LiveProvider()
+
+    def _record(self, kind, key, fn, *args, **kwargs):
+        start = time.perf_counter()
+        value = fn(*args, **kwargs)
+        self.store.save(kind, key, value, time.perf_counter() - start)
+        return value
+
+    def info(self, symbol, priority=NORMAL):
+        return self._record("info", fixture_key("info", symbol), self.live.info, symbol, priority=priority)
+
+    def history(self, symbol, period, interval="1d", priority=NORMAL):
+        key = fixture_key("history", symbol, period, interval)
+        return self._record("history", key, self.live.history, symbol, period, interval, priority=priority)
+
+    def download(self, symbol, period, interval="1d", priority=NORMAL):
+        key = fixture_key("download", symbol, period, interval)
+        return self._record("download", key, self.live.download, symbol, period, interval, priority=priority)
+
+    def ticker_news(self, symbol, priority=NORMAL):
+        key = fixture_key("ticker_news", symbol)
+        return self._record("ticker_news", key, self.live.ticker_news, symbol, priority=priority)
+
+    def news(self, endpoint, params, priority=NORMAL, timeout=10):
+        key = fixture_key("news", endpoint, params)
+        return self._record("news", key, self.live.news, endpoint, params, priority=priority, timeout=timeout)
+
+
+def parse_latency(spec):
+    """"recorded" -> None, "0.2" -> 0.2, "info=0.3,news=1" -> {"info": 0.3, "news": 1.0}"""
+    spec = (spec or "recorded").strip()
+    if spec == "recorded":
+        return None
+    if "=" in spec:
+        return {k.strip(): float(v) for k, v in (item.split("=", 1) for item in spec.split(",") if item)}
+    return float(spec)
+
+
+def parse_max_age(spec):
+    """PORTFOLIO_CACHE_MAX_AGE as {kind: hours}.
+
+    "" -> CACHE_MAX_AGE, "12" -> 12 hours for every kind, "news=0.5,info=48"
+    -> CACHE_MAX_AGE with those kinds replaced. Raises ValueError otherwise.
+    """
+    spec = (spec or "").strip()
+    ages = dict(CACHE_MAX_AGE)
+    if not spec:
+        return ages
+    if "=" not in spec:
+        hours = float(spec)
+        return {kind: hours for kind in ages}
+    for item in spec.split(","):
+        kind, sep, hours = item.partition("=")
+        if not sep or not kind.strip():
+            raise ValueError(f"PORTFOLIO_CACHE_MAX_AGE: expected kind=hours, got {item!r}")
+        ages[kind.strip()] = float(hours)
+    return ages
+
+
+def cache_max_age(ages, kind, period=None):
+    """Hours a response of kind (and history period) is served for, ages being {kind: hours} or one number"""
+    if not isinstance(ages, dict):
+        return ages
+    for name in (f"{kind}:{period}", kind):
+        if name in ages:
+            return ages[name]
+    return CACHE_MAX_AGE.get(kind, 0)
+
+
+def cacheable(interval):
+    """Intraday bars go stale within minutes and are never cached"""
+    return not interval.endswith(("m", "h"))
+
+
+class CachedProvider:
+    """Read-through local cache in front of another provider.
+
+    Responses younger than max_age hours (a number, or {kind: hours} as in
+    CACHE_MAX_AGE) are served from the store without calling the upstream.
+    Kinds with a max age of 0 are not cached at all.
+    """
+
+    mode = "live"
+
+    def __init__(self, upstream=None, store=None, max_age=None):
+        self.upstream = upstream or LiveProvider()
+        self.store = store or FixtureStore(CACHE_DIR)
+        self.max_age = CACHE_MAX_AGE if max_age is None else max_age
+
+    def _max_age(self, kind, period=None):
+        return cache_max_age(self.max_age, kind, period) * 3600
+
+    def fresh(self, kind, key, max_age=None):
+        """True when a cached response for key is younger than max_age seconds"""
+        saved = self.store.recorded_at(kind, key)
+        limit = self._max_age(kind) if max_age is None else max_age
+        return saved is not None and time.time() - saved <= limit
+
+    def _cached(self, kind, key, fn, *args, max_age=None, **kwargs):
+        max_age = self._max_age(kind) if max_age is None else max_age
+        if max_age <= 0:
+            return fn(*args, **kwargs)
+        if self.fresh(kind, key, max_age):
+            try:
+                return self.store.load(kind, key)[0]
+            except (FixtureMissing, ValueError, KeyError):
+                pass  # removed or half-written meanwhile; fetch again
+        start = time.perf_counter()
+        value = fn(*args, **kwargs)
+        self.store.save(kind, key, value, time.perf_counter() - start)
+        return value
+
+    def info(self, symbol, priority=NORMAL):
+        return self._cached("info", fixture_key("info", symbol), self.upstream.info, symbol, priority=priority)
+
+    def history(self, symbol, period, interval="1d", priority=NORMAL):
+        if not cacheable(interval):
+            return self.upstream.history(symbol, period, interval, priority=priority)
+        key = fixture_key("history", symbol, period, interval)
+        return self._cached(
+            "history", key, self.upstream.history, symbol, period, interval,
+            max_age=self._max_age("history", period), priority=priority
+        )
+
+    def download(self, symbol, period, interval="1d", priority=NORMAL):
+        if not cacheable(interval):
+            return self.upstream.download(symbol, period, interval, priority=priority)
+        key = fixture_key("download", symbol, period, interval)
+        return self._cached(
+            "download", key, self.upstream.download, symbol, period, interval,
+            max_age=self._max_age("download", period), priority=priority
+        )
+
+    def ticker_news(self, symbol, priority=NORMAL):
+        key = fixture_key("ticker_news", symbol)
+        return self._cached("ticker_news", key, self.upstream.ticker_news, symbol, priority=priority)
+
+    def news(self, endpoint, params, priority=NORMAL, timeout=10):
+        key = cache_key("news", endpoint, params)
+        return self._cached("news", key, self.upstream.news, endpoint, params, priority=priority, timeout=timeout)
+
+
+class ReplayProvider:
+    """Serves recorded fixtures with injected latency and never touches the network"""
+
+    mode = "replay"
+
+    def __init__(self, store=None, latency=None, scale=1.0):
+        self.store = store or FixtureStore()
+        self.latency = latency
+        self.scale = scale
+
+    def _delay(self, kind, recorded):
+        if self.latency is None:
+            delay = recorded
+        elif isinstance(self.latency, dict):
+            delay = self.latency.get(kind, recorded)
+        else:
+            delay = self.latency
+        delay *= self.scale
+        if delay > 0:
+            time.sleep(delay)
+
+    def _replay(self, kind, key):
+        value, elapsed = self.store.load(kind, key)
+        self._delay(kind, elapsed)
+        return value
+
+    def info(self, symbol, priority=NORMAL):
+        return self._replay("info", fixture_key("info", symbol))
+
+    def history(self, symbol, period, interval="1d", priority=NORMAL):
+        return self._replay("history", fixture_key("history", symbol, period, interval))
+
+    def download(self, symbol, period, interval="1d", priority=NORMAL):
+        return self._replay("download", fixture_key("download", symbol, period, interval))
+
+    def ticker_news(self, symbol, priority=NORMAL):
+        return self._replay("ticker_news", fixture_key("ticker_news", symbol))
+
+    def news(self, endpoint, params, priority=NORMAL, timeout=10):
+        return self._replay("news", fixture_key("news", endpoint, params))
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def create_provider(mode=None, fixture_dir=None):
+    """Build a provider for mode ("live", "record", "replay")"""
+    mode = (mode or os.environ.get("PORTFOLIO_DATA_MODE", "live")).lower()
+    store = FixtureStore(fixture_dir or FIXTURE_DIR)
+    if mode == "record":
+        return RecordingProvider(store)
+    if mode == "replay":
+        latency = parse_latency(os.environ.get("PORTFOLIO_REPLAY_LATENCY"))
+        scale = float(os.environ.get("PORTFOLIO_REPLAY_LATENCY_SCALE", "1"))
+        return ReplayProvider(store, latency, scale)
+    if mode == "live":
+        max_age = parse_max_age(os.environ.get("PORTFOLIO_CACHE_MAX_AGE"))
+        if not any(max_age.values()):
+            return LiveProvider()
+        return CachedProvider(LiveProvider(), FixtureStore(CACHE_DIR), max_age)
+    raise ValueError(f"Unknown data mode: {mode}")
+
+
+def get_provider():
+    """The provider shared by the whole process"""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = create_provider()
+        return _provider
+
+
+def set_provider(provider):
+    """Swap the process-wide provider (benchmarks install stubs this way)"""
+    global _provider
+    with _provider_lock:
+        _provider = provider
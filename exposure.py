@@ -0,0 +1,127 @@
+"""Consolidated exposure across many portfolios.
+
+All portfolios are held as one sparse portfolio x symbol weight matrix W in
+coordinate form (row, column, weight arrays; each row sums to 1). With a
+capital vector c, the money in every symbol is the single sparse product
+c @ W, done with np.bincount over the non-zeros, and every aggregate (asset
+type, sector, region, beta) is one more grouped sum or dot product over the
+symbol vector. Cost is O(non-zeros + symbols) with no Python loop per
+portfolio, so hundreds of portfolios over thousands of symbols stay cheap.
+"""
+import os
+import threading
+import time
+
+from asset_registry import get_registry
+from data_provider import cache_max_age, parse_max_age
+from lazy_import import lazy_module
+from portfolio import as_portfolio
+
+np = lazy_module("numpy")
+
+
+class HoldingsMatrix:
+    """Sparse portfolio x symbol matrix of normalised weights"""
+
+    def __init__(self, portfolios):
+        portfolios = [as_portfolio(p) for p in portfolios]
+        self.names = [p.name for p in portfolios]
+        index = {}
+        rows, cols, data = [], [], []
+        for r, p in enumerate(portfolios):
+            weights = p.weight_array
+            held = np.flatnonzero(weights > 0)
+            symbols = p.symbols
+            rows.append(np.full(len(held), r, dtype=np.int64))
+            cols.append(np.fromiter((index.setdefault(symbols[i], len(index)) for i in held.tolist()),
+                                    dtype=np.int64, count=len(held)))
+            data.append(weights[held])
+        self.index = index
+        self.symbols = list(index)
+        self.rows = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+        self.cols = np.concatenate(cols) if cols else np.zeros(0, dtype=np.int64)
+        data = np.concatenate(data) if data else np.zeros(0)
+        totals = np.bincount(self.rows, weights=data, minlength=len(self.names))
+        self.data = data / totals[self.rows] if len(data) else data
+        self.shape = (len(self.names), len(self.symbols))
+
+    @property
+    def nnz(self):
+        return len(self.data)
+
+    def symbol_exposure(self, capital=None):
+        """Money per symbol: capital @ W (equal capital when None)"""
+        capital = np.ones(self.shape[0]) if capital is None else np.asarray(capital, dtype=np.float64)
+        return np.bincount(self.cols, weights=self.data * capital[self.rows], minlength=self.shape[1])
+
+
+def _grouped(codes, labels, amounts, total):
+    sums = np.bincount(codes, weights=amounts, minlength=len(labels))
+    return {labels[k]: float(sums[k] / total * 100) for k in np.flatnonzero(sums)}
+
+
+def consolidate(matrix, capital=None, betas=None, registry=None):
+    """Aggregate exposure in percent of total capital.
+
+    betas is an array per matrix.symbols (NaN = unknown, counted as 1.0),
+    as fill_fundamentals returns it; without it the registry betas are used.
+    Sector exposure covers stocks only, as in the single-portfolio view, and
+    is given in percent of the stock part.
+    """
+    registry = registry or get_registry()
+    amounts = matrix.symbol_exposure(capital)
+    total = amounts.sum()
+    if total <= 0:
+        return None
+    result = {}
+    for field in ("asset_type", "region"):
+        codes, labels = registry.codes(matrix.symbols, field)
+        result[field] = _grouped(codes, labels, amounts, total)
+    type_codes, type_labels = registry.codes(matrix.symbols, "asset_type")
+    stock = type_codes == type_labels.index("Stock") if "Stock" in type_labels else np.zeros(len(amounts), bool)
+    codes, labels = registry.codes(matrix.symbols, "sector")
+    stock_total = amounts[stock].sum()
+    result["sector"] = _grouped(codes[stock], labels, amounts[stock], stock_total) if stock_total > 0 else {}
+    if betas is None:
+        betas = registry.values(matrix.symbols, "beta")
+    result["beta"] = float(np.dot(np.where(np.isnan(betas), 1.0, betas), amounts) / total)
+    result["symbols"] = amounts / total * 100
+    result["total_capital"] = float(total)
+    return result
+
+
+_info_betas = {}   # symbol -> (time fetched, .info beta or NaN when .info has none)
+_info_lock = threading.Lock()
+# Seconds a fetched .info beta is used for: as long as the provider caches .info
+INFO_MAX_AGE = cache_max_age(parse_max_age(os.environ.get("PORTFOLIO_CACHE_MAX_AGE")), "info") * 3600
+
+
+def fill_fundamentals(symbols, info_for, registry=None):
+    """Betas per symbol for consolidate(), from .info fetched at most once per INFO_MAX_AGE.
+
+    The source order is that of the single-portfolio view
+    (portfolio_analytics.beta): the .info beta, then the registry's, NaN
+    when neither has one. info_for returns None when .info cannot be
+    fetched; such a symbol falls back to the registry this time and is
+    fetched again on the next call. Stock sectors missing from the registry
+    are taken from the same .info and added to it in one bulk update.
+    """
+    registry = registry or get_registry()
+    now = time.time()
+    with _info_lock:
+        betas = {s: _info_betas[s][1] for s in symbols
+                 if s in _info_betas and now - _info_betas[s][0] <= INFO_MAX_AGE}
+    fetched = {}
+    for s in dict.fromkeys(s for s in symbols if s not in betas):
+        info = info_for(s)
+        if info is None:
+            continue
+        betas[s] = round(float(info["beta"]), 2) if isinstance(info.get("beta"), (int, float)) else np.nan
+        with _info_lock:
+            _info_betas[s] = (time.time(), betas[s])
+        if info.get("sector") and registry.asset_type(s) == "Stock" and not registry.get(s, "sector"):
+            fetched[s] = {"sector": info["sector"]}
+    if fetched:
+        registry.update(fetched)
+    betas = np.array([betas.get(s, np.nan) for s in symbols], dtype=np.float64)
+    return np.where(np.isnan(betas), registry.values(symbols, "beta"), betas)
@@ -0,0 +1,45 @@
+"""Cross-process file locks.
+
+The Streamlit app, warm_cache.py and report_portfolios.py can run at the
+same time against the same data/ files. locked(path) holds an exclusive
+lock on path + ".lock" for the duration of a read-modify-write, so one
+process's update cannot overwrite another's. Threads of one process are
+serialised as well.
+"""
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+_thread_locks = {}
+_thread_locks_lock = threading.Lock()
+
+
+def _thread_lock(path):
+    with _thread_locks_lock:
+        return _thread_locks.setdefault(os.path.abspath(path), threading.Lock())
+
+
+@contextmanager
+def locked(path):
+    """Exclusive lock on path (through path + ".lock") across threads and processes"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with _thread_lock(path), open(path + ".lock", "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
@@ -0,0 +1,212 @@
+"""Point-in-time fundamentals history.
+
+Every .info fetch from yfinance (data_provider.LiveProvider.info) records a
+dated snapshot of FIELDS, so portfolio P/E, beta and dividend yield can be
+charted as they were on past days without fetching anything again.
+
+Snapshots are kept in columns, one array per column, sorted by (symbol, day):
+
+    symbols   distinct symbols
+    symbol    index into symbols (int32), one per snapshot
+    day       UTC date of the fetch, in days since 1970-01-01 (int32)
+    <field>   the .info value (float64, NaN when .info did not have it)
+
+There is one snapshot per symbol and day; the last fetch of a day wins. The
+arrays live in data/fundamentals.npz. New snapshots are appended to
+data/fundamentals.jsonl and folded into the .npz once COMPACT_ROWS have
+collected, so a fetch costs one short append instead of a rewrite. Several
+processes (the app, warm_cache.py) append to the same journal: appends and
+compaction hold a cross-process lock (file_lock.py), and compaction
+re-reads both files under it, so rows other processes appended are folded
+in rather than truncated away. Unreadable journal lines are skipped.
+
+as_of(symbols, dates) answers "what did .info say on each date": the latest
+snapshot on or before it, found with one binary search per symbol over that
+symbol's run of days.
+"""
+import json
+import math
+import os
+import threading
+import time
+
+from file_lock import locked
+from lazy_import import lazy_module
+
+np = lazy_module("numpy")
+
+_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+FUNDAMENTALS_PATH = os.environ.get("PORTFOLIO_FUNDAMENTALS", os.path.join(_DATA_DIR, "fundamentals.npz"))
+COMPACT_ROWS = 500
+
+# .info fields kept per snapshot
+FIELDS = ("beta", "trailingPE", "forwardPE", "priceToBook", "marketCap", "dividendYield")
+
+
+def _days(dates):
+    """Day numbers (days since 1970-01-01) of dates, datetimes or datetime64 values"""
+    return np.asarray(dates, dtype="datetime64[D]").astype(np.int64)
+
+
+def _number(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        return None
+    return float(value)
+
+
+class FundamentalsStore:
+    """Dated .info snapshots in columnar arrays, shared by the whole process"""
+
+    def __init__(self, path=FUNDAMENTALS_PATH):
+        self.path = path
+        self.log_path = os.path.splitext(path)[0] + ".jsonl"
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._reset()
+
+    def _reset(self):
+        self._symbols = []
+        self._codes = {}
+        self._symbol = np.zeros(0, dtype=np.int32)
+        self._day = np.zeros(0, dtype=np.int32)
+        self._values = {f: np.zeros(0) for f in FIELDS}
+        self._pending = []   # snapshots not merged into the arrays yet
+        self._logged = 0     # snapshots in the journal
+
+    def _read_journal(self):
+        rows = []
+        try:
+            with open(self.log_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        row = json.loads(line)
+                    except ValueError:
+                        continue  # e.g. a line cut short by a crash
+                    if isinstance(row, dict) and isinstance(row.get("symbol"), str) and isinstance(row.get("day"), int):
+                        rows.append(row)
+        except FileNotFoundError:
+            pass
+        return rows
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                self._symbols = [str(s) for s in data["symbols"]]
+                self._symbol = data["symbol"]
+                self._day = data["day"]
+                # Fields added to FIELDS later read as missing in old files
+                self._values = {f: data[f] if f in data.files else np.full(len(self._day), np.nan) for f in FIELDS}
+        except FileNotFoundError:
+            pass
+        self._codes = {s: i for i, s in enumerate(self._symbols)}
+        self._pending = self._read_journal()
+        self._logged = len(self._pending)
+
+    def _merge(self):
+        """Fold pending snapshots into the arrays"""
+        if not self._pending:
+            return
+        for row in self._pending:
+            if row["symbol"] not in self._codes:
+                self._codes[row["symbol"]] = len(self._symbols)
+                self._symbols.append(row["symbol"])
+        symbol = np.concatenate([self._symbol, [self._codes[r["symbol"]] for r in self._pending]]).astype(np.int32)
+        day = np.concatenate([self._day, [r["day"] for r in self._pending]]).astype(np.int32)
+        values = {
+            f: np.concatenate([self._values[f], [r.get(f, np.nan) for r in self._pending]]).astype(np.float64)
+            for f in FIELDS
+        }
+        # Sort by (symbol, day), later rows last, and keep the last row of each day
+        order = np.lexsort((np.arange(len(day)), day, symbol))
+        symbol, day = symbol[order], day[order]
+        last = np.ones(len(day), dtype=bool)
+        last[:-1] = (symbol[1:] != symbol[:-1]) | (day[1:] != day[:-1])
+        self._symbol, self._day = symbol[last], day[last]
+        self._values = {f: v[order][last] for f, v in values.items()}
+        self._pending = []
+
+    def _compact(self):
+        """Fold the journal into the .npz and empty it, re-reading both under the file lock"""
+        with locked(self.path):
+            self._reset()
+            self._loaded = False
+            self._load()
+            self._merge()
+            tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                np.savez_compressed(
+                    f, symbols=np.array(self._symbols, dtype=str), symbol=self._symbol, day=self._day, **self._values
+                )
+            os.replace(tmp, self.path)
+            open(self.log_path, "w").close()
+            self._logged = 0
+
+    def record(self, symbol, info, when=None):
+        """Save today's (or when's, a Unix time) snapshot of an .info dict"""
+        row = {f: _number((info or {}).get(f)) for f in FIELDS}
+        row = {f: v for f, v in row.items() if v is not None}
+        if not row:
+            return False
+        row["symbol"] = symbol
+        row["day"] = int((time.time() if when is None else when) // 86400)
+        with self._lock:
+            self._load()
+            with locked(self.path), open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(row) + "\n")
+            self._pending.append(row)
+            self._logged += 1
+            if self._logged >= COMPACT_ROWS:
+                self._compact()
+        return True
+
+    def span(self, symbols):
+        """(first, last) snapshot date over symbols as datetime64[D], or None"""
+        with self._lock:
+            self._load()
+            self._merge()
+            codes = [self._codes[s] for s in symbols if s in self._codes]
+            if not codes:
+                return None
+            days = self._day[np.isin(self._symbol, codes)]
+        return days.min().astype("datetime64[D]"), days.max().astype("datetime64[D]")
+
+    def as_of(self, symbols, dates, fields=FIELDS):
+        """Each field as it was on each date, per symbol.
+
+        Returns ({field: array of shape (len(symbols), len(dates))}, known),
+        values taken from the latest snapshot on or before the date; known
+        marks the cells that have a snapshot at all. Missing values are NaN.
+        """
+        days = _days(dates)
+        values = {f: np.full((len(symbols), len(days)), np.nan) for f in fields}
+        known = np.zeros((len(symbols), len(days)), dtype=bool)
+        with self._lock:
+            self._load()
+            self._merge()
+            for i, symbol in enumerate(symbols):
+                code = self._codes.get(symbol)
+                if code is None:
+                    continue
+                lo = np.searchsorted(self._symbol, code, side="left")
+                hi = np.searchsorted(self._symbol, code, side="right")
+                at = np.searchsorted(self._day[lo:hi], days, side="right") - 1
+                known[i] = at >= 0
+                for f in fields:
+                    values[f][i, known[i]] = self._values[f][lo:hi][at[known[i]]]
+        return values, known
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_fundamentals_store():
+    """The store shared by the whole process"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = FundamentalsStore()
+        return _store
@@ -0,0 +1,182 @@
+"""Lightweight per-rerun timing spans and counters.
+
+A rerun of the Streamlit app calls start_run() at the top and finish_run() at
+the bottom. In between, span("name") times a block and count("name", label)
+bumps a counter; both are recorded for the current run (shown in the debug
+sidebar) and folded into process-wide totals that finish_run() writes as a
+Prometheus text file.
+
+When no run is active (instrumentation turned off, or code running outside the
+Streamlit script thread) span() returns a shared no-op context manager and
+count() returns immediately, so the cost is one context-variable lookup.
+"""
+import contextvars
+import os
+import threading
+import time
+from collections import defaultdict
+
+METRICS_FILE = os.environ.get(
+    "PORTFOLIO_METRICS_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "metrics.prom")
+)
+PREFIX = "portfolio"
+
+
+def debug_enabled(query_params=None):
+    """Instrumentation is opt-in: PORTFOLIO_DEBUG=1 or ?debug=1 in the URL"""
+    if os.environ.get("PORTFOLIO_DEBUG", "").lower() in ("1", "true", "yes"):
+        return True
+    return bool(query_params) and query_params.get("debug") in ("1", "true")
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class RunRecorder:
+    """Spans and counters of one rerun"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.duration = None
+        self.spans = []  # [name, depth, offset_s, duration_s]
+        self.counters = defaultdict(int)  # (name, label) -> value
+        self.depth = 0
+
+    def span_totals(self):
+        """name -> (count, total seconds), in first-seen order"""
+        totals = {}
+        for name, _, _, duration in self.spans:
+            n, total = totals.get(name, (0, 0.0))
+            totals[name] = (n + 1, total + (duration or 0.0))
+        return totals
+
+
+class _Span:
+    __slots__ = ("rec", "name", "t0", "entry")
+
+    def __init__(self, rec, name):
+        self.rec = rec
+        self.name = name
+
+    def __enter__(self):
+        rec = self.rec
+        self.t0 = time.perf_counter()
+        self.entry = [self.name, rec.depth, self.t0 - rec.start, None]
+        rec.spans.append(self.entry)
+        rec.depth += 1
+        return self
+
+    def __exit__(self, *exc):
+        duration = time.perf_counter() - self.t0
+        self.entry[3] = duration
+        self.rec.depth -= 1
+        _metrics.observe(self.name, duration)
+        return False
+
+
+class _Metrics:
+    """Process-wide totals across every session"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = defaultdict(int)
+        self.span_count = defaultdict(int)
+        self.span_sum = defaultdict(float)
+        self.runs = 0
+
+    def inc(self, name, label, n):
+        with self._lock:
+            self.counters[(name, label)] += n
+
+    def observe(self, name, seconds):
+        with self._lock:
+            self.span_count[name] += 1
+            self.span_sum[name] += seconds
+
+    def add_run(self, seconds):
+        with self._lock:
+            self.runs += 1
+            self.span_count["rerun"] += 1
+            self.span_sum["rerun"] += seconds
+
+    def to_prometheus(self):
+        with self._lock:
+            lines = [
+                f"# TYPE {PREFIX}_reruns_total counter",
+                f"{PREFIX}_reruns_total {self.runs}",
+            ]
+            names = sorted({name for name, _ in self.counters})
+            for name in names:
+                lines.append(f"# TYPE {PREFIX}_{name}_total counter")
+                for (n, label), value in sorted(self.counters.items()):
+                    if n == name:
+                        lines.append(f'{PREFIX}_{name}_total{{kind="{label}"}} {value}')
+            lines.append(f"# TYPE {PREFIX}_span_seconds summary")
+            for name in sorted(self.span_count):
+                lines.append(f'{PREFIX}_span_seconds_sum{{span="{name}"}} {self.span_sum[name]:.6f}')
+                lines.append(f'{PREFIX}_span_seconds_count{{span="{name}"}} {self.span_count[name]}')
+            return "\n".join(lines) + "\n"
+
+
+_metrics = _Metrics()
+_current = contextvars.ContextVar("portfolio_run", default=None)
+
+
+def start_run(enabled=True):
+    """Begin recording a rerun on this thread; returns the recorder or None"""
+    rec = RunRecorder() if enabled else None
+    _current.set(rec)
+    return rec
+
+
+def current_run():
+    return _current.get()
+
+
+def span(name):
+    """Time a block as part of the current run"""
+    rec = _current.get()
+    if rec is None:
+        return _NULL_SPAN
+    return _Span(rec, name)
+
+
+def count(name, label="", n=1):
+    """Increment a counter for the current run and the process totals"""
+    rec = _current.get()
+    if rec is None:
+        return
+    rec.counters[(name, label)] += n
+    _metrics.inc(name, label, n)
+
+
+def finish_run(path=METRICS_FILE):
+    """Close the current run and write the Prometheus dump; returns the recorder"""
+    rec = _current.get()
+    if rec is None:
+        return None
+    rec.duration = time.perf_counter() - rec.start
+    _metrics.add_run(rec.duration)
+    if path:
+        write_prometheus(path)
+    _current.set(None)
+    return rec
+
+
+def write_prometheus(path=METRICS_FILE):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(_metrics.to_prometheus())
+    os.replace(tmp, path)
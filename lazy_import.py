@@ -0,0 +1,60 @@
+"""Deferred imports for the heavy libraries the apps use.
+
+    pd = lazy_module("pandas")
+
+binds a placeholder module that imports pandas the first time one of its
+attributes is looked up. Startup (and the first Streamlit paint, or the Tk
+window appearing) no longer waits for pandas, matplotlib or requests; each is
+loaded by the first code path that needs it. on_load runs once with the real
+module, e.g. to set matplotlib rcParams before the first figure is made.
+
+After loading, the real module's namespace is copied onto the placeholder so
+later attribute lookups cost the same as on the module itself.
+"""
+import importlib
+import sys
+import threading
+import types
+
+_lock = threading.Lock()
+
+
+class LazyModule(types.ModuleType):
+    """Stands in for a module until it is first used"""
+
+    def __init__(self, name, on_load=None):
+        super().__init__(name)
+        self.__dict__["_lazy_on_load"] = on_load
+        self.__dict__["_lazy_module"] = None
+
+    def _load(self):
+        module = self.__dict__["_lazy_module"]
+        if module is not None:
+            return module
+        module = importlib.import_module(self.__name__)
+        with _lock:
+            if self.__dict__["_lazy_module"] is None:
+                on_load = self.__dict__["_lazy_on_load"]
+                if on_load is not None:
+                    on_load(module)
+                self.__dict__.update(module.__dict__)
+                self.__dict__["_lazy_module"] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = "loaded" if self.__dict__["_lazy_module"] is not None else "not loaded"
+        return f"<lazy module '{self.__name__}' ({state})>"
+
+
+def lazy_module(name, on_load=None):
+    """The module if it is already imported, else a LazyModule placeholder"""
+    module = sys.modules.get(name)
+    if module is not None and on_load is None:
+        return module
+    return LazyModule(name, on_load)
@@ -0,0 +1,137 @@
+"""Near-duplicate detection for syndicated news stories.
+
+Each article is reduced to the set of word pairs (shingles) in its title and
+the start of its body, and that set to a MinHash signature: the minimum of
+PERMUTATIONS independent hashes over the shingles. Two articles agree in any
+one position with probability equal to the Jaccard similarity of their
+shingle sets, so copies of one wire story with a changed byline or a few
+edited words agree almost everywhere and unrelated articles almost nowhere.
+
+Candidates are found with LSH: the signature is cut into BANDS bands of ROWS
+values and each cluster's representative is filed under one bucket per band.
+A new article is compared only with the representatives sharing a whole band
+with it; with 8 bands of 4, a pair with similarity 0.9 shares a band with
+probability > 0.99, one at 0.3 with about 0.06. Buckets hold little more
+than one story, so clustering costs O(1) bucket lookups per article however
+many articles are stored, and signatures are computed for a whole batch at
+once with NumPy.
+"""
+import hashlib
+import re
+
+import numpy as np
+
+PERMUTATIONS = 32
+ROWS = 4
+BANDS = PERMUTATIONS // ROWS
+MIN_SIMILARITY = 0.7   # estimated Jaccard similarity for two articles to be one story
+BODY_WORDS = 300       # syndicated copies differ mostly in trailing boilerplate
+CHUNK = 500            # articles per vectorised block (bounds the shingle x hash matrix)
+
+# Fixed seed: signatures are stored and must stay comparable across runs
+_rng = np.random.default_rng(4145)
+_MUL = _rng.integers(0, 2 ** 64, PERMUTATIONS, dtype=np.uint64) | np.uint64(1)
+_ADD = _rng.integers(0, 2 ** 64, PERMUTATIONS, dtype=np.uint64)
+_BAND_MUL = _rng.integers(0, 2 ** 64, ROWS, dtype=np.uint64) | np.uint64(1)
+_PAIR_MUL = np.uint64(0x9E3779B97F4A7C15)
+_EMPTY = np.uint32(0xFFFFFFFF)
+
+_WORD = re.compile(r"[a-z0-9]+")
+_word_hashes = {}
+
+
+def _words(title, body):
+    # Cut the body before searching it; 20 characters a word is plenty
+    return _WORD.findall(title.lower()) + _WORD.findall(body[:BODY_WORDS * 20].lower())[:BODY_WORDS]
+
+
+def _hash_words(articles):
+    """Make sure every word of the articles has a cached 64-bit hash"""
+    new = set().union(*articles).difference(_word_hashes)
+    if len(_word_hashes) + len(new) > 1_000_000:
+        _word_hashes.clear()
+        new = set().union(*articles)
+    for word in new:
+        # Stable across processes, unlike hash()
+        _word_hashes[word] = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _shingle_hashes(words):
+    h = np.fromiter(map(_word_hashes.__getitem__, words), dtype=np.uint64, count=len(words))
+    return h[:-1] * _PAIR_MUL + h[1:] if len(h) > 1 else h
+
+
+def signatures(texts):
+    """MinHash signatures of (title, body) pairs, one uint32 row per article.
+
+    An article without any words gets an all-0xFFFFFFFF row, which
+    cluster() never matches.
+    """
+    result = np.full((len(texts), PERMUTATIONS), _EMPTY, dtype=np.uint32)
+    for start in range(0, len(texts), CHUNK):
+        words = [_words(title, body) for title, body in texts[start:start + CHUNK]]
+        _hash_words(words)
+        shingles = [_shingle_hashes(w) for w in words]
+        lengths = np.array([len(s) for s in shingles], dtype=np.int64)
+        filled = np.flatnonzero(lengths)
+        if not len(filled):
+            continue
+        hashes = np.concatenate([shingles[i] for i in filled])
+        # Multiply-shift hashing: the high 32 bits of a * x + b, one column per permutation
+        values = ((hashes[:, None] * _MUL + _ADD) >> np.uint64(32)).astype(np.uint32)
+        offsets = np.concatenate(([0], np.cumsum(lengths[filled])[:-1]))
+        result[start + filled] = np.minimum.reduceat(values, offsets, axis=0)
+    return result
+
+
+def band_keys(signatures):
+    """One bucket key per band and article (an array of non-negative int64)"""
+    bands = signatures.reshape(len(signatures), BANDS, ROWS).astype(np.uint64)
+    mixed = (bands * _BAND_MUL).sum(axis=2, dtype=np.uint64)
+    # Band number in the low bits so equal values in different bands differ
+    keys = ((mixed >> np.uint64(4)) << np.uint64(3)) | np.arange(BANDS, dtype=np.uint64)
+    return keys.astype(np.int64)
+
+
+def similarity(a, b):
+    """Estimated Jaccard similarity of two signatures"""
+    return np.count_nonzero(a == b) / PERMUTATIONS
+
+
+def empty(signature):
+    return bool((signature == _EMPTY).all())
+
+
+def cluster(ids, signatures, lookup=None, groups=None):
+    """Cluster representative (an id) for every article of a batch, in order.
+
+    A new article joins the cluster of the most similar representative with
+    similarity >= MIN_SIMILARITY, found in this batch or, through
+    lookup(keys, signature, group) -> representative id or None, among
+    stored ones. Otherwise it starts a cluster of its own and is filed in
+    the buckets (the caller does the same for stored representatives).
+    With groups (one label per article, e.g. its symbol) articles only join
+    clusters of their own group.
+    """
+    keys = band_keys(signatures).tolist()
+    groups = groups or [None] * len(ids)
+    buckets = {}
+    representatives = []
+    for i, signature in enumerate(signatures):
+        if empty(signature):
+            representatives.append(ids[i])
+            continue
+        candidates = {j for key in keys[i] for j in buckets.get((groups[i], key), ())}
+        match, best = None, MIN_SIMILARITY
+        for j in candidates:
+            s = similarity(signature, signatures[j])
+            if s >= best:
+                match, best = ids[j], s
+        if match is None and lookup is not None:
+            match = lookup(keys[i], signature, groups[i])
+        if match is None:
+            match = ids[i]
+            for key in keys[i]:
+                buckets.setdefault((groups[i], key), []).append(i)
+        representatives.append(match)
+    return representatives
@@ -0,0 +1,102 @@
+"""In-memory inverted index from holdings to listed news articles.
+
+One posting list per symbol and asset type: the (published, id) keys of the
+cluster representatives tagged with them, kept sorted as articles are added.
+A holding's view is a slice of its list found by bisection on the date
+bounds; a portfolio's is a k-way merge of its holdings' slices, read only
+as far as the requested window. Neither touches the articles of other
+holdings, so views cost microseconds however large the store grows.
+
+Untagged articles (symbol "OTHER") are also filed by the search query that
+returned them, so a portfolio's list with only its own untagged articles is
+the same merge over one more posting list.
+"""
+import bisect
+import heapq
+import itertools
+
+
+def _newest_first(posting, lo, hi):
+    for i in range(hi - 1, lo - 1, -1):
+        yield posting[i]
+
+
+def _file(lists, rows):
+    for name, asset_type, published, article_id in rows:
+        lists.setdefault(name, {}).setdefault(asset_type, []).append((published, article_id))
+    for kinds in lists.values():
+        for posting in kinds.values():
+            posting.sort()
+
+
+def _find(posting, key):
+    """Position of key in a sorted posting, or None"""
+    i = bisect.bisect_left(posting, key)
+    return i if i < len(posting) and posting[i] == key else None
+
+
+class SymbolIndex:
+    """Sorted (published, id) posting lists by symbol (or query), then asset type"""
+
+    def __init__(self, rows=(), hits=()):
+        """rows are (symbol, asset_type, published, id) tuples; hits are
+        (query, asset_type, published, id) of untagged articles by a query
+        that returned them"""
+        self._postings = {}
+        self._hits = {}
+        _file(self._postings, rows)
+        _file(self._hits, hits)
+
+    def add(self, symbol, asset_type, published, article_id):
+        posting = self._postings.setdefault(symbol, {}).setdefault(asset_type, [])
+        bisect.insort(posting, (published, article_id))
+
+    def remove(self, symbol, asset_type, published, article_id):
+        posting = self._postings.get(symbol, {}).get(asset_type, [])
+        i = _find(posting, (published, article_id))
+        if i is not None:
+            del posting[i]
+
+    def add_hit(self, query, asset_type, published, article_id):
+        """File an untagged article under a query; filing it twice is harmless"""
+        posting = self._hits.setdefault(query, {}).setdefault(asset_type, [])
+        if _find(posting, (published, article_id)) is None:
+            bisect.insort(posting, (published, article_id))
+
+    def remove_hit(self, query, asset_type, published, article_id):
+        posting = self._hits.get(query, {}).get(asset_type, [])
+        i = _find(posting, (published, article_id))
+        if i is not None:
+            del posting[i]
+
+    def _slices(self, symbols=None, asset_type=None, since=None, until=None, query=None):
+        """(posting, lo, hi) of every matching list; since <= published < until"""
+        slices = []
+        lists = [self._postings.get(s, {}) for s in (self._postings if symbols is None else symbols)]
+        if query is not None:
+            lists.append(self._hits.get(query, {}))
+        for kinds in lists:
+            for kind, posting in kinds.items():
+                if asset_type and kind != asset_type:
+                    continue
+                lo = bisect.bisect_left(posting, (since,)) if since else 0
+                hi = bisect.bisect_left(posting, (until,)) if until else len(posting)
+                if hi > lo:
+                    slices.append((posting, lo, hi))
+        return slices
+
+    def count(self, symbols=None, asset_type=None, since=None, until=None, query=None):
+        return sum(hi - lo for _, lo, hi in self._slices(symbols, asset_type, since, until, query))
+
+    def ids(self, offset=0, limit=50, symbols=None, asset_type=None, since=None, until=None, query=None):
+        """Ids of one window of the newest-first list (ties by id, descending).
+
+        query adds the untagged articles filed under that search query.
+        """
+        slices = self._slices(symbols, asset_type, since, until, query)
+        if len(slices) == 1:
+            posting, lo, hi = slices[0]
+            end = max(lo, hi - offset)
+            return [key[1] for key in reversed(posting[max(lo, end - limit):end])]
+        merged = heapq.merge(*(_newest_first(*s) for s in slices), reverse=True)
+        return [key[1] for key in itertools.islice(merged, offset, offset + limit)]
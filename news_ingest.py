@@ -0,0 +1,367 @@
+"""News ingestion pipeline.
+
+Articles reach the local news store (news_store.py) through one streaming
+pipeline, whatever their source:
+
+    sources -> normalize -> dedupe -> tag -> save
+
+Sources are generators of raw (source, item, symbol) records: World News
+search pages (worldnews_source) and yfinance ticker.news for one holding
+(ticker_news_source). merge() drains each on a worker thread of its own and
+yields the records as they arrive, so a slow API does not hold up the
+others. Every later stage is a generator too and save() adds the articles
+to the store in small batches, so memory stays flat however many articles a
+sync brings in.
+
+normalize() maps each source's fields (publish_date / publish-date,
+providerPublishTime / pubDate, ...) onto store rows with UTC publish times,
+dedupe() drops articles seen earlier in the run or stored under another id
+with the same URL, and tag() names the holding an article is about.
+Syndicated copies of a story are clustered by the store itself.
+
+refresh_news() and older_news() are the syncs the apps run. World News
+searches are incremental: the store keeps the newest and oldest publish
+date ingested for every search query (its sync marks), refresh_news() only
+asks for articles published since the newest and older_news() for those
+before the oldest. ticker.news has no date filter, so refresh_news() reads
+the holdings' latest headlines again and the upserts absorb the overlap.
+"""
+import datetime
+import hashlib
+import queue
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asset_registry import get_registry
+from data_provider import get_provider, news_query, news_search_params, NEWS_PAGE_SIZE, NEWS_SEARCH_TERMS
+from rate_limit import INTERACTIVE
+
+BATCH = 100        # articles per store transaction
+BUFFER = 256       # records the sources may fetch ahead of the consumer
+MAX_WORKERS = 8
+TICKER_NEWS_PER_SYNC = 10      # holdings whose ticker.news one refresh reads at most
+TICKER_NEWS_INTERVAL = 15 * 60  # seconds before a holding's ticker.news is read again
+
+_DONE = object()
+
+
+def article_id(item):
+    """The API's id when there is one, else a hash of the URL (or title)"""
+    if item.get("id") is not None:
+        return str(item["id"])
+    return hashlib.sha1((item.get("url") or item.get("title", "")).encode("utf-8")).hexdigest()[:16]
+
+
+def match_symbol(title, symbols):
+    """First symbol named in the title as a word ("BTC" or "Bitcoin" counts for BTC-USD), else "OTHER" """
+    for symbol in symbols:
+        names = {symbol, symbol.replace("-USD", ""), NEWS_SEARCH_TERMS.get(symbol, symbol)}
+        if any(re.search(rf"(?<![A-Za-z0-9]){re.escape(name)}(?![A-Za-z0-9])", title) for name in names):
+            return symbol
+    return "OTHER"
+
+
+def _timestamp(value):
+    """A publish time (ISO text, epoch seconds or milliseconds) as UTC "YYYY-MM-DD HH:MM:SS" """
+    if value in (None, ""):
+        return ""
+    if isinstance(value, (int, float)):
+        seconds = value / 1000 if value > 1e11 else value
+        return datetime.datetime.fromtimestamp(seconds, datetime.timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    try:
+        parsed = datetime.datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return str(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return parsed.strftime("%Y-%m-%d %H:%M:%S")
+
+
+# --------- Sources ---------
+def search_news(params, priority=INTERACTIVE):
+    """World News search-news response"""
+    return get_provider().news("search-news", params, priority=priority)
+
+
+def _total(data):
+    return data.get("total_results", data.get("total-results", 0))
+
+
+def worldnews_source(symbols, keyword=None, search=search_news, page_size=NEWS_PAGE_SIZE, max_pages=1,
+                     since=None, until=None, progress=None):
+    """World News search results, page by page, as ("worldnews", item, None) records.
+
+    Stops at the last page or after max_pages. progress, if given, gets
+    "total", the API's total for the query, "received", the number of
+    results read, and "complete", whether the last page was reached.
+    """
+    if progress is not None:
+        progress["complete"] = False
+    for page in range(1, max_pages + 1):
+        data = search(news_search_params(symbols, page, page_size, keyword, since=since, until=until))
+        items = data.get("news", [])
+        if progress is not None:
+            progress["total"] = _total(data)
+            progress["received"] = progress.get("received", 0) + len(items)
+        for item in items:
+            yield "worldnews", item, None
+        if len(items) < page_size or page * page_size >= _total(data):
+            if progress is not None:
+                progress["complete"] = True
+            break
+
+
+def _ticker_news(symbol):
+    return get_provider().ticker_news(symbol, priority=INTERACTIVE)
+
+
+def ticker_news_source(symbol, fetch=_ticker_news, required=True):
+    """yfinance ticker.news of one holding as ("yfinance", item, symbol) records.
+
+    When not required, a failed fetch ends the source quietly instead of
+    the sync it is part of.
+    """
+    try:
+        items = fetch(symbol) or []
+    except Exception:
+        if required:
+            raise
+        items = []
+    for item in items:
+        yield "yfinance", item, symbol
+
+
+_ticker_news_read = {}  # symbol -> time its ticker.news was last stored, for the whole process
+_ticker_news_lock = threading.Lock()
+
+
+def ticker_news_due(symbols, now=None, limit=TICKER_NEWS_PER_SYNC):
+    """Holdings whose ticker.news is due: not read for TICKER_NEWS_INTERVAL,
+    least recently read first (never read in holding order), at most limit"""
+    now = time.time() if now is None else now
+    with _ticker_news_lock:
+        due = [s for s in dict.fromkeys(symbols)
+               if now - _ticker_news_read.get(s, float("-inf")) >= TICKER_NEWS_INTERVAL]
+        due.sort(key=lambda s: _ticker_news_read.get(s, float("-inf")))
+    return due[:limit]
+
+
+def _ticker_news_stored(symbols, now=None):
+    now = time.time() if now is None else now
+    with _ticker_news_lock:
+        _ticker_news_read.update((s, now) for s in symbols)
+
+
+def merge(sources, workers=MAX_WORKERS, buffer=BUFFER):
+    """Records of several sources as they arrive, each drained on a worker thread.
+
+    The queue between the workers and the consumer holds at most buffer
+    records. The first exception of a source stops the others and is
+    raised here.
+    """
+    sources = list(sources)
+    if not sources:
+        return
+    records = queue.Queue(buffer)
+    stop = threading.Event()
+
+    def put(record):
+        while not stop.is_set():
+            try:
+                records.put(record, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def drain(source):
+        try:
+            for record in source:
+                if not put(record):
+                    return
+        except Exception as e:
+            put(e)
+        finally:
+            put(_DONE)
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(sources))) as pool:
+        for source in sources:
+            pool.submit(drain, source)
+        try:
+            running = len(sources)
+            while running:
+                record = records.get()
+                if record is _DONE:
+                    running -= 1
+                elif isinstance(record, Exception):
+                    raise record
+                else:
+                    yield record
+        finally:
+            # Unblocks workers waiting on a full queue
+            stop.set()
+
+
+# --------- Stages ---------
+def _from_worldnews(item):
+    return {
+        "source": "worldnews",
+        "about": None,
+        "id": article_id(item),
+        "published": _timestamp(item.get("publish_date") or item.get("publish-date")),
+        "title": item.get("title", ""),
+        "author": ", ".join(item.get("authors") or []),
+        "url": item.get("url", ""),
+        "body": item.get("text") or "",
+    }
+
+
+def _from_ticker_news(item, symbol):
+    # yfinance 0.2.50+ nests the story under "content"
+    content = item.get("content") or item
+    url = (content.get("link") or (content.get("canonicalUrl") or {}).get("url")
+           or (content.get("clickThroughUrl") or {}).get("url") or "")
+    uid = item.get("uuid") or item.get("id")
+    return {
+        "source": "yfinance",
+        "about": symbol,
+        "id": f"yf-{uid}" if uid else article_id({"url": url, "title": content.get("title", "")}),
+        "published": _timestamp(content.get("providerPublishTime") or content.get("pubDate")),
+        "title": content.get("title", ""),
+        "author": content.get("publisher") or (content.get("provider") or {}).get("displayName", ""),
+        "url": url,
+        "body": content.get("summary") or "",
+    }
+
+
+def normalize(records):
+    """Store rows, not yet tagged with a holding, from raw source records"""
+    for source, item, symbol in records:
+        yield _from_ticker_news(item, symbol) if source == "yfinance" else _from_worldnews(item)
+
+
+def dedupe(articles, url_owner=None):
+    """Drop articles already seen in this run, or stored under another id with the same URL.
+
+    url_owner(url) returns the id a URL is stored under, or None.
+    """
+    seen_ids, seen_urls = set(), set()
+    for article in articles:
+        url = article["url"]
+        if article["id"] in seen_ids or (url and url in seen_urls):
+            continue
+        if url and url_owner is not None and url_owner(url) not in (None, article["id"]):
+            continue
+        seen_ids.add(article["id"])
+        if url:
+            seen_urls.add(url)
+        yield article
+
+
+def tag(articles, symbols, registry=None):
+    """Tag each article with the holding its source was fetched for, else the first its title names"""
+    registry = registry or get_registry()
+    for article in articles:
+        symbol = article["about"] or match_symbol(article["title"], symbols)
+        article["symbol"] = symbol
+        article["asset_type"] = registry.asset_type(symbol) if symbol != "OTHER" else ""
+        yield article
+
+
+def save(articles, store, keyword=None, batch=BATCH):
+    """Add articles to the store in batches.
+
+    Returns (new articles, (oldest, newest) publish date among the World
+    News ones or None), the range the sync marks are widened by.
+    """
+    new, dates, chunk = 0, None, []
+    for article in articles:
+        chunk.append(article)
+        if len(chunk) >= batch:
+            new += store.add(chunk, keyword=keyword)
+            chunk = []
+        if article["source"] == "worldnews" and article["published"]:
+            published = article["published"]
+            dates = (min(dates[0], published), max(dates[1], published)) if dates else (published, published)
+    if chunk:
+        new += store.add(chunk, keyword=keyword)
+    return new, dates
+
+
+def ingest(sources, store, symbols, keyword=None, registry=None):
+    """Run sources through the pipeline into store; returns what save() does"""
+    articles = tag(dedupe(normalize(merge(sources)), store.url_owner), symbols, registry)
+    return save(articles, store, keyword)
+
+
+# --------- Syncs ---------
+def refresh_news(store, symbols, keyword=None, search=search_news, page_size=NEWS_PAGE_SIZE, max_pages=5,
+                 ticker_news=_ticker_news):
+    """Fetch the articles published since the query's newest stored one.
+
+    The first sync of a query takes only the newest page of the lookback
+    window; older_news() reaches further back. Later syncs read every page
+    of new articles, up to max_pages. When more than that arrived, the
+    unread range between the old newest mark and the oldest article read is
+    kept as the query's gap, and the following syncs page through it first.
+    Without a keyword the ticker.news of up to TICKER_NEWS_PER_SYNC holdings
+    not read for TICKER_NEWS_INTERVAL (ticker_news_due; through
+    ticker_news(symbol), None skips it) is read at the same time, so a
+    sync costs a bounded number of calls however many holdings there are;
+    a failure there does not fail the sync. The marks only move once
+    everything is stored, so a failed sync is simply repeated. Every
+    article is recorded as a hit of the query, so lists can show the
+    untagged ones of this query only. Returns (new articles, API total for
+    the query).
+    """
+    query = news_query(symbols, keyword)
+    since, _ = store.sync_marks(query)
+    new = 0
+    gap = store.sync_gap(query)
+    if gap:
+        gap_progress = {}
+        source = worldnews_source(symbols, keyword, search, page_size, max_pages, since=gap[0], until=gap[1],
+                                  progress=gap_progress)
+        new, dates = ingest([source], store, symbols, query)
+        if gap_progress["complete"]:
+            store.set_sync_gap(query, None)
+        elif dates:
+            store.set_sync_gap(query, gap[0], dates[0])
+    progress = {"total": 0}
+    sources = [worldnews_source(symbols, keyword, search, page_size, max_pages if since else 1, since=since,
+                                progress=progress)]
+    tickers = ticker_news_due(symbols) if ticker_news is not None and not keyword else []
+    sources += [ticker_news_source(symbol, ticker_news, required=False) for symbol in tickers]
+    added, dates = ingest(sources, store, symbols, query)
+    _ticker_news_stored(tickers)
+    if dates:
+        if since and not progress["complete"]:
+            # Articles between the old newest mark and the oldest one read are
+            # still unread; an older gap is folded in so there is only one
+            gap = store.sync_gap(query)
+            store.set_sync_gap(query, gap[0] if gap else since, dates[0])
+        store.widen_marks(query, dates)
+    return new + added, progress["total"]
+
+
+def older_news(store, symbols, keyword=None, search=search_news, page_size=NEWS_PAGE_SIZE,
+               ticker_news=_ticker_news):
+    """Fetch one page of articles published before the query's oldest stored one.
+
+    A query never synced is refreshed instead. Returns (new articles,
+    whether the API may have still older ones).
+    """
+    query = news_query(symbols, keyword)
+    _, until = store.sync_marks(query)
+    if until is None:
+        new, total = refresh_news(store, symbols, keyword, search, page_size, ticker_news=ticker_news)
+        return new, total > page_size
+    progress = {"total": 0, "received": 0}
+    source = worldnews_source(symbols, keyword, search, page_size, until=until, progress=progress)
+    new, dates = ingest([source], store, symbols, query)
+    if dates:
+        store.widen_marks(query, dates)
+    # Nothing new means only the boundary articles (already stored) came back
+    return new, bool(new) and progress["total"] > progress["received"]
@@ -0,0 +1,118 @@
+"""Lexicon sentiment for news articles.
+
+Each article is scored once, at ingest, from its title and the start of its
+body: words from a finance lexicon count +1 or -1, headline words count
+TITLE_WEIGHT times, and a word
+within NEGATION_SPAN words after "not", "no", "without", ... counts with the
+opposite sign. The score is (positive - negative) / (positive + negative +
+SMOOTHING), so it lies in (-1, 1) and an article with one stray word stays
+close to 0.
+
+The lexicon follows Loughran-McDonald: words that sound negative in
+everyday English but are neutral in finance ("liability", "tax", "cost")
+are not scored, nor are its uncertainty words ("risk", "volatile"). Words
+whose tone depends on what they describe ("rate cut" vs "dividend cut",
+"lower costs" vs "lower sales") are left out too.
+
+The only per-word Python work is the regex split and one dict lookup;
+negation, weights and the per-article sums run over the whole batch at once
+with NumPy, which keeps 50k articles well under a minute on one core.
+"""
+import re
+
+import numpy as np
+
+BODY_WORDS = 500       # the lead carries the tone; wire boilerplate follows
+TITLE_WEIGHT = 2
+NEGATION_SPAN = 3
+SMOOTHING = 2.0
+CHUNK = 2000           # articles per vectorised block
+
+POSITIVE = frozenset("""
+    advance advanced advances advancing accelerate accelerated accelerating achieve achieved achievement
+    beat beats beating benefit benefited benefits best better bolster bolstered boom booming boost boosted
+    boosts breakthrough bullish buyback climb climbed climbs confident confidence exceed exceeded exceeds
+    expand expanded expanding expansion favorable gain gained gaining gains good great growth grew grow grows
+    growing improve improved improvement improves improving
+    innovative jump jumped jumps lift lifted lifts momentum optimism optimistic outperform outperformed
+    outperforming outperforms positive profit profitable profitability profits rally rallied rallies rebound
+    rebounded recover recovered recovery resilient rise rises rising rose soar soared soaring soars
+    solid strong stronger strongest success successful surge surged surges surging topped upbeat
+    upgrade upgraded upgrades upside win winning wins
+""".split())
+
+NEGATIVE = frozenset("""
+    adverse bankrupt bankruptcy bearish breach concern concerns crash crashed crashes crisis
+    decline declined declines declining default defaults deficit delay delayed delays downgrade
+    downgraded downgrades drop dropped drops fall fallen falling falls fear fears fell fined fraud hurt
+    investigation lawsuit layoff layoffs litigation lose loses losing loss losses
+    miss missed misses negative penalty plunge plunged plunges plunging probe recall recession
+    selloff shortfall shrink shrinking slide slowdown slowed slows slump slumped slumps struggle
+    struggled struggles struggling sued tumble tumbled tumbles underperform
+    underperformed warn warned warning warns weak weaken weakened weaker weakness worse
+    worst
+""".split())
+
+NEGATORS = frozenset("""
+    not no never without neither nor cannot can't don't doesn't didn't isn't wasn't aren't weren't won't
+    wouldn't hasn't haven't hadn't
+""".split())
+
+_POLARITY = {**{w: 1 for w in POSITIVE}, **{w: -1 for w in NEGATIVE}, **{w: 2 for w in NEGATORS}}
+_WORD = re.compile(r"[a-z]+(?:'[a-z]+)?")
+
+
+def _words(title, body):
+    return _WORD.findall(title.lower()), _WORD.findall(body[:BODY_WORDS * 8].lower())[:BODY_WORDS]
+
+
+def scores(texts):
+    """Sentiment of (title, body) pairs in (-1, 1), one float per article"""
+    result = np.zeros(len(texts))
+    for start in range(0, len(texts), CHUNK):
+        split = [_words(title, body) for title, body in texts[start:start + CHUNK]]
+        title_lengths = np.array([len(t) for t, _ in split], dtype=np.int64)
+        lengths = title_lengths + [len(b) for _, b in split]
+        words = [w for t, b in split for w in t + b]
+        polarity = np.fromiter(map(_POLARITY.get, words, [0] * len(words)), dtype=np.int8, count=len(words))
+        if not polarity.any():
+            continue
+        ends = np.cumsum(lengths)
+        starts = ends - lengths
+        article = np.repeat(np.arange(len(split)), lengths)
+        position = np.arange(len(words))
+        # A word is negated when the last negator before it (in the same
+        # article) is at most NEGATION_SPAN words back
+        negator = polarity == 2
+        last_negator = np.maximum.accumulate(np.where(negator, position, -NEGATION_SPAN - 1))
+        negated = (position - last_negator <= NEGATION_SPAN) & (last_negator >= starts[article]) & ~negator
+        signed = np.where(negator, 0, np.where(negated, -polarity, polarity)).astype(np.float64)
+        signed *= np.where(position - starts[article] < title_lengths[article], TITLE_WEIGHT, 1)
+        positive = np.bincount(article, np.maximum(signed, 0), minlength=len(split))
+        negative = np.bincount(article, np.maximum(-signed, 0), minlength=len(split))
+        result[start:start + len(split)] = (positive - negative) / (positive + negative + SMOOTHING)
+    return result
+
+
+def rolling(days, counts, totals, window):
+    """Rolling mean sentiment over calendar days.
+
+    days are day numbers (e.g. date.toordinal()) with the article count and
+    score total of each; returns (every day from the first to the last,
+    the mean over the window days ending there, weighted by article, NaN
+    where the window holds no articles).
+    """
+    days = np.asarray(days, dtype=np.int64)
+    if not len(days):
+        return days, np.zeros(0)
+    span = np.arange(days.min(), days.max() + 1)
+    count = np.zeros(len(span))
+    total = np.zeros(len(span))
+    np.add.at(count, days - span[0], counts)
+    np.add.at(total, days - span[0], totals)
+    count = np.concatenate(([0], np.cumsum(count)))
+    total = np.concatenate(([0], np.cumsum(total)))
+    lag = np.maximum(np.arange(1, len(span) + 1) - window, 0)
+    n = count[1:] - count[lag]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return span, np.where(n > 0, (total[1:] - total[lag]) / n, np.nan)
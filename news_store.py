@@ -0,0 +1,570 @@
+"""Local news store.
+
+Articles fetched from the news APIs are kept in a SQLite file (data/news.db),
+so news lists are browsed in windows instead of whole result pages held in
+memory:
+
+    headers(offset, limit, ...)   id, date, symbol, asset type, title, url of
+                                  one window of a filtered, newest-first list
+    article(id, retrieve)         the full article, read when it is selected
+
+Article rows hold headers only. Bodies live in a separate table, compressed
+with zlib and capped at BODY_CACHE_SIZE (least recently read go first). The
+search API returns full texts, so bodies are cached as they arrive. A body
+that is not cached is fetched on selection with World News retrieve-news by
+id. Lists, sessions and the Tk app never hold article texts.
+
+Articles come in through the ingestion pipeline in news_ingest.py, which
+merges World News searches and yfinance ticker.news. For every search query
+the store keeps the newest and oldest publish date it has ingested
+(sync_marks), so the pipeline's syncs only fetch articles outside that
+range, and upserts by id make any overlap at the boundaries harmless. A
+sync that stopped before its last page leaves a gap inside the range
+(sync_gap), which later syncs fill.
+
+Lists without a keyword are read through an inverted index from symbol to
+the (publish date, id) keys of its articles (news_index.py), built from the
+file on first use and kept up to date by add(): a holding, a portfolio or a
+date range is listed without scanning other articles. Untagged articles are
+also indexed by the search queries that returned them, for the lists below.
+
+Articles that name none of the holdings are stored under the symbol
+"OTHER" and shared by every query. A holdings list passes its search query
+as untagged to show only the untagged articles that query returned
+(search_hits), not those of every other portfolio's searches.
+
+NewsWindow caches one window of headers around the rows a view shows, so a
+virtual list or an infinite scroll over thousands of articles keeps memory
+proportional to the screen.
+
+The same wire story syndicated by many outlets is stored once per copy but
+listed once: add() clusters near-duplicates (news_dedup.py) and the lists
+show each cluster's first-seen article with "sources", the number of other
+copies. Only copies tagged with the same symbol are clustered, since a
+cluster is listed under its representative's symbol: a copy tagged MSFT
+joining an AAPL story would not appear in MSFT's list.
+
+Articles are scored for sentiment as they are added (news_sentiment.py) and
+the score is stored with the header, so an article is never scored twice.
+sentiment_trend() turns the scores into rolling per-holding averages.
+"""
+import datetime
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from data_provider import get_provider, news_retrieve_params
+from lazy_import import lazy_module
+from news_index import SymbolIndex
+from rate_limit import INTERACTIVE
+
+np = lazy_module("numpy")
+news_dedup = lazy_module("news_dedup")  # NumPy is only needed once articles are added
+news_sentiment = lazy_module("news_sentiment")
+
+NEWS_DB_PATH = os.environ.get(
+    "PORTFOLIO_NEWS_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "news.db")
+)
+BODY_CACHE_SIZE = int(os.environ.get("PORTFOLIO_NEWS_BODIES", "20000"))
+# News tab filter label -> asset_registry asset type
+ASSET_FILTERS = {"All Holdings": None, "Stocks": "Stock", "ETFs": "ETF", "Cryptocurrencies": "Cryptocurrency"}
+# News tab period label -> days back (None: no bound)
+NEWS_PERIODS = {"Any time": None, "Last 24 hours": 1, "Last 7 days": 7, "Last 30 days": 30}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id TEXT PRIMARY KEY,
+    published TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    asset_type TEXT NOT NULL,
+    title TEXT NOT NULL,
+    author TEXT NOT NULL DEFAULT '',
+    url TEXT NOT NULL DEFAULT '',
+    signature BLOB,
+    cluster TEXT,
+    sources INTEGER NOT NULL DEFAULT 0,
+    sentiment REAL
+);
+CREATE TABLE IF NOT EXISTS article_bands (
+    band_key INTEGER NOT NULL,
+    id TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS bodies (
+    id TEXT PRIMARY KEY,
+    body BLOB NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sync_marks (
+    query TEXT PRIMARY KEY,
+    newest TEXT NOT NULL,
+    oldest TEXT NOT NULL,
+    synced REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sync_gaps (
+    query TEXT PRIMARY KEY,
+    since TEXT NOT NULL,
+    until TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS search_hits (
+    keyword TEXT NOT NULL,
+    id TEXT NOT NULL,
+    PRIMARY KEY (keyword, id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS articles_recent ON articles (published, id);
+CREATE INDEX IF NOT EXISTS articles_symbol ON articles (symbol, published DESC);
+CREATE INDEX IF NOT EXISTS articles_cluster ON articles (cluster);
+CREATE INDEX IF NOT EXISTS articles_url ON articles (url);
+CREATE INDEX IF NOT EXISTS article_bands_key ON article_bands (band_key);
+CREATE INDEX IF NOT EXISTS bodies_accessed ON bodies (accessed);
+"""
+# Columns added to article stores created before duplicate clustering and sentiment
+_ADDED_COLUMNS = {
+    "signature": "BLOB", "cluster": "TEXT", "sources": "INTEGER NOT NULL DEFAULT 0", "sentiment": "REAL"
+}
+_HEADER_COLUMNS = "id, published, symbol, asset_type, title, author, url, sources, sentiment"
+# (query, asset type, published, id) of untagged representatives whose cluster a query returned
+_HIT_ROWS = (
+    "SELECT DISTINCT h.keyword, a.asset_type, a.published, a.id FROM articles a "
+    "JOIN articles m ON m.cluster = a.id JOIN search_hits h ON h.id = m.id "
+    "WHERE a.cluster = a.id AND a.symbol = 'OTHER'"
+)
+
+
+def retrieve_news(ids, priority=INTERACTIVE):
+    """World News retrieve-news response for articles by API id"""
+    return get_provider().news("retrieve-news", news_retrieve_params(ids), priority=priority)
+
+
+def published_since(days, now=None):
+    """Lower publish-date bound for a NEWS_PERIODS value, in the API's format (UTC, as publish dates are)"""
+    if days is None:
+        return None
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    return (now - datetime.timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _compress(text):
+    return zlib.compress(text.encode("utf-8"), 6)
+
+
+def _decompress(data):
+    return zlib.decompress(data).decode("utf-8")
+
+
+def _header(row):
+    article_id, published, symbol, asset_type, title, author, url, sources, sentiment = row
+    return {"id": article_id, "date": published, "symbol": symbol, "asset_type": asset_type,
+            "title": title, "author": author, "url": url, "sources": sources, "sentiment": sentiment}
+
+
+class NewsStore:
+    """Articles in one SQLite file, shared by every session of the process"""
+
+    def __init__(self, path=NEWS_DB_PATH):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._index = None
+        with self._lock, self._conn:
+            if path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            # Lists now break publish-date ties by id descending, as the symbol index does
+            self._conn.execute("DROP INDEX IF EXISTS articles_published")
+            columns = {r[1] for r in self._conn.execute("PRAGMA table_info(articles)")}
+            for name, kind in _ADDED_COLUMNS.items():
+                if columns and name not in columns:
+                    self._conn.execute(f"ALTER TABLE articles ADD COLUMN {name} {kind}")
+            self._conn.executescript(_SCHEMA)
+            if "body" in columns:
+                # Stores from before the body cache kept texts in the article rows
+                texts = self._conn.execute("SELECT id, body FROM articles WHERE body != ''").fetchall()
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO bodies VALUES (?, ?, ?)",
+                    [(i, _compress(body), time.time()) for i, body in texts]
+                )
+                try:
+                    self._conn.execute("ALTER TABLE articles DROP COLUMN body")
+                except sqlite3.OperationalError:  # SQLite before 3.35
+                    self._conn.execute("UPDATE articles SET body = ''")
+            unclustered = self._conn.execute(
+                "SELECT a.id, a.title, b.body, a.symbol FROM articles a LEFT JOIN bodies b ON b.id = a.id "
+                "WHERE a.cluster IS NULL ORDER BY a.rowid"
+            ).fetchall()
+            if unclustered:
+                self._cluster([
+                    (i, title, _decompress(body) if body else "", symbol) for i, title, body, symbol in unclustered
+                ])
+            # Articles evicted from the body cache are scored by their title
+            unscored = self._conn.execute(
+                "SELECT a.id, a.title, b.body FROM articles a LEFT JOIN bodies b ON b.id = a.id "
+                "WHERE a.sentiment IS NULL"
+            ).fetchall()
+            if unscored:
+                self._score([(i, title, _decompress(body) if body else "") for i, title, body in unscored])
+
+    def _nearest(self, keys, signature, symbol):
+        """The most similar stored representative tagged symbol sharing a band with signature"""
+        match, best = None, news_dedup.MIN_SIMILARITY
+        for article_id, stored in self._conn.execute(
+            "SELECT DISTINCT a.id, a.signature FROM article_bands b JOIN articles a ON a.id = b.id "
+            f"WHERE b.band_key IN ({','.join('?' * len(keys))}) AND a.symbol = ?", keys + [symbol]
+        ):
+            s = news_dedup.similarity(signature, np.frombuffer(stored, dtype=np.uint32))
+            if s >= best:
+                match, best = article_id, s
+        return match
+
+    def _cluster(self, rows):
+        """Sign new (id, title, body, symbol) rows and file them into clusters of their symbol"""
+        ids = [r[0] for r in rows]
+        signatures = news_dedup.signatures([(r[1], r[2]) for r in rows])
+        clusters = news_dedup.cluster(ids, signatures, self._nearest, [r[3] for r in rows])
+        self._conn.executemany(
+            "UPDATE articles SET signature = ?, cluster = ? WHERE id = ?",
+            [(s.tobytes(), c, i) for i, s, c in zip(ids, signatures, clusters)]
+        )
+        # Only representatives are matched against, so only they are filed
+        self._conn.executemany(
+            "INSERT INTO article_bands VALUES (?, ?)",
+            [(key, i) for i, c, keys in zip(ids, clusters, news_dedup.band_keys(signatures).tolist())
+             if i == c for key in keys]
+        )
+        copies = {}
+        for i, c in zip(ids, clusters):
+            if i != c:
+                copies[c] = copies.get(c, 0) + 1
+        self._conn.executemany(
+            "UPDATE articles SET sources = sources + ? WHERE id = ?", [(n, c) for c, n in copies.items()]
+        )
+
+    def _symbol_index(self):
+        """The symbol index of listed articles, read on first use (call with the lock held)"""
+        if self._index is None:
+            self._index = SymbolIndex(
+                self._conn.execute("SELECT symbol, asset_type, published, id FROM articles WHERE cluster = id"),
+                self._conn.execute(_HIT_ROWS).fetchall()
+            )
+        return self._index
+
+    def _score(self, rows):
+        """Store the sentiment of new (id, title, body) rows"""
+        scores = news_sentiment.scores([(r[1], r[2]) for r in rows])
+        self._conn.executemany(
+            "UPDATE articles SET sentiment = ? WHERE id = ?", [(s, r[0]) for r, s in zip(rows, scores.tolist())]
+        )
+
+    def _cache_bodies(self, texts):
+        """Compress {id: text} into the body cache, evicting the least recently read.
+
+        Bodies already cached are kept as they are: re-syncing an article must
+        not refresh its last-read time, or eviction would follow syncs, not reads.
+        """
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO bodies VALUES (?, ?, ?)",
+            [(i, _compress(text), time.time()) for i, text in texts.items() if text]
+        )
+        excess = self._conn.execute("SELECT COUNT(*) FROM bodies").fetchone()[0] - BODY_CACHE_SIZE
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM bodies WHERE id IN (SELECT id FROM bodies ORDER BY accessed LIMIT ?)", (excess,)
+            )
+
+    def add(self, articles, keyword=None):
+        """Insert or update articles by id; returns how many were new.
+
+        New articles are clustered with their near-duplicates, stored and in
+        this batch, and scored for sentiment; an article keeps its cluster
+        and score when it is updated. Bodies
+        go to the body cache. keyword is the search the articles were found
+        with, so that list filters by it also match on text.
+        """
+        rows, texts = {}, {}
+        for a in articles:
+            rows[a["id"]] = (a["id"], a["published"], a["symbol"], a["asset_type"], a["title"], a["author"],
+                             a["url"])
+            texts[a["id"]] = a.get("body") or ""
+        if not rows:
+            return 0
+        marks = ",".join("?" * len(rows))
+        with self._lock, self._conn:
+            known = {r[0] for r in self._conn.execute(f"SELECT id FROM articles WHERE id IN ({marks})", list(rows))}
+            listed = f"SELECT symbol, asset_type, published, id FROM articles WHERE cluster = id AND id IN ({marks})"
+            hits = f"{_HIT_ROWS} AND a.id IN ({marks})"
+            index = self._symbol_index()
+            for key in self._conn.execute(listed, list(rows)).fetchall():
+                index.remove(*key)
+            for hit in self._conn.execute(hits, list(rows)).fetchall():
+                index.remove_hit(*hit)
+            self._conn.executemany(
+                "INSERT INTO articles (id, published, symbol, asset_type, title, author, url) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (id) DO UPDATE SET "
+                "published = excluded.published, symbol = excluded.symbol, asset_type = excluded.asset_type, "
+                "title = excluded.title, author = excluded.author, url = excluded.url",
+                list(rows.values())
+            )
+            new = [(i, rows[i][4], texts[i], rows[i][2]) for i in rows if i not in known]
+            if new:
+                self._cluster(new)
+                self._score(new)
+            for key in self._conn.execute(listed, list(rows)).fetchall():
+                index.add(*key)
+            self._cache_bodies(texts)
+            if keyword:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO search_hits VALUES (?, ?)", [(keyword.lower(), i) for i in rows]
+                )
+            # A hit on a copy lists its untagged representative under the query
+            clusters = [r[0] for r in self._conn.execute(
+                f"SELECT DISTINCT cluster FROM articles WHERE id IN ({marks})", list(rows)
+            )]
+            for hit in self._conn.execute(f"{_HIT_ROWS} AND a.id IN ({','.join('?' * len(clusters))})", clusters):
+                index.add_hit(*hit)
+        return len(new)
+
+    def sync_marks(self, query):
+        """(newest, oldest) publish dates ingested for a search query, or (None, None)"""
+        with self._lock:
+            row = self._conn.execute("SELECT newest, oldest FROM sync_marks WHERE query = ?", (query,)).fetchone()
+        return tuple(row) if row else (None, None)
+
+    def widen_marks(self, query, published):
+        """Stretch a query's marks over the publish dates of a completed sync"""
+        published = [p for p in published if p]
+        if not published:
+            return
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO sync_marks VALUES (?, ?, ?, ?) ON CONFLICT (query) DO UPDATE SET "
+                "newest = max(newest, excluded.newest), oldest = min(oldest, excluded.oldest), "
+                "synced = excluded.synced",
+                (query, max(published), min(published), time.time())
+            )
+
+    def synced_at(self, query):
+        """When a sync last stored articles of a search query (epoch seconds), or None"""
+        with self._lock:
+            row = self._conn.execute("SELECT synced FROM sync_marks WHERE query = ?", (query,)).fetchone()
+        return row[0] if row else None
+
+    def sync_gap(self, query):
+        """(since, until) publish dates inside a query's marks not fetched yet, or None"""
+        with self._lock:
+            row = self._conn.execute("SELECT since, until FROM sync_gaps WHERE query = ?", (query,)).fetchone()
+        return tuple(row) if row else None
+
+    def set_sync_gap(self, query, since, until=None):
+        """Record a query's unfetched range; since=None clears it"""
+        with self._lock, self._conn:
+            if since is None:
+                self._conn.execute("DELETE FROM sync_gaps WHERE query = ?", (query,))
+            else:
+                self._conn.execute(
+                    "INSERT INTO sync_gaps VALUES (?, ?, ?) ON CONFLICT (query) DO UPDATE SET "
+                    "since = excluded.since, until = excluded.until",
+                    (query, since, until)
+                )
+
+    def url_owner(self, url):
+        """Id of the article stored with this URL, or None"""
+        with self._lock:
+            row = self._conn.execute("SELECT id FROM articles WHERE url = ? LIMIT 1", (url,)).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _where(symbols=None, keyword=None, asset_type=None, since=None, until=None, untagged=True):
+        # Only each cluster's representative is listed
+        clauses, params = ["cluster = id"], []
+        if symbols is not None and isinstance(untagged, str):
+            clauses.append(
+                f"(symbol IN ({','.join('?' * len(symbols))}) OR (symbol = 'OTHER' AND cluster IN "
+                "(SELECT a.cluster FROM search_hits h JOIN articles a ON a.id = h.id WHERE h.keyword = ?)))"
+            )
+            params += list(symbols) + [untagged.lower()]
+        elif symbols is not None:
+            symbols = list(symbols) + (["OTHER"] if untagged else [])
+            clauses.append(f"symbol IN ({','.join('?' * len(symbols))})")
+            params += symbols
+        if asset_type:
+            clauses.append("asset_type = ?")
+            params.append(asset_type)
+        if since:
+            clauses.append("published >= ?")
+            params.append(since)
+        if until:
+            clauses.append("published < ?")
+            params.append(until)
+        if keyword:
+            # Bodies are compressed, so text matches are the articles the API
+            # returned for this keyword (or copies of them)
+            clauses.append(
+                "(title LIKE ? OR symbol LIKE ? OR cluster IN "
+                "(SELECT a.cluster FROM search_hits h JOIN articles a ON a.id = h.id WHERE h.keyword = ?))"
+            )
+            params += [f"%{keyword}%", f"%{keyword}%", keyword.lower()]
+        return " WHERE " + " AND ".join(clauses), params
+
+    @staticmethod
+    def _index_filters(symbols, asset_type, since, until, untagged):
+        query = None
+        if symbols is not None and isinstance(untagged, str):
+            symbols, query = set(symbols), untagged.lower()
+        elif symbols is not None:
+            symbols = set(symbols) | ({"OTHER"} if untagged else set())
+        return {"symbols": symbols, "asset_type": asset_type, "since": since, "until": until, "query": query}
+
+    def count(self, symbols=None, keyword=None, asset_type=None, since=None, until=None, untagged=True):
+        with self._lock:
+            if not keyword:
+                filters = self._index_filters(symbols, asset_type, since, until, untagged)
+                return self._symbol_index().count(**filters)
+            where, params = self._where(symbols, keyword, asset_type, since, until, untagged)
+            return self._conn.execute(f"SELECT COUNT(*) FROM articles{where}", params).fetchone()[0]
+
+    def headers(self, offset=0, limit=50, symbols=None, keyword=None, asset_type=None, since=None, until=None,
+                untagged=True):
+        """One window of the newest-first list, without bodies.
+
+        symbols limits the list to articles about those holdings, plus ones
+        naming none of them (as the API search returns them): all of those
+        when untagged is true, none when it is false, and when it is a
+        search query (data_provider.news_query) the ones that query
+        returned. since and until bound the publish date (since <= date < until).
+        """
+        with self._lock:
+            if keyword:
+                where, params = self._where(symbols, keyword, asset_type, since, until, untagged)
+                rows = self._conn.execute(
+                    f"SELECT {_HEADER_COLUMNS} FROM articles{where} ORDER BY published DESC, id DESC "
+                    "LIMIT ? OFFSET ?",
+                    params + [limit, offset]
+                ).fetchall()
+                return [_header(r) for r in rows]
+            ids = self._symbol_index().ids(
+                offset, limit, **self._index_filters(symbols, asset_type, since, until, untagged)
+            )
+            rows = {r[0]: r for r in self._conn.execute(
+                f"SELECT {_HEADER_COLUMNS} FROM articles WHERE id IN ({','.join('?' * len(ids))})", ids
+            )}
+        return [_header(rows[i]) for i in ids]
+
+    def sentiment_trend(self, symbols, window=7, days=30, today=None):
+        """Rolling mean sentiment per holding, one row per calendar day.
+
+        Rows are {"symbol", "date", "sentiment"}: the mean score of the
+        holding's stories published in the window days ending on date (each
+        syndicated story counted once), for the last days days that have any.
+        """
+        today = today or datetime.date.today()
+        first = today - datetime.timedelta(days=days + window - 2)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT symbol, substr(published, 1, 10) AS day, COUNT(*), SUM(sentiment) FROM articles "
+                f"WHERE cluster = id AND sentiment IS NOT NULL AND symbol IN ({','.join('?' * len(symbols))}) "
+                "AND published >= ? GROUP BY symbol, day",
+                list(symbols) + [first.isoformat()]
+            ).fetchall()
+        start = (today - datetime.timedelta(days=days - 1)).toordinal()
+        trend = []
+        for symbol in symbols:
+            daily = [r for r in rows if r[0] == symbol]
+            span, means = news_sentiment.rolling(
+                [datetime.date.fromisoformat(r[1]).toordinal() for r in daily],
+                [r[2] for r in daily], [r[3] for r in daily], window
+            )
+            trend += [
+                {"symbol": symbol, "date": datetime.date.fromordinal(day).isoformat(), "sentiment": mean}
+                for day, mean in zip(span.tolist(), means.tolist()) if day >= start and not np.isnan(mean)
+            ]
+        return trend
+
+    def copies(self, article_id):
+        """Headers of the other articles in article_id's cluster, oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_HEADER_COLUMNS} FROM articles WHERE cluster = "
+                "(SELECT cluster FROM articles WHERE id = ?) AND id != ? ORDER BY published, id",
+                (article_id, article_id)
+            ).fetchall()
+        return [_header(r) for r in rows]
+
+    def body(self, article_id):
+        """Cached text of an article, or None"""
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT body FROM bodies WHERE id = ?", (article_id,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE bodies SET accessed = ? WHERE id = ?", (time.time(), article_id))
+        return _decompress(row[0])
+
+    def article(self, article_id, retrieve=None):
+        """Header plus "content" for one article, or None.
+
+        A body missing from the cache is fetched with retrieve(ids), which
+        returns a World News retrieve-news response (see retrieve_news), and
+        cached; without retrieve, or for articles without an API id, content
+        is then "".
+        """
+        with self._lock:
+            row = self._conn.execute(f"SELECT {_HEADER_COLUMNS} FROM articles WHERE id = ?", (article_id,)).fetchone()
+        if row is None:
+            return None
+        article = _header(row)
+        content = self.body(article_id)
+        if content is None and retrieve is not None and article_id.isdigit():
+            texts = {str(item.get("id")): item.get("text") or "" for item in retrieve([article_id]).get("news", [])}
+            content = texts.get(article_id)
+            if content:
+                with self._lock, self._conn:
+                    self._cache_bodies({article_id: content})
+        article["content"] = content or ""
+        return article
+
+
+class NewsWindow:
+    """A filtered article list read from the store one window at a time"""
+
+    def __init__(self, store, symbols=None, keyword=None, asset_type=None, since=None, untagged=True, size=200):
+        self.store = store
+        self.filters = {
+            "symbols": symbols, "keyword": keyword or None, "asset_type": asset_type, "since": since,
+            "untagged": untagged
+        }
+        self.size = size
+        self.refresh()
+
+    def refresh(self):
+        """Recount after articles were added; drops the cached window"""
+        self.total = self.store.count(**self.filters)
+        self._start = 0
+        self._rows = []
+
+    def __len__(self):
+        return self.total
+
+    def rows(self, start, count):
+        """Headers of list rows start .. start + count, reading a new window when needed"""
+        start = max(0, start)
+        end = min(start + count, self.total)
+        if start < self._start or end > self._start + len(self._rows):
+            # Re-centre the cached window on the requested rows
+            self._start = max(0, start - max(0, self.size - count) // 2)
+            self._rows = self.store.headers(self._start, max(self.size, count), **self.filters)
+        return self._rows[start - self._start:end - self._start]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_news_store():
+    """The store shared by the whole process"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = NewsStore()
+        return _store
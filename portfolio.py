@@ -0,0 +1,221 @@
+"""Compact portfolio positions.
+
+A Portfolio is a name, a tuple of interned symbols and a float64 array of
+weights (percent) in the same order. The symbol -> row dict is only built on
+the first lookup by symbol. Compared with the dicts used so far
+
+    {"name": ..., "holdings": [symbol, ...], "weights": {symbol: percent}}
+
+there is no dict or float object per position, so a 10,000-position
+portfolio takes a fraction of the memory. Whole-portfolio work (totals,
+exposure) is NumPy over one array.
+
+snapshot() is copy-on-write: both sides share the arrays until one of them
+is edited. A Portfolio still answers p["name"], p["holdings"] and
+p["weights"] (a read-only mapping), so code written against the dict shape
+keeps working. to_bytes()/from_bytes() is the compact binary form, which is
+also what pickling (process pools) uses.
+"""
+import struct
+import sys
+from collections.abc import Mapping
+
+from lazy_import import lazy_module
+
+np = lazy_module("numpy")
+
+_MAGIC = b"PFv1"
+_HEADER = struct.Struct("<4sIII")  # magic, name bytes, symbol bytes, positions
+
+
+def _as_weights(values, n):
+    try:
+        weights = np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        weights = np.array([float(v or 0) for v in values], dtype=np.float64)
+    if weights.shape != (n,):
+        raise ValueError(f"expected {n} weights, got {weights.size}")
+    return weights
+
+
+class WeightsView(Mapping):
+    """Read-only symbol -> weight mapping over a Portfolio"""
+
+    __slots__ = ("_portfolio",)
+
+    def __init__(self, portfolio):
+        self._portfolio = portfolio
+
+    def __getitem__(self, symbol):
+        p = self._portfolio
+        return float(p._weights[p._lookup()[symbol]])
+
+    def __contains__(self, symbol):
+        return symbol in self._portfolio._lookup()
+
+    def __iter__(self):
+        return iter(self._portfolio._symbols)
+
+    def __len__(self):
+        return len(self._portfolio._symbols)
+
+    def items(self):
+        p = self._portfolio
+        return zip(p._symbols, p._weights.tolist())
+
+
+class Portfolio:
+    """Named positions: interned symbols and their float64 weights in percent"""
+
+    __slots__ = ("name", "_symbols", "_weights", "_index", "_shared")
+
+    def __init__(self, name, holdings=(), weights=None):
+        symbols = [sys.intern(str(s)) for s in holdings]
+        if weights is None:
+            values = np.zeros(len(symbols))
+        elif isinstance(weights, Mapping):
+            missing = [s for s in symbols if weights.get(s) is None]
+            if missing:
+                raise ValueError(f"no weight for {', '.join(missing[:5])}")
+            values = _as_weights([weights[s] for s in symbols], len(symbols))
+        else:
+            values = _as_weights(weights, len(symbols))
+        if len(set(symbols)) != len(symbols):
+            # Repeated symbols keep their first position and their last weight
+            last = dict(zip(symbols, values.tolist()))
+            symbols, values = list(last), np.array(list(last.values()), dtype=np.float64)
+        self._init(name, tuple(symbols), values, None, False)
+
+    def _init(self, name, symbols, weights, index, shared):
+        self.name = name
+        self._symbols = symbols
+        self._weights = weights
+        self._index = index
+        self._shared = shared
+
+    @classmethod
+    def _make(cls, name, symbols, weights, index=None, shared=False):
+        p = cls.__new__(cls)
+        p._init(name, symbols, weights, index, shared)
+        return p
+
+    def _lookup(self):
+        if self._index is None:
+            self._index = dict(zip(self._symbols, range(len(self._symbols))))
+        return self._index
+
+    def _own(self):
+        """Copy shared arrays before the first in-place edit"""
+        if self._shared:
+            self._weights = self._weights.copy()
+            if self._index is not None:
+                self._index = dict(self._index)
+            self._shared = False
+
+    # --------- Dict compatibility ---------
+    def __getitem__(self, key):
+        if key == "name":
+            return self.name
+        if key == "holdings":
+            return self._symbols
+        if key == "weights":
+            return WeightsView(self)
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    # --------- Positions ---------
+    def __len__(self):
+        return len(self._symbols)
+
+    def __repr__(self):
+        return f"Portfolio({self.name!r}, {len(self)} positions, {self.total():.2f}%)"
+
+    @property
+    def symbols(self):
+        return self._symbols
+
+    @property
+    def weight_array(self):
+        """The weights in symbol order as a read-only array (no copy)"""
+        view = self._weights.view()
+        view.flags.writeable = False
+        return view
+
+    def index(self, symbol):
+        """Row of symbol, or None when not held"""
+        return self._lookup().get(symbol)
+
+    def weight(self, symbol, default=0.0):
+        i = self._lookup().get(symbol)
+        return default if i is None else float(self._weights[i])
+
+    def total(self):
+        return float(self._weights.sum())
+
+    def set_weight(self, symbol, weight):
+        """Change a holding's weight, appending the symbol if it is new"""
+        i = self._lookup().get(symbol)
+        if i is not None:
+            self._own()
+            self._weights[i] = weight
+            return
+        symbol = sys.intern(str(symbol))
+        index = dict(self._index) if self._shared else self._index
+        index[symbol] = len(self._symbols)
+        self._init(self.name, self._symbols + (symbol,), np.append(self._weights, float(weight)), index, False)
+
+    def remove(self, symbol):
+        i = self._lookup().get(symbol)
+        if i is None:
+            return False
+        self._init(self.name, self._symbols[:i] + self._symbols[i + 1:], np.delete(self._weights, i), None, False)
+        return True
+
+    def snapshot(self):
+        """A copy that shares storage until either side is edited"""
+        self._shared = True
+        return self._make(self.name, self._symbols, self._weights, self._index, True)
+
+    # --------- Serialization ---------
+    def to_dict(self):
+        """The JSON shape used by the app and data/portfolios.json"""
+        return {"name": self.name, "holdings": list(self._symbols),
+                "weights": dict(zip(self._symbols, self._weights.tolist()))}
+
+    @classmethod
+    def from_dict(cls, data):
+        # No weights at all reads as zero weights; a partial mapping raises
+        return cls(data.get("name", ""), data.get("holdings", []), data.get("weights") or None)
+
+    def to_bytes(self):
+        name = self.name.encode("utf-8")
+        symbols = "\n".join(self._symbols).encode("utf-8")
+        weights = self._weights.astype("<f8", copy=False).tobytes()
+        return _HEADER.pack(_MAGIC, len(name), len(symbols), len(self._symbols)) + name + symbols + weights
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, name_len, symbols_len, n = _HEADER.unpack_from(data)
+        if magic != _MAGIC:
+            raise ValueError("not a serialized Portfolio")
+        offset = _HEADER.size
+        name = bytes(data[offset:offset + name_len]).decode("utf-8")
+        offset += name_len
+        text = bytes(data[offset:offset + symbols_len]).decode("utf-8")
+        symbols = tuple(map(sys.intern, text.split("\n"))) if n else ()
+        weights = np.frombuffer(data, dtype="<f8", count=n, offset=offset + symbols_len)
+        # The array is a read-only view of data, so it is copied on first edit
+        return cls._make(name, symbols, weights, None, True)
+
+    def __reduce__(self):
+        return Portfolio.from_bytes, (self.to_bytes(),)
+
+
+def as_portfolio(p):
+    """p itself if it is a Portfolio, else one built from the dict shape"""
+    return p if isinstance(p, Portfolio) else Portfolio.from_dict(p)
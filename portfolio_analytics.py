@@ -0,0 +1,626 @@
+"""Portfolio Analysis calculations without any UI.
+
+The Streamlit Portfolio Analysis tab and the headless report generator
+(report_portfolios.py) share these functions, so a report shows the same
+numbers as the app. Inputs are plain data: a portfolio (portfolio.Portfolio or
+its dict shape), the yfinance .info dict per symbol (or None when unavailable)
+and daily closing prices.
+
+Weighted sums are exact (math.fsum semantics): the result is the correctly
+rounded sum of the per-holding contributions whatever their order, which lets
+PortfolioMetrics update them by delta and still match a full recompute bit
+for bit.
+"""
+import math
+import re
+from collections import defaultdict
+
+from asset_registry import get_registry
+from lazy_import import lazy_module
+
+np = lazy_module("numpy")
+
+SECTOR_LABELS = {
+    "Technology": "科技",
+    "Consumer Cyclical": "消费周期",
+    "Financial Services": "金融服务",
+    "Healthcare": "医疗健康",
+    "Energy": "能源",
+    "Consumer Defensive": "必选消费",
+    "Industrials": "工业",
+    "Real Estate": "房地产",
+    "Utilities": "公用事业",
+    "Communication Services": "通信服务",
+    "Basic Materials": "基础材料"
+}
+
+# History used for the risk figures
+RISK_PERIOD = "1y"
+TRADING_DAYS = 252
+CALENDAR_DAYS = 365  # crypto trades every day
+
+
+def sector_label(sector):
+    return SECTOR_LABELS.get(sector, sector) if sector else "综合"
+
+
+# --------- Weight editing ---------
+def normalise_weights(weights, total=100.0):
+    """Scale weights to sum to total; rounding residue goes to the largest"""
+    current = math.fsum(weights.values())
+    if current <= 0:
+        return dict(weights)
+    scaled = {s: round(w * total / current, 4) for s, w in weights.items()}
+    largest = max(scaled, key=scaled.get)
+    scaled[largest] = round(scaled[largest] + total - math.fsum(scaled.values()), 4)
+    return scaled
+
+
+def equal_weights(symbols, total=100.0):
+    return normalise_weights({s: 1.0 for s in symbols}, total) if symbols else {}
+
+
+def parse_weights(text):
+    """Parse pasted "SYMBOL weight" lines (comma, tab, space or ; separated).
+
+    Returns ({symbol: weight or None}, [error messages]); the weight may carry
+    a % sign and may be left out.
+    """
+    parsed, errors = {}, []
+    for n, line in enumerate(text.splitlines(), 1):
+        parts = [p for p in re.split(r"[,\t; ]+", line.strip()) if p]
+        if not parts:
+            continue
+        symbol = parts[0].upper()
+        if len(parts) > 2 or not re.fullmatch(r"[A-Z0-9.^=-]+", symbol):
+            errors.append(f"line {n}: cannot read \"{line.strip()}\"")
+            continue
+        weight = None
+        if len(parts) == 2:
+            try:
+                weight = float(parts[1].rstrip("%"))
+            except ValueError:
+                errors.append(f"line {n}: \"{parts[1]}\" is not a number")
+                continue
+        parsed[symbol] = weight
+    return parsed, errors
+
+
+def _info_value(info, field):
+    if info and field in info and info[field] is not None:
+        return info[field]
+    return None
+
+
+def beta(symbol, info, registry=None):
+    value = _info_value(info, "beta")
+    if value is not None:
+        return round(value, 2)
+    return (registry or get_registry()).value(symbol, "beta", 1.0)
+
+
+def pe(symbol, info, registry=None):
+    registry = registry or get_registry()
+    if registry.asset_type(symbol) == "Cryptocurrency":
+        return 0
+    value = _info_value(info, "trailingPE")
+    if value is not None:
+        return round(value, 2)
+    return registry.value(symbol, "pe", 20)
+
+
+def market_cap(symbol, info, registry=None):
+    """Market cap in units of 100 million USD"""
+    value = _info_value(info, "marketCap")
+    if value is not None:
+        return round(value / 1e8, 1)
+    return (registry or get_registry()).value(symbol, "market_cap", 5000)
+
+
+def dividend(symbol, info, registry=None):
+    """Dividend yield in percent"""
+    registry = registry or get_registry()
+    if registry.asset_type(symbol) in ("Cryptocurrency", "ETF"):
+        return 0
+    value = _info_value(info, "dividendYield")
+    if value is not None:
+        return round(value * 100, 2)
+    return registry.value(symbol, "dividend", 0)
+
+
+def sector_breakdown(holdings, weights, infos, registry=None):
+    """Weight per (translated) sector over the portfolio's stocks.
+
+    Sectors missing from the registry are taken from infos and added to it.
+    """
+    registry = registry or get_registry()
+    stocks = [s for s in holdings if registry.asset_type(s) == "Stock"]
+    fetched = {}
+    for s in stocks:
+        if not registry.get(s, "sector"):
+            sector = _info_value(infos.get(s), "sector")
+            if sector:
+                fetched[s] = {"sector": sector}
+    if fetched:
+        registry.update(fetched)
+    sector_data = {}
+    for sector, weight in registry.breakdown(stocks, weights, "sector").items():
+        label = sector_label(sector)
+        sector_data[label] = sector_data.get(label, 0) + weight
+    return sector_data
+
+
+def risk_metrics(holdings, weights, closes, registry=None):
+    """Volatility, drawdown and VaR of the weighted portfolio from daily closes.
+
+    closes maps symbol -> 1-d array of closing prices on a shared calendar
+    (NaN where a symbol did not trade). Each return runs from the holding's
+    previous close, on exchange days only (see correlation), so a Monday
+    return spans the weekend; rows on which nothing traded are dropped and
+    the figures are annualised over the rows left, counting TRADING_DAYS a
+    year (CALENDAR_DAYS for an all-crypto portfolio, as in return_moments).
+    Returns None without enough history.
+    """
+    registry = registry or get_registry()
+    symbols = [s for s in holdings if s in closes]
+    if not symbols:
+        return None
+    prices = np.column_stack([closes[s] for s in symbols])
+    crypto = _crypto_mask(symbols, registry)
+    year = CALENDAR_DAYS if crypto.all() else TRADING_DAYS
+    prices = prices[_exchange_days(prices, crypto)]
+    returns = np.expm1(_log_returns(prices))[1:]
+    returns = returns[np.isfinite(returns).any(axis=1)]
+    if len(returns) < 2:
+        return None
+    w = np.array([weights.get(s, 0) for s in symbols], dtype=np.float64)
+    if w.sum() <= 0:
+        return None
+    daily = np.where(np.isfinite(returns), returns, 0.0) @ (w / w.sum())
+    growth = np.cumprod(1 + daily)
+    drawdown = 1 - growth / np.maximum.accumulate(growth)
+    return {
+        "annual_return_pct": round(float(growth[-1] ** (year / len(daily)) - 1) * 100, 2),
+        "annual_volatility_pct": round(float(daily.std(ddof=1) * np.sqrt(year)) * 100, 2),
+        "max_drawdown_pct": round(float(drawdown.max()) * 100, 2),
+        "var_95_pct": round(float(-np.percentile(daily, 5)) * 100, 2),
+        "days": int(len(daily)),
+        "coverage_pct": round(float(w.sum() / max(sum(weights.get(s, 0) for s in holdings), 1e-12)) * 100, 1),
+    }
+
+
+# --------- Correlation ---------
+def align_closes(series):
+    """Put {symbol: close Series} on one daily calendar.
+
+    Returns (calendar DatetimeIndex, {symbol: float64 array}, NaN = no trade).
+    """
+    import pandas as pd
+
+    aligned = {}
+    for s, close in series.items():
+        close = close.copy()
+        close.index = pd.DatetimeIndex(close.index).tz_localize(None).normalize()
+        aligned[s] = close[~close.index.duplicated(keep="last")]
+    if not aligned:
+        return pd.DatetimeIndex([]), {}
+    calendar = pd.DatetimeIndex(sorted(set().union(*(c.index for c in aligned.values()))))
+    return calendar, {s: c.reindex(calendar).to_numpy(dtype=np.float64) for s, c in aligned.items()}
+
+
+def _log_returns(prices):
+    """Log return of each column since its previous observation (NaN where it did not trade)"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        logp = np.log(np.where(prices > 0, prices, np.nan))
+    valid = np.isfinite(logp)
+    rows = np.arange(len(logp))[:, None]
+    last = np.maximum.accumulate(np.where(valid, rows, -1), axis=0)
+    prev = np.vstack([np.full((1, logp.shape[1]), -1), last[:-1]])
+    cols = np.broadcast_to(np.arange(logp.shape[1]), logp.shape)
+    returns = logp - logp[np.maximum(prev, 0), cols]
+    returns[~valid | (prev < 0)] = np.nan
+    return returns
+
+
+def _pairwise_corr(returns, min_periods):
+    """(correlation, sample covariance, observations) over the rows where both
+    columns have a return, as matrix products"""
+    valid = np.isfinite(returns)
+    # Centring first changes no correlation but avoids cancellation in the sums
+    x = np.where(valid, returns - np.nanmean(np.where(valid, returns, np.nan), axis=0), 0.0)
+    m = valid.astype(np.float64)
+    n = m.T @ m
+    sx = x.T @ m                    # sx[i, j]: sum of column i over the rows shared with j
+    sxx = (x * x).T @ m
+    with np.errstate(divide="ignore", invalid="ignore"):
+        comoment = x.T @ x - sx * sx.T / n
+        var = sxx - sx * sx / n
+        corr = comoment / np.sqrt(var * var.T)
+        cov = comoment / (n - 1)
+    cov[(n < min_periods) | ~np.isfinite(cov)] = np.nan
+    corr[(n < min_periods) | ~np.isfinite(corr)] = np.nan
+    np.clip(corr, -1.0, 1.0, out=corr)
+    diagonal = np.diag(corr).copy()
+    np.fill_diagonal(corr, np.where(np.isnan(diagonal), np.nan, 1.0))
+    return corr, cov, n.astype(np.int64)
+
+
+def _crypto_mask(symbols, registry):
+    return np.array([registry.asset_type(s) == "Cryptocurrency" for s in symbols], dtype=bool)
+
+
+def _exchange_days(prices, crypto):
+    """Rows on which any non-crypto column traded (all rows if there is none)"""
+    if crypto.all():
+        return np.ones(len(prices), dtype=bool)
+    return np.isfinite(prices[:, ~crypto]).any(axis=1)
+
+
+def return_moments(symbols, closes, registry=None, min_periods=20):
+    """Pairwise-complete correlation and annualised covariance of daily log returns.
+
+    closes maps symbol -> closes on a shared calendar (NaN = no trade), as
+    align_closes returns them. Crypto trades every day and everything else
+    on exchange days only, so pairs are compared where both have a return:
+    on the exchange days (any non-crypto symbol traded) a crypto return
+    spans the weekend just like a stock's Monday return, and crypto pairs
+    use all seven days (and are annualised over CALENDAR_DAYS). Returns
+    (symbols with history, correlation, covariance, observations per pair);
+    pairs with fewer than min_periods returns are NaN.
+    """
+    registry = registry or get_registry()
+    symbols = [s for s in symbols if s in closes]
+    if not symbols:
+        return [], np.zeros((0, 0)), np.zeros((0, 0)), np.zeros((0, 0), dtype=np.int64)
+    prices = np.column_stack([closes[s] for s in symbols])
+    crypto = _crypto_mask(symbols, registry)
+    if crypto.all():
+        corr, cov, n = _pairwise_corr(_log_returns(prices), min_periods)
+        return symbols, corr, cov * CALENDAR_DAYS, n
+    if not crypto.any():
+        corr, cov, n = _pairwise_corr(_log_returns(prices), min_periods)
+        return symbols, corr, cov * TRADING_DAYS, n
+    corr, cov, n = _pairwise_corr(_log_returns(prices[_exchange_days(prices, crypto)]), min_periods)
+    cov *= TRADING_DAYS
+    both = np.ix_(crypto, crypto)
+    corr[both], cov[both], n[both] = _pairwise_corr(_log_returns(prices[:, crypto]), min_periods)
+    cov[both] *= CALENDAR_DAYS
+    return symbols, corr, cov, n
+
+
+def correlation(symbols, closes, registry=None, min_periods=20):
+    """(symbols with history, correlation matrix, observations per pair); see return_moments"""
+    symbols, corr, _, n = return_moments(symbols, closes, registry, min_periods)
+    return symbols, corr, n
+
+
+def cluster_order(corr):
+    """Leaf order of average-linkage clustering on 1 - correlation, for heatmaps"""
+    size = len(corr)
+    if size < 3:
+        return list(range(size))
+    dist = 1.0 - np.where(np.isnan(corr), 0.0, corr)
+    np.fill_diagonal(dist, np.inf)
+    members = [[i] for i in range(size)]
+    counts = np.ones(size)
+    for _ in range(size - 1):
+        i, j = np.unravel_index(np.argmin(dist), dist.shape)
+        i, j = min(i, j), max(i, j)
+        merged = (counts[i] * dist[i] + counts[j] * dist[j]) / (counts[i] + counts[j])
+        dist[i], dist[:, i] = merged, merged
+        dist[i, i] = np.inf
+        dist[j], dist[:, j] = np.inf, np.inf
+        members[i] += members[j]
+        counts[i] += counts[j]
+    return members[0]
+
+
+def correlated_pairs(symbols, corr, limit=10):
+    """The most correlated distinct pairs as [(symbol, symbol, correlation)]"""
+    i, j = np.triu_indices(len(symbols), k=1)
+    values = corr[i, j]
+    keep = np.flatnonzero(~np.isnan(values))
+    top = keep[np.argsort(-values[keep], kind="stable")[:limit]]
+    return [(symbols[i[k]], symbols[j[k]], float(values[k])) for k in top]
+
+
+def average_correlation(corr):
+    """Mean correlation over distinct pairs, or None when no pair has enough data"""
+    values = corr[np.triu_indices(len(corr), k=1)]
+    values = values[~np.isnan(values)]
+    return float(values.mean()) if len(values) else None
+
+
+# --------- Rolling risk ---------
+def _window_sums(values, window):
+    """Sum over each trailing window of rows, for every row that ends a full window"""
+    totals = np.cumsum(values, axis=0)
+    return np.concatenate([totals[window - 1:window], totals[window:] - totals[:-window]])
+
+
+def _rolling_moments(returns, window):
+    """(observations, mean, sample std) per trailing window; NaN returns are skipped"""
+    valid = np.isfinite(returns)
+    with np.errstate(invalid="ignore"):
+        centre = np.nan_to_num(np.nanmean(np.where(valid, returns, np.nan), axis=0))
+    x = np.where(valid, returns - centre, 0.0)
+    n = _window_sums(valid.astype(np.float64), window)
+    s1 = _window_sums(x, window)
+    s2 = _window_sums(x * x, window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = s1 / n
+        var = np.maximum(s2 - s1 * mean, 0.0) / (n - 1)
+    return n, mean + centre, np.sqrt(var)
+
+
+def _max_drawdown_windows(growth, window):
+    """Largest peak-to-trough fall inside each trailing window of a growth series"""
+    windows = np.lib.stride_tricks.sliding_window_view(growth, window)
+    return 1 - (windows / np.maximum.accumulate(windows, axis=1)).min(axis=1)
+
+
+def rolling_risk(holdings, weights, closes, window=63, benchmark="SPY", risk_free=0.0, registry=None):
+    """Rolling annualised risk of each holding and of the weighted portfolio.
+
+    closes maps symbol -> closes on a shared calendar (align_closes), with the
+    benchmark's among them for tracking error. Returns are simple daily
+    returns on exchange days (see correlation); the portfolio's is the
+    weighted sum, a missing return counting as 0. Every figure is an array
+    with one row per window end and one column per holding plus a last
+    "Portfolio" column, built from cumulative sums (O(rows x columns)
+    whatever the window). Returns None without a full window of history.
+    """
+    registry = registry or get_registry()
+    symbols = [s for s in holdings if s in closes]
+    if not symbols:
+        return None
+    columns = symbols + ([benchmark] if benchmark in closes else [])
+    prices = np.column_stack([closes[s] for s in columns])
+    rows = np.flatnonzero(_exchange_days(prices, _crypto_mask(columns, registry)))
+    returns = np.expm1(_log_returns(prices[rows]))[1:]
+    rows = rows[1:]
+    if len(returns) < window:
+        return None
+    w = np.array([weights.get(s, 0) for s in symbols], dtype=np.float64)
+    w = w / w.sum() if w.sum() > 0 else np.full(len(symbols), 1 / len(symbols))
+    held = returns[:, :len(symbols)]
+    portfolio = np.where(np.isfinite(held), held, 0.0) @ w
+    matrix = np.column_stack([held, portfolio])
+    rf = risk_free / TRADING_DAYS
+    n, mean, std = _rolling_moments(matrix, window)
+    enough = n >= max(2, window // 2)
+    downside = np.minimum(np.where(np.isfinite(matrix), matrix - rf, np.nan), 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        down_dev = np.sqrt(_window_sums(np.nan_to_num(downside) ** 2, window) / n)
+        sharpe = (mean - rf) / std * np.sqrt(TRADING_DAYS)
+        sortino = (mean - rf) / down_dev * np.sqrt(TRADING_DAYS)
+    tracking = None
+    if benchmark in closes:
+        _, _, active_std = _rolling_moments(matrix - returns[:, -1:], window)
+        tracking = np.where(enough, active_std * np.sqrt(TRADING_DAYS), np.nan)
+    growth = np.cumprod(1 + np.where(np.isfinite(matrix), matrix, 0.0), axis=0)
+    drawdown = 1 - growth / np.maximum.accumulate(growth, axis=0)
+    return {
+        "rows": rows[window - 1:],
+        "columns": symbols + ["Portfolio"],
+        "volatility": np.where(enough, std * np.sqrt(TRADING_DAYS), np.nan),
+        "sharpe": np.where(enough & np.isfinite(sharpe), sharpe, np.nan),
+        "sortino": np.where(enough & np.isfinite(sortino), sortino, np.nan),
+        "tracking_error": tracking,
+        "drawdown": drawdown[window - 1:],
+        "max_drawdown": drawdown.max(axis=0),
+        "portfolio_max_drawdown": _max_drawdown_windows(growth[:, -1], window),
+    }
+
+
+# --------- Valuation history ---------
+def valuation_history(holdings, weights, snapshots, known, registry=None):
+    """Portfolio beta, P/E and dividend yield on past dates from .info snapshots.
+
+    snapshots and known are what fundamentals_store.FundamentalsStore.as_of
+    returns for holdings. Each date is figured like PortfolioMetrics from
+    the values current then: P/E counts only positive values and is 0 for
+    crypto, dividend yield is 0 for crypto and ETFs. A holding without a
+    snapshot (or without the field) on a date is left out and the other
+    weights rescaled, so the lines start at the first recorded snapshot
+    instead of at registry defaults. Returns {"beta", "pe", "dividend"}:
+    one array over the dates each, NaN where no holding has a value.
+    """
+    registry = registry or get_registry()
+    types = np.array([registry.asset_type(s) for s in holdings])
+    w = np.array([weights[s] for s in holdings], dtype=float)[:, None]
+    crypto = (types == "Cryptocurrency")[:, None] & known
+    no_dividend = np.isin(types, ["Cryptocurrency", "ETF"])[:, None] & known
+    pe = snapshots["trailingPE"]
+    values = {
+        "beta": snapshots["beta"],
+        "pe": np.where(crypto, 0.0, np.where(pe > 0, pe, np.where(np.isnan(pe), np.nan, 0.0))),
+        "dividend": np.where(no_dividend, 0.0, snapshots["dividendYield"] * 100),
+    }
+    history = {}
+    for field, v in values.items():
+        present = ~np.isnan(v)
+        total = (w * present).sum(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            history[field] = np.where(total > 0, (w * np.where(present, v, 0.0)).sum(axis=0) / total, np.nan)
+    return history
+
+
+class ExactSum:
+    """Running float sum that always equals math.fsum of the values added.
+
+    Keeps Shewchuk's non-overlapping partials, so adding a value and later
+    adding its negation cancels exactly and leaves no rounding residue.
+    """
+
+    __slots__ = ("_partials",)
+
+    def __init__(self):
+        self._partials = []
+
+    def add(self, x):
+        partials = self._partials
+        i = 0
+        for y in partials:
+            if abs(x) < abs(y):
+                x, y = y, x
+            hi = x + y
+            lo = y - (hi - x)
+            if lo:
+                partials[i] = lo
+                i += 1
+            x = hi
+        partials[i:] = [x]
+
+    @property
+    def value(self):
+        return math.fsum(self._partials)
+
+
+def _contributions(weight, beta, pe, dividend):
+    """A holding's share of portfolio beta, P/E and dividend (weights in percent)"""
+    return (
+        beta * weight / 100,
+        pe * weight / 100 if pe > 0 else 0.0,
+        dividend * weight / 100,
+    )
+
+
+class PortfolioMetrics:
+    """Portfolio beta, P/E, dividend and allocation kept as per-holding contributions.
+
+    fundamentals(symbol) -> {"beta", "pe", "dividend", "sector"} is called
+    once per holding when it is added; a weight change afterwards only moves
+    that holding's contributions between exact sums, O(1) per edit. The
+    properties equal recompute() exactly.
+    """
+
+    FIELDS = ("beta", "pe", "dividend")
+    BUCKETS = ("asset_type", "sector", "region")
+
+    def __init__(self, fundamentals, registry=None):
+        self._fundamentals = fundamentals
+        self._registry = registry or get_registry()
+        self.holdings = {}  # symbol -> {"weight", "beta", "pe", "dividend", "asset_type", "sector", "region"}
+        self._sums = {f: ExactSum() for f in self.FIELDS}
+        self._buckets = {b: defaultdict(ExactSum) for b in self.BUCKETS}
+        self._members = {b: defaultdict(int) for b in self.BUCKETS}
+
+    def _apply(self, h, sign):
+        for field, value in zip(self.FIELDS, _contributions(h["weight"], h["beta"], h["pe"], h["dividend"])):
+            if math.isfinite(value):
+                self._sums[field].add(sign * value)
+        for bucket in self.BUCKETS:
+            label = h[bucket]
+            if label is not None:
+                self._buckets[bucket][label].add(sign * h["weight"])
+                self._members[bucket][label] += sign
+
+    def set_weight(self, symbol, weight):
+        """Add a holding or change its weight"""
+        h = self.holdings.get(symbol)
+        if h is None:
+            f = self._fundamentals(symbol)
+            asset_type = self._registry.asset_type(symbol)
+            h = self.holdings[symbol] = {
+                "weight": float(weight), "beta": f["beta"], "pe": f["pe"], "dividend": f["dividend"],
+                "asset_type": asset_type,
+                "sector": f.get("sector") if asset_type == "Stock" else None,  # stocks only, as in the app
+                "region": self._registry.get(symbol, "region"),
+            }
+            self._apply(h, 1)
+            return True
+        if h["weight"] == weight:
+            return False
+        self._apply(h, -1)
+        h["weight"] = float(weight)
+        self._apply(h, 1)
+        return True
+
+    def remove(self, symbol):
+        h = self.holdings.pop(symbol, None)
+        if h is not None:
+            self._apply(h, -1)
+
+    def sync(self, holdings, weights):
+        """Bring the holdings in line with a portfolio; returns how many changed"""
+        changed = 0
+        for symbol in [s for s in self.holdings if s not in weights]:
+            self.remove(symbol)
+            changed += 1
+        for symbol in holdings:
+            changed += self.set_weight(symbol, weights[symbol])
+        return changed
+
+    @property
+    def beta(self):
+        return self._sums["beta"].value
+
+    @property
+    def pe(self):
+        return self._sums["pe"].value
+
+    @property
+    def dividend(self):
+        return self._sums["dividend"].value
+
+    def values(self, field):
+        """Per-holding beta / pe / dividend, in holding order"""
+        return {s: h[field] for s, h in self.holdings.items()}
+
+    def allocation(self, bucket):
+        """Weight per label; labels whose holdings were all removed are dropped"""
+        members = self._members[bucket]
+        return {label: s.value for label, s in self._buckets[bucket].items() if members[label] > 0}
+
+    def recompute(self):
+        """The same figures from scratch (for checking the incremental state)"""
+        contributions = [
+            _contributions(h["weight"], h["beta"], h["pe"], h["dividend"]) for h in self.holdings.values()
+        ]
+        result = {
+            field: math.fsum(c[i] for c in contributions if math.isfinite(c[i]))
+            for i, field in enumerate(self.FIELDS)
+        }
+        for bucket in self.BUCKETS:
+            groups = defaultdict(list)
+            for h in self.holdings.values():
+                if h[bucket] is not None:
+                    groups[h[bucket]].append(h["weight"])
+            result[bucket] = {label: math.fsum(ws) for label, ws in groups.items()}
+        return result
+
+    def snapshot(self):
+        """The incremental figures in the shape recompute() returns"""
+        result = {field: self._sums[field].value for field in self.FIELDS}
+        for bucket in self.BUCKETS:
+            result[bucket] = self.allocation(bucket)
+        return result
+
+
+def analyze(portfolio, infos, closes=None, registry=None):
+    """The full Portfolio Analysis set for one portfolio as a JSON-ready dict"""
+    registry = registry or get_registry()
+    holdings = portfolio["holdings"]
+    weights = portfolio["weights"]
+    betas = {s: beta(s, infos.get(s), registry) for s in holdings}
+    pes = {s: pe(s, infos.get(s), registry) for s in holdings}
+    divs = {s: dividend(s, infos.get(s), registry) for s in holdings}
+    portfolio_pe = math.fsum(pes[s] * weights[s] / 100 for s in holdings if pes[s] > 0)
+    return {
+        "name": portfolio["name"],
+        "holdings": [
+            {"symbol": s, "weight": weights[s], "asset_type": registry.asset_type(s), "beta": betas[s],
+             "pe": pes[s], "dividend_pct": divs[s], "market_cap_1e8": market_cap(s, infos.get(s), registry)}
+            for s in holdings
+        ],
+        "allocation": {
+            "asset_type": registry.breakdown(holdings, weights, "asset_type"),
+            "sector": sector_breakdown(holdings, weights, infos, registry),
+            "region": registry.breakdown(holdings, weights, "region"),
+        },
+        "beta": round(math.fsum(betas[s] * weights[s] / 100 for s in holdings), 2),
+        "pe": round(portfolio_pe, 2) if portfolio_pe else None,
+        "dividend_pct": round(math.fsum(divs[s] * weights[s] / 100 for s in holdings), 2),
+        "risk": risk_metrics(holdings, weights, closes, registry) if closes else None,
+    }
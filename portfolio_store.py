@@ -0,0 +1,113 @@
+"""Saved portfolios.
+
+Portfolios created in the Streamlit app are kept in data/portfolios.json so
+they survive restarts and so batch jobs (warm_cache.py) can see which symbols
+people actually hold. Each entry in the file is
+
+    {"name": ..., "holdings": [symbol, ...], "weights": {symbol: percent},
+     "owner": ...}
+
+and is loaded as a portfolio.Portfolio. A portfolio belongs to the visitor
+who saved it ("owner", an id the app keeps per browser) and is identified by
+owner and name, so two visitors can both have "My Portfolio 1". Entries
+without an owner (saved before owners, or by save()) are shared: every
+visitor sees them unless they have their own portfolio of that name. Batch
+jobs load every entry.
+
+Every session of the app (and any batch job) shares the file, so changes are
+made one portfolio at a time: upsert() and delete() re-read the file under a
+cross-process lock and write it back with only that portfolio changed.
+Saving a session's whole list would drop what other sessions saved since it
+was loaded.
+"""
+import json
+import os
+import threading
+
+from file_lock import locked
+from portfolio import Portfolio, as_portfolio
+
+PORTFOLIOS_PATH = os.environ.get(
+    "PORTFOLIO_STORE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "portfolios.json")
+)
+
+
+class PortfolioStore:
+    """JSON file of portfolios, replaced atomically on every change"""
+
+    def __init__(self, path=PORTFOLIOS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _read(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f).get("portfolios", [])
+        except FileNotFoundError:
+            return []
+
+    def _write(self, entries):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"portfolios": entries}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
+
+    def load(self, owner=None):
+        """Saved portfolios, or [] if nothing was saved yet.
+
+        With an owner, only theirs and the shared ones; without, every entry.
+        """
+        entries = self._read()
+        if owner is not None:
+            own = {p.get("name") for p in entries if p.get("owner") == owner}
+            entries = [
+                p for p in entries
+                if p.get("owner") == owner or (p.get("owner") is None and p.get("name") not in own)
+            ]
+        return [Portfolio.from_dict(p) for p in entries]
+
+    def upsert(self, portfolio, owner=None):
+        """Save one portfolio, replacing the owner's saved one with the same name"""
+        entry = as_portfolio(portfolio).to_dict()
+        if owner is not None:
+            entry["owner"] = owner
+        with self._lock, locked(self.path):
+            entries = [
+                p for p in self._read() if (p.get("name"), p.get("owner")) != (entry["name"], owner)
+            ]
+            self._write(entries + [entry])
+
+    def delete(self, name, owner=None):
+        """Remove the owner's portfolio called name, else the shared one; False if there was none"""
+        with self._lock, locked(self.path):
+            entries = self._read()
+            for key in dict.fromkeys([(name, owner), (name, None)]):
+                kept = [p for p in entries if (p.get("name"), p.get("owner")) != key]
+                if len(kept) < len(entries):
+                    self._write(kept)
+                    return True
+        return False
+
+    def save(self, portfolios):
+        """Replace every saved portfolio (imports and tests; the app uses upsert/delete)"""
+        with self._lock, locked(self.path):
+            self._write([as_portfolio(p).to_dict() for p in portfolios])
+
+    def symbols(self):
+        """Every symbol held in any saved portfolio (of any owner), in first-seen order"""
+        return list(dict.fromkeys(s for p in self.load() for s in p.symbols))
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_portfolio_store():
+    """The store shared by the whole process"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = PortfolioStore()
+        return _store
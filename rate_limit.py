@@ -0,0 +1,152 @@
+"""Shared outbound rate limiting for Yahoo Finance and World News API.
+
+Each upstream gets one token bucket for the whole process. Callers queue by
+priority, so the chart the user is looking at is served before per-holding
+loops, and those before batch jobs. A 429 (or a Retry-After header) empties
+the bucket and blocks every caller of that upstream until the server says we
+may continue; the failed call is then retried.
+"""
+import heapq
+import itertools
+import threading
+import time
+
+# Lower value = served first
+INTERACTIVE = 0
+NORMAL = 5
+BACKGROUND = 10
+
+# upstream -> (requests per second, burst size)
+# Kept a little under the published quotas so we never trip them.
+LIMITS = {
+    "yfinance": (2.0, 4),
+    "worldnews": (0.9, 1),
+}
+DEFAULT_LIMIT = (1.0, 1)
+
+MAX_RETRIES = 3
+BASE_BACKOFF = 2.0
+MAX_BACKOFF = 60.0
+
+
+class RateLimited(Exception):
+    """Raised when an upstream keeps answering 429 after all retries"""
+
+
+def _retry_after(exc):
+    """Seconds to wait if exc is a rate-limit error, else None.
+
+    Returns 0 when the error is a 429 without a usable Retry-After header.
+    """
+    if type(exc).__name__ == "YFRateLimitError":
+        return 0
+    response = getattr(exc, "response", None)
+    if response is None or getattr(response, "status_code", None) != 429:
+        return None
+    value = (getattr(response, "headers", None) or {}).get("Retry-After")
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return 0
+
+
+class RateLimiter:
+    """Token bucket with a priority queue of waiting callers"""
+
+    def __init__(self, name, rate, burst):
+        self.name = name
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._blocked_until = 0.0
+        self._strikes = 0
+        self._waiters = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self.stats = {"acquired": 0, "waited": 0.0, "throttled": 0}
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self, priority=NORMAL, timeout=None):
+        """Block until a token is available and no higher-priority caller is queued"""
+        start = time.monotonic()
+        entry = (priority, next(self._seq))
+        with self._cond:
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    if self._waiters[0] == entry and self._tokens >= 1 and now >= self._blocked_until:
+                        heapq.heappop(self._waiters)
+                        self._tokens -= 1
+                        self.stats["acquired"] += 1
+                        self.stats["waited"] += now - start
+                        self._cond.notify_all()
+                        return True
+                    wait = max(self._blocked_until - now, (1 - self._tokens) / self.rate, 0.001)
+                    if timeout is not None:
+                        remaining = start + timeout - now
+                        if remaining <= 0:
+                            self._waiters.remove(entry)
+                            heapq.heapify(self._waiters)
+                            self._cond.notify_all()
+                            return False
+                        wait = min(wait, remaining)
+                    self._cond.wait(wait)
+            except BaseException:
+                if entry in self._waiters:
+                    self._waiters.remove(entry)
+                    heapq.heapify(self._waiters)
+                    self._cond.notify_all()
+                raise
+
+    def backoff(self, retry_after=None):
+        """Pause the whole upstream after a 429"""
+        with self._cond:
+            self._strikes += 1
+            if not retry_after:
+                retry_after = min(MAX_BACKOFF, BASE_BACKOFF * 2 ** (self._strikes - 1))
+            self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+            self._tokens = 0.0
+            self.stats["throttled"] += 1
+            self._cond.notify_all()
+
+    def _ok(self):
+        if self._strikes:
+            with self._cond:
+                self._strikes = 0
+
+    def call(self, fn, *args, priority=NORMAL, **kwargs):
+        """Run fn under the limiter, backing off and retrying on 429"""
+        for attempt in range(MAX_RETRIES + 1):
+            self.acquire(priority)
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                retry_after = _retry_after(e)
+                if retry_after is None:
+                    raise
+                self.backoff(retry_after)
+                if attempt == MAX_RETRIES:
+                    raise RateLimited(f"{self.name}: still rate limited after {MAX_RETRIES} retries") from e
+                continue
+            self._ok()
+            return result
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(upstream):
+    """The process-wide limiter for an upstream ("yfinance", "worldnews")"""
+    with _limiters_lock:
+        limiter = _limiters.get(upstream)
+        if limiter is None:
+            rate, burst = LIMITS.get(upstream, DEFAULT_LIMIT)
+            limiter = _limiters[upstream] = RateLimiter(upstream, rate, burst)
+        return limiter
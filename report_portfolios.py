@@ -0,0 +1,240 @@
+"""Headless Portfolio Analysis reports for many portfolios.
+
+Loads portfolios (the saved ones by default, or a JSON file), fetches the
+market data for the union of their holdings once, then analyses the
+portfolios in a process pool. Every worker receives the shared market data
+once at start-up and never calls an upstream itself. Per portfolio it writes
+
+    <n>-<name>.json   allocation, beta, P/E, dividend, risk (portfolio_analytics)
+    <n>-<name>.html   the same as a self-contained page with bar charts, or
+    <n>-<name>.png    matplotlib charts like the app's (--format png, slower)
+
+plus index.json / index.html over all portfolios in the output directory.
+
+Usage:
+    python report_portfolios.py                                   # saved portfolios
+    python report_portfolios.py --portfolios clients.json --workers 8
+    python report_portfolios.py --limit 100 --format png --output reports/
+
+Market data is read through the data provider, so in live mode a nightly
+warm_cache.py run lets reports be built without touching the network.
+Workers read the asset registry (--registry, data/asset_registry.csv by
+default) but never write to it: sectors taken from .info only live for the run.
+"""
+import argparse
+import html
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import portfolio_analytics as analytics
+from asset_registry import REGISTRY_PATH, AssetRegistry
+from data_provider import get_provider
+from portfolio import Portfolio
+from portfolio_store import get_portfolio_store
+from rate_limit import BACKGROUND
+
+INFO_FIELDS = ("shortName", "sector", "beta", "trailingPE", "dividendYield", "marketCap")
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reports")
+
+
+class MarketData:
+    """Everything the workers need: slim .info dicts and aligned daily closes"""
+
+    def __init__(self, infos, dates, closes):
+        self.infos = infos      # symbol -> {field: value} or None
+        self.dates = dates      # ["YYYY-MM-DD", ...] shared calendar
+        self.closes = closes    # symbol -> float64 array over dates (NaN = no trade)
+
+
+def load_portfolios(path=None, limit=None):
+    if path:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        portfolios = [Portfolio.from_dict(p) for p in (data.get("portfolios", []) if isinstance(data, dict) else data)]
+    else:
+        portfolios = get_portfolio_store().load()
+    return portfolios[:limit] if limit else portfolios
+
+
+def load_market_data(symbols, period=analytics.RISK_PERIOD, threads=8):
+    """Fetch .info and daily history for every symbol once (parent process only)"""
+    provider = get_provider()
+
+    def fetch(symbol):
+        try:
+            info = provider.info(symbol, priority=BACKGROUND)
+            info = {k: info.get(k) for k in INFO_FIELDS} if info else None
+        except Exception:
+            info = None
+        try:
+            hist = provider.history(symbol, period, "1d", priority=BACKGROUND)
+            close = hist["Close"] if hist is not None and not hist.empty else None
+        except Exception:
+            close = None
+        return symbol, info, close
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        fetched = list(pool.map(fetch, symbols))
+    infos = {s: info for s, info, _ in fetched}
+    calendar, closes = analytics.align_closes({s: close for s, _, close in fetched if close is not None})
+    return MarketData(infos, [d.strftime("%Y-%m-%d") for d in calendar], closes)
+
+
+def _slug(index, name):
+    return f"{index:05d}-{re.sub(r'[^A-Za-z0-9_-]+', '_', name).strip('_')[:60] or 'portfolio'}"
+
+
+# --------- Rendering ---------
+def _bars(title, data, unit="%"):
+    if not data:
+        return ""
+    top = max(abs(v) for v in data.values()) or 1
+    rows = "".join(
+        f'<tr><td>{html.escape(str(k))}</td><td class="bar"><span style="width:{abs(v) / top * 100:.1f}%"></span></td>'
+        f"<td>{v:.2f}{unit}</td></tr>"
+        for k, v in sorted(data.items(), key=lambda kv: -kv[1])
+    )
+    return f"<h3>{html.escape(title)}</h3><table>{rows}</table>"
+
+
+_STYLE = ("body{font-family:sans-serif;margin:2em}table{border-collapse:collapse}td{padding:2px 8px}"
+          "td.bar{width:240px}td.bar span{display:block;height:12px;background:#4a90d9}")
+
+
+def render_html(report):
+    risk = report["risk"] or {}
+    metrics = {
+        "Portfolio Beta": report["beta"], "Portfolio P/E": report["pe"] if report["pe"] else "N/A",
+        "Portfolio Dividend Yield (%)": report["dividend_pct"],
+        "Annual Volatility (%)": risk.get("annual_volatility_pct", "N/A"),
+        "Max Drawdown (%)": risk.get("max_drawdown_pct", "N/A"),
+        "1-day VaR 95% (%)": risk.get("var_95_pct", "N/A"),
+    }
+    parts = [
+        f"<h1>{html.escape(report['name'])}</h1><table>",
+        "".join(f"<tr><th align=left>{k}</th><td>{v}</td></tr>" for k, v in metrics.items()),
+        "</table>",
+        _bars("Asset Type Distribution (by weight)", report["allocation"]["asset_type"]),
+        _bars("Sector Distribution (by weight)", report["allocation"]["sector"]),
+        _bars("Region Distribution (by weight)", report["allocation"]["region"]),
+        _bars("Beta Comparison by Asset", {h["symbol"]: h["beta"] for h in report["holdings"]}, ""),
+        _bars("P/E Comparison by Asset", {h["symbol"]: h["pe"] for h in report["holdings"] if h["pe"] > 0}, ""),
+    ]
+    return f"<!doctype html><meta charset=utf-8><title>{html.escape(report['name'])}</title><style>{_STYLE}</style>{''.join(parts)}"
+
+
+def render_png(report, path):
+    import matplotlib
+    matplotlib.use("Agg")
+    from matplotlib.figure import Figure
+    matplotlib.rcParams["font.family"] = ["Arial", "DejaVu Sans", "Liberation Sans"]
+    matplotlib.rcParams["axes.unicode_minus"] = False
+    fig = Figure(figsize=(16, 10))
+    axes = fig.subplots(2, 2)
+    for ax, field, title in zip(axes[0].tolist() + [axes[1][0]], ("asset_type", "sector", "region"),
+                                ("Asset Type", "Sector", "Region")):
+        data = report["allocation"][field]
+        if data:
+            ax.pie(data.values(), labels=data.keys(), autopct=lambda p: f"{p:.1f}", startangle=90)
+        ax.set_title(f"{title} Distribution (by weight)")
+    betas = sorted(((h["symbol"], h["beta"]) for h in report["holdings"]), key=lambda x: x[1], reverse=True)
+    ax = axes[1][1]
+    if betas:
+        ax.bar(*zip(*betas), color="skyblue")
+    ax.axhline(y=1.0, color="r", linestyle="--", label="Market Avg (1.0)")
+    ax.axhline(y=report["beta"], color="g", linestyle="-", label=f"Portfolio Beta ({report['beta']})")
+    ax.set_title("Beta Comparison by Asset")
+    ax.legend()
+    fig.suptitle(report["name"])
+    fig.savefig(path, dpi=80)
+
+
+# --------- Worker side ---------
+_worker = {}
+
+
+def _init_worker(market, output, fmt, registry_path):
+    _worker.update(market=market, output=output, fmt=fmt, registry=AssetRegistry(registry_path, persist=False))
+
+
+def _report_one(job):
+    index, portfolio = job
+    market = _worker["market"]
+    report = analytics.analyze(portfolio, market.infos, market.closes, _worker["registry"])
+    base = os.path.join(_worker["output"], _slug(index, portfolio["name"]))
+    with open(base + ".json", "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=1)
+    if _worker["fmt"] == "html":
+        with open(base + ".html", "w", encoding="utf-8") as f:
+            f.write(render_html(report))
+    elif _worker["fmt"] == "png":
+        render_png(report, base + ".png")
+    risk = report["risk"] or {}
+    return {
+        "name": report["name"], "file": os.path.basename(base), "holdings": len(report["holdings"]),
+        "beta": report["beta"], "pe": report["pe"], "dividend_pct": report["dividend_pct"],
+        "annual_volatility_pct": risk.get("annual_volatility_pct"), "max_drawdown_pct": risk.get("max_drawdown_pct"),
+    }
+
+
+def generate(portfolios, market, output, fmt="html", workers=None, progress=True, registry_path=REGISTRY_PATH):
+    """Analyse and write every portfolio; returns the index rows in input order"""
+    os.makedirs(output, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    jobs = list(enumerate(portfolios))
+    chunksize = max(1, min(32, len(jobs) // (workers * 4)))
+    rows = []
+    start = time.monotonic()
+    initargs = (market, output, fmt, registry_path)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool:
+        for row in pool.map(_report_one, jobs, chunksize=chunksize):
+            rows.append(row)
+            if progress and (len(rows) % 100 == 0 or len(rows) == len(jobs)):
+                print(f"[{len(rows)}/{len(jobs)} {time.monotonic() - start:6.1f}s] reports written", flush=True)
+    with open(os.path.join(output, "index.json"), "w", encoding="utf-8") as f:
+        json.dump(rows, f, ensure_ascii=False, indent=1)
+    if fmt == "html":
+        cells = "".join(
+            f"<tr><td><a href=\"{html.escape(r['file'])}.html\">{html.escape(r['name'])}</a></td><td>{r['holdings']}</td>"
+            f"<td>{r['beta']}</td><td>{r['pe'] or 'N/A'}</td><td>{r['dividend_pct']}</td>"
+            f"<td>{r['annual_volatility_pct'] if r['annual_volatility_pct'] is not None else 'N/A'}</td></tr>"
+            for r in rows
+        )
+        with open(os.path.join(output, "index.html"), "w", encoding="utf-8") as f:
+            f.write(f"<!doctype html><meta charset=utf-8><title>Portfolio reports</title><style>{_STYLE}</style>"
+                    "<table><tr><th>Portfolio</th><th>Assets</th><th>Beta</th><th>P/E</th><th>Dividend (%)</th>"
+                    f"<th>Volatility (%)</th></tr>{cells}</table>")
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--portfolios", help="JSON file of portfolios (default: saved portfolios)")
+    parser.add_argument("--limit", type=int, help="only the first N portfolios")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--format", choices=("html", "png", "json"), default="html")
+    parser.add_argument("--workers", type=int, help="analysis processes (default: CPU count)")
+    parser.add_argument("--fetch-threads", type=int, default=8, help="threads fetching market data")
+    parser.add_argument("--registry", default=REGISTRY_PATH, help="asset registry CSV to read (never written)")
+    args = parser.parse_args(argv)
+
+    portfolios = load_portfolios(args.portfolios, args.limit)
+    if not portfolios:
+        print("No portfolios to report on")
+        return 1
+    symbols = list(dict.fromkeys(s for p in portfolios for s in p.symbols))
+    start = time.monotonic()
+    print(f"{len(portfolios)} portfolios, {len(symbols)} distinct symbols: loading market data", flush=True)
+    market = load_market_data(symbols, threads=args.fetch_threads)
+    print(f"Market data loaded in {time.monotonic() - start:.1f}s ({len(market.closes)} price histories)", flush=True)
+    generate(portfolios, market, args.output, args.format, args.workers, registry_path=args.registry)
+    print(f"{len(portfolios)} reports written to {args.output} in {time.monotonic() - start:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""Process-wide request coalescing for upstream data calls.
+
+Streamlit runs every browser session as a thread of the same process, so when
+many sessions open at once they all ask yfinance / World News API for the same
+symbols at the same moment. SingleFlight lets the first caller for a
+(provider, key) run the fetch while later callers with the same key wait for
+it and share its result (or its exception).
+
+Results are shared objects: callers must treat them as read-only.
+"""
+import threading
+from collections import defaultdict
+
+
+class _Call:
+    __slots__ = ("event", "result", "error", "waiters")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Deduplicate concurrent calls that ask for the same (provider, key)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._stats = defaultdict(lambda: {"calls": 0, "upstream": 0, "deduplicated": 0, "errors": 0})
+
+    def do(self, provider, key, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) unless the same call is already in flight"""
+        call_key = (provider, key)
+        with self._lock:
+            stats = self._stats[provider]
+            stats["calls"] += 1
+            call = self._calls.get(call_key)
+            if call is not None:
+                call.waiters += 1
+                stats["deduplicated"] += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[call_key] = call
+                stats["upstream"] += 1
+                leader = True
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                stats["errors"] += 1
+            raise
+        finally:
+            with self._lock:
+                del self._calls[call_key]
+            call.event.set()
+        return call.result
+
+    def in_flight(self):
+        """Number of upstream calls currently running"""
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self):
+        """Per-provider counters: calls, upstream, deduplicated, errors"""
+        with self._lock:
+            return {provider: dict(s) for provider, s in self._stats.items()}
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats.clear()
+
+
+_coalescer = SingleFlight()
+
+
+def get_coalescer():
+    """The coalescer shared by every session in this process"""
+    return _coalescer
@@ -1,64 +1,285 @@
 import streamlit as st
-import pandas as pd
-import yfinance as yf
-import requests
 import time
-import matplotlib.pyplot as plt
-from datetime import datetime, timedelta
-from matplotlib.ticker import FuncFormatter
+import uuid
+from datetime import datetime
+from lazy_import import lazy_module
+from asset_registry import get_registry
+from single_flight import get_coalescer
+from rate_limit import INTERACTIVE, NORMAL, BACKGROUND
+from data_provider import get_provider, news_query, news_retrieve_params
+from portfolio import Portfolio
+from watchlist import Watchlist
+from alerts import get_alert_engine, describe as describe_alert, KINDS as ALERT_KINDS
+from portfolio_store import get_portfolio_store
+from news_store import get_news_store, published_since, ASSET_FILTERS, NEWS_PERIODS
+from fundamentals_store import get_fundamentals_store
+from news_ingest import ingest, refresh_news, older_news, ticker_news_source
+import portfolio_analytics as analytics
+from exposure import HoldingsMatrix, consolidate, fill_fundamentals
+from instrumentation import debug_enabled, start_run, finish_run, span, count, METRICS_FILE
 
-# Set font for international support
-plt.rcParams["font.family"] = ["Arial", "DejaVu Sans", "Liberation Sans"]
-plt.rcParams["axes.unicode_minus"] = False  # Solve the problem of negative sign display
+def _setup_pyplot(plt):
+	# Set font for international support
+	plt.rcParams["font.family"] = ["Arial", "DejaVu Sans", "Liberation Sans"]
+	plt.rcParams["axes.unicode_minus"] = False  # Solve the problem of negative sign display
+
+# pandas and matplotlib are imported by the first section that uses them,
+# so the page starts rendering before they have loaded
+pd = lazy_module("pandas")
+plt = lazy_module("matplotlib.pyplot", on_load=_setup_pyplot)
 
 # --------- Session State Initialization ---------
+# Saved portfolios belong to one browser: its id is kept in the URL, so a
+# reload (or a bookmark) finds them again and other visitors never see them
+if "owner" not in st.query_params:
+	st.query_params["owner"] = uuid.uuid4().hex
+if "owner" not in st.session_state:
+	st.session_state["owner"] = st.query_params["owner"]
 if "your_picks" not in st.session_state:
 	st.session_state["your_picks"] = []
 if "pick_weights" not in st.session_state:  # New: Asset weights
 	st.session_state["pick_weights"] = {}
 if "portfolios" not in st.session_state:
-	st.session_state["portfolios"] = []
+	st.session_state["portfolios"] = get_portfolio_store().load(st.session_state["owner"])
 if "current_portfolio" not in st.session_state:
 	st.session_state["current_portfolio"] = None
-if "selected_news" not in st.session_state:
-	st.session_state["selected_news"] = None
+if "selected_news_id" not in st.session_state:
+	st.session_state["selected_news_id"] = None
 if "font_size" not in st.session_state:
 	st.session_state["font_size"] = 12
-if "news_page" not in st.session_state:
-	st.session_state["news_page"] = 1
+if "news_fetched" not in st.session_state:  # (symbols, keyword) -> sync state of that news query
+	st.session_state["news_fetched"] = {}
+if "ticker_news_synced" not in st.session_state:  # symbols whose ticker.news this session stored
+	st.session_state["ticker_news_synced"] = set()
+if "weights_version" not in st.session_state:  # Bumped to reset the weight table after edits are applied
+	st.session_state["weights_version"] = 0
 
 # --------- Page Config ---------
 st.set_page_config(page_title="Portfolio Management System", layout="wide")
+# Timing spans and counters are only recorded when debugging (?debug=1)
+start_run(debug_enabled(st.query_params))
 tabs = st.tabs(["Create Portfolio", "News Aggregation", "Portfolio Analysis", "Stock Analysis"])
 
 # --------- Utility Functions ---------
 def is_crypto(symbol):
-	return "-USD" in symbol or symbol in ["BTC", "ETH", "BNB"]
+	return get_registry().asset_type(symbol) == "Cryptocurrency"
 
 def is_etf(symbol):
-	etf_list = ["SPY", "VOO", "QQQ", "IWM", "DIA"]
-	return symbol in etf_list
+	return get_registry().asset_type(symbol) == "ETF"
 
 def get_asset_type(symbol):
-	if is_crypto(symbol):
-		return "Cryptocurrency"
-	elif is_etf(symbol):
-		return "ETF"
-	else:
-		return "Stock"
+	return get_registry().asset_type(symbol)
+
+# Upstream calls go through the data provider (live / record / replay, see
+# data_provider.py) and the process-wide coalescer, so concurrent sessions
+# asking for the same symbol share one request. Live calls are rate limited;
+# what the user is looking at (INTERACTIVE) is fetched before per-holding
+# loops (NORMAL) and refreshes (BACKGROUND).
+def _fetch(kind, key, fn, *args, **kwargs):
+	executed = []
+	def upstream(*a, **kw):
+		executed.append(True)
+		count("upstream_calls", kind)
+		return fn(*a, **kw)
+	with span(f"provider.{kind}"):
+		result = get_coalescer().do(kind, key, upstream, *args, **kwargs)
+	if not executed:
+		count("cache_hits", "coalesced")
+	return result
 
-def safe_get_ticker_info(symbol):
+def safe_get_ticker_info(symbol, priority=NORMAL):
 	try:
-		ticker = yf.Ticker(symbol)
-		info = ticker.info
-		return info
+		return _fetch("yfinance.info", symbol, get_provider().info, symbol, priority=priority)
 	except Exception as e:
 		st.warning(f"Failed to get information for {symbol}: {str(e)}")
 		return None
 
+def fetch_history(symbol, period, interval="1d", priority=NORMAL):
+	return _fetch(
+		"yfinance.history", (symbol, period, interval),
+		get_provider().history, symbol, period, interval, priority=priority
+	)
+
+def fetch_ticker_news(symbol, priority=NORMAL):
+	return _fetch("yfinance.news", symbol, get_provider().ticker_news, symbol, priority=priority)
+
+def save_portfolio(portfolio):
+	"""Add (or replace, by name) one of this visitor's portfolios, in the session and in the store"""
+	st.session_state["portfolios"] = [
+		p for p in st.session_state["portfolios"] if p["name"] != portfolio["name"]
+	] + [portfolio]
+	get_portfolio_store().upsert(portfolio, st.session_state["owner"])
+
+def delete_portfolio(name):
+	st.session_state["portfolios"] = [p for p in st.session_state["portfolios"] if p["name"] != name]
+	get_portfolio_store().delete(name, st.session_state["owner"])
+
+def render_chart(fig, name):
+	with span(f"chart.{name}"):
+		st.pyplot(fig)
+	plt.close(fig)  # pyplot keeps every figure alive until closed
+
+
+# Portfolio Analysis figures; the calculations live in portfolio_analytics.py
+# (shared with the report CLI)
+sector_label = analytics.sector_label
+
+def get_sector(symbol):
+	info = safe_get_ticker_info(symbol)
+	if info and "sector" in info:
+		return sector_label(info["sector"])
+	return sector_label(get_registry().get(symbol, "sector"))
+
+def get_beta(symbol):
+	return analytics.beta(symbol, safe_get_ticker_info(symbol))
+
+def get_pe(symbol):
+	if is_crypto(symbol):
+		return 0
+	return analytics.pe(symbol, safe_get_ticker_info(symbol))
+
+def get_market_cap(symbol):
+	return analytics.market_cap(symbol, safe_get_ticker_info(symbol))
+
+def get_dividend(symbol):
+	if is_crypto(symbol) or is_etf(symbol):
+		return 0
+	return analytics.dividend(symbol, safe_get_ticker_info(symbol))
+
+def _quiet_info(symbol):
+	try:
+		return _fetch("yfinance.info", symbol, get_provider().info, symbol, priority=BACKGROUND)
+	except Exception:
+		return None
+
+def holding_fundamentals(symbol):
+	sector = get_registry().get(symbol, "sector")
+	if not sector and get_asset_type(symbol) == "Stock":
+		# Sectors missing from the registry come from .info
+		sector = (safe_get_ticker_info(symbol) or {}).get("sector", "")
+	return {"beta": get_beta(symbol), "pe": get_pe(symbol), "dividend": get_dividend(symbol), "sector": sector_label(sector)}
+
+def portfolio_metrics(key, holdings, weights):
+	# Kept in the session: a rerun after a weight edit only moves that
+	# holding's contributions instead of recomputing every aggregate
+	engines = st.session_state.setdefault("portfolio_metrics", {})
+	if key not in engines:
+		engines[key] = analytics.PortfolioMetrics(holding_fundamentals)
+	with span("metrics.sync"):
+		count("metrics_updates", "holdings", engines[key].sync(holdings, weights))
+	return engines[key]
+
+def price_matrix(symbols, period):
+	# Daily closes of a symbol set on one calendar, kept for the day so the
+	# correlation and rolling risk panels share one fetch per (symbols, period)
+	cache = st.session_state.setdefault("price_matrices", {})
+	key = (frozenset(symbols), period, datetime.now().date())
+	if key not in cache:
+		with span("prices.align"):
+			series = {}
+			for s in dict.fromkeys(symbols):
+				try:
+					hist = fetch_history(s, period)
+				except Exception:
+					continue
+				if hist is not None and not hist.empty:
+					series[s] = hist["Close"]
+			cache[key] = analytics.align_closes(series)
+		while len(cache) > 4:
+			cache.pop(next(iter(cache)))
+	return cache[key]
+
+def holdings_correlation(holdings, period):
+	# Kept per (holdings set, window) for the day: switching portfolios or
+	# windows back and forth reuses the matrices instead of recomputing
+	cache = st.session_state.setdefault("correlations", {})
+	key = (frozenset(holdings), period, datetime.now().date())
+	if key not in cache:
+		_, closes = price_matrix(holdings, period)
+		with span("correlation.compute"):
+			symbols, corr, cov, _ = analytics.return_moments(list(closes), closes)
+			order = analytics.cluster_order(corr)
+			cache[key] = ([symbols[i] for i in order], corr[order][:, order], cov[order][:, order])
+		while len(cache) > 8:
+			cache.pop(next(iter(cache)))
+	return cache[key]
+
+MONITOR_PAGE_SIZE = 30
+
+def monitor_watchlist(portfolio):
+	# One per portfolio for the session, so quotes of pages already seen stay
+	# available for sorting while only the visible page is fetched per rerun
+	watchlists = st.session_state.setdefault("watchlists", {})
+	key = (portfolio["name"], tuple(portfolio["holdings"]))
+	if key not in watchlists:
+		watchlists.clear()
+		watchlists[key] = Watchlist(portfolio["holdings"], portfolio["weights"])
+	return watchlists[key]
+
+def check_alerts(quotes):
+	# Moving averages only for symbols that have MA rules (daily bars are cached)
+	engine = get_alert_engine()
+	for s, quote in quotes.items():
+		windows = engine.ma_windows(s)
+		if windows:
+			try:
+				closes = fetch_history(s, "1y", priority=BACKGROUND)["Close"]
+			except Exception:
+				continue
+			quote["averages"] = {n: float(closes.iloc[-n:].mean()) for n in windows if len(closes) >= n}
+	# The engine is shared: show what fired since this session last looked,
+	# including alerts another session's rerun evaluated
+	if "alerts_seen" not in st.session_state:
+		_, st.session_state["alerts_seen"] = engine.since()
+	with span("alerts.evaluate"):
+		engine.evaluate(quotes)
+	fired, st.session_state["alerts_seen"] = engine.since(st.session_state["alerts_seen"])
+	for alert in fired[:5]:
+		st.toast(f"Alert: {alert['message']} (now ${alert['price']:.2f})")
+	if len(fired) > 5:
+		st.toast(f"{len(fired) - 5} more alerts fired")
+	return fired
+
+def apply_weight_edits(action):
+	# Form callback: runs before the rerun, so all edits land in that one rerun
+	picks = list(st.session_state["your_picks"])
+	weights = {s: st.session_state["pick_weights"].get(s, 100.0 / len(picks)) for s in picks}
+	table = st.session_state.get(f"weight_table_{st.session_state['weights_version']}") or {}
+	removed = set()
+	for row, changes in table.get("edited_rows", {}).items():
+		symbol = picks[int(row)]
+		if changes.get("Weight (%)") is not None:
+			weights[symbol] = float(changes["Weight (%)"])
+		if changes.get("Remove"):
+			removed.add(symbol)
+	errors = []
+	if action == "paste":
+		pasted, errors = analytics.parse_weights(st.session_state.get("weight_paste", ""))
+		for symbol, weight in pasted.items():
+			if symbol not in weights:
+				picks.append(symbol)
+				weights[symbol] = weight if weight is not None else 100.0 / len(picks)
+			elif weight is not None:
+				weights[symbol] = weight
+	picks = [s for s in picks if s not in removed]
+	weights = {s: weights[s] for s in picks}
+	if action == "normalise":
+		weights = analytics.normalise_weights(weights)
+	elif action == "equal":
+		weights = analytics.equal_weights(picks)
+	errors += [f"{s}: weight must be greater than 0" for s, w in weights.items() if not w > 0]
+	if errors:
+		st.session_state["weight_message"] = ("error", "Changes not applied. " + "; ".join(errors))
+		return
+	st.session_state["your_picks"] = picks
+	st.session_state["pick_weights"] = weights
+	st.session_state["weights_version"] += 1
+	st.session_state["weight_paste"] = ""
+	st.session_state["weight_message"] = ("success", f"Applied changes to {len(picks)} assets.")
+
 
 # --------- Page 1: Create Portfolio ---------
-with tabs[0]:
+with tabs[0], span("tab.create_portfolio"):
 	st.header("Manually Create Portfolio")
 	col1, col2 = st.columns([2, 2])
 	# Left: Search and popular assets
@@ -67,7 +288,7 @@ with tabs[0]:
 		col_search = st.columns([1, 1])
 		if col_search[0].button("Add Asset") and search:
 			try:
-				info = safe_get_ticker_info(search)
+				info = safe_get_ticker_info(search, INTERACTIVE)
 				if info and "symbol" in info:
 					symbol = info["symbol"]
 					if symbol not in st.session_state["your_picks"]:
@@ -87,23 +308,30 @@ with tabs[0]:
 					st.session_state["your_picks"].append(symbol)
 		st.subheader("Selected Assets (Adjust Weights)")
 		if st.session_state["your_picks"]:
-			new_weights = {}
-			total_weight = 0.0
-			for i, symbol in enumerate(st.session_state["your_picks"]):
-				col_w = st.columns([3, 1, 1])
-				col_w[0].write(symbol)
-				weight = col_w[1].number_input(
-					"Weight (%)", 
-					min_value=1.0, 
-					max_value=100.0, 
-					value=st.session_state["pick_weights"].get(symbol, 100.0/len(st.session_state["your_picks"])),
-					step=0.1,
-					key=f"weight_{i}"
+			picks = st.session_state["your_picks"]
+			new_weights = {s: st.session_state["pick_weights"].get(s, 100.0/len(picks)) for s in picks}
+			# Edits are collected in a form and applied together in one rerun
+			with st.form("weight_editor"):
+				st.data_editor(
+					pd.DataFrame({"Asset": picks, "Weight (%)": list(new_weights.values()), "Remove": [False] * len(picks)}),
+					disabled=["Asset"], hide_index=True, key=f"weight_table_{st.session_state['weights_version']}",
+					column_config={"Weight (%)": st.column_config.NumberColumn(min_value=0.0, max_value=100.0, step=0.1, format="%.2f")}
 				)
-				new_weights[symbol] = weight
-				total_weight += weight
-				if col_w[2].button("Delete", key=f"del_{symbol}"):
-					st.session_state["your_picks"].remove(symbol)
+				st.text_area("Paste weights (one \"SYMBOL weight\" per line, e.g. copied from a spreadsheet)", key="weight_paste")
+				col_form = st.columns(4)
+				col_form[0].form_submit_button("Apply", on_click=apply_weight_edits, args=("apply",))
+				col_form[1].form_submit_button("Normalise to 100%", on_click=apply_weight_edits, args=("normalise",))
+				col_form[2].form_submit_button("Equal weight", on_click=apply_weight_edits, args=("equal",))
+				col_form[3].form_submit_button("Apply pasted", on_click=apply_weight_edits, args=("paste",))
+			message = st.session_state.pop("weight_message", None)
+			if message:
+				getattr(st, message[0])(message[1])
+			total_weight = sum(new_weights.values())
+			preview = portfolio_metrics("__picks__", picks, new_weights)
+			col_pv = st.columns(3)
+			col_pv[0].metric("Beta", round(preview.beta, 2))
+			col_pv[1].metric("P/E", round(preview.pe, 2) if preview.pe else "N/A")
+			col_pv[2].metric("Dividend Yield (%)", round(preview.dividend, 2))
 			if abs(total_weight - 100) > 0.1:
 				st.warning(f"Total weight is {total_weight:.1f}%, please adjust to 100%.")
 			else:
@@ -111,12 +339,12 @@ with tabs[0]:
 				st.success("Weights set successfully.")
 			name = st.text_input("Portfolio Name", f"My Portfolio {len(st.session_state['portfolios'])+1}")
 			if st.button("Create Portfolio") and name:
-				portfolio_data = {
-					"name": name,
-					"holdings": st.session_state["your_picks"].copy(),
-					"weights": st.session_state["pick_weights"].copy()
-				}
-				st.session_state["portfolios"].append(portfolio_data)
+				try:
+					portfolio_data = Portfolio(name, st.session_state["your_picks"], st.session_state["pick_weights"])
+				except ValueError as e:
+					st.error(f"Set the weights to 100% first ({e}).")
+					st.stop()
+				save_portfolio(portfolio_data)
 				st.session_state["current_portfolio"] = name
 				st.success(f"Portfolio created: {name}")
 				st.session_state["your_picks"] = []
@@ -131,11 +359,9 @@ with tabs[0]:
 		if st.button("Sync Portfolio"):
 			with st.spinner(f"Syncing portfolio from {broker}..."):
 				time.sleep(1)
-				st.session_state["portfolios"].append({
-					"name": f"{broker} Synced Portfolio",
-					"holdings": ["AAPL", "MSFT", "GOOGL", "AMZN", "TSLA"],
-					"weights": {"AAPL": 20, "MSFT": 20, "GOOGL": 20, "AMZN": 20, "TSLA": 20}
-				})
+				save_portfolio(Portfolio(
+					f"{broker} Synced Portfolio", ["AAPL", "MSFT", "GOOGL", "AMZN", "TSLA"], [20, 20, 20, 20, 20]
+				))
 				st.session_state["current_portfolio"] = f"{broker} Synced Portfolio"
 				st.success(f"Portfolio synced from {broker}")
 		st.header("Import Portfolio from CSV")
@@ -147,11 +373,7 @@ with tabs[0]:
 				if len(df.columns) >= 1:
 					symbols = df.iloc[:,0].tolist()
 					weights = df.iloc[:,1].tolist() if len(df.columns) > 1 else [100.0/len(symbols)]*len(symbols)
-					st.session_state["portfolios"].append({
-						"name": "CSV Imported Portfolio",
-						"holdings": symbols,
-						"weights": dict(zip(symbols, weights))
-					})
+					save_portfolio(Portfolio("CSV Imported Portfolio", symbols, weights))
 					st.session_state["current_portfolio"] = "CSV Imported Portfolio"
 					st.success("Portfolio imported from CSV")
 				else:
@@ -167,71 +389,58 @@ with tabs[0]:
 					st.session_state["current_portfolio"] = portfolio["name"]
 					st.rerun()
 				if col_p[2].button("Delete", key=f"del_port_{i}"):
-					st.session_state["portfolios"].pop(i)
+					delete_portfolio(portfolio["name"])
 					st.rerun()
 		else:
 			st.info("No portfolios yet. Please create or import.")
 
 # --------- Page 2: News Aggregation ---------
-def get_news(symbols, page=1, page_size=12, keyword=None, filter_type="All Holdings"):
-	API_KEY = "6d6d5f5d55b64eab94814259cb0a0841"
-	url = "https://api.worldnewsapi.com/search-news"
-	keywords = " OR ".join(symbols)
-	query = keyword if keyword else keywords
-	earliest_date = (datetime.now() - timedelta(days=30)).isoformat()
-	params = {
-		"q": query,
-		"language": "en",
-		"sort": "date",
-		"page": page,
-		"page-size": page_size,
-		"earliest-publish-date": earliest_date
-	}
-	headers = {"x-api-key": API_KEY}
+NEWS_LIST_STEP = 50  # rows added to the news list by "Load more"
+
+# The ingestion pipeline calls these on its worker threads, so they must not
+# touch st.* (the spinner is shown around the whole sync instead)
+def search_news_page(params):
+	"""One World News search-news call, shared by concurrent sessions"""
+	return _fetch(
+		"worldnews.search", tuple(sorted(params.items())),
+		get_provider().news, "search-news", params, priority=INTERACTIVE
+	)
+
+def ticker_news_items(symbol):
+	return fetch_ticker_news(symbol, INTERACTIVE)
+
+def retrieve_news_bodies(ids):
+	"""World News retrieve-news for article bodies missing from the store's cache"""
+	params = news_retrieve_params(ids)
+	return _fetch(
+		"worldnews.retrieve", params["ids"],
+		get_provider().news, "retrieve-news", params, priority=INTERACTIVE
+	)
+
+def sync_news(symbols, keyword, progress, older=False):
+	"""Fetch a query's new articles (or, with older, the next older page) into the news store"""
 	try:
 		with st.spinner("Fetching news..."):
-			resp = requests.get(url, params=params, headers=headers, timeout=10)
-			resp.raise_for_status()
-			data = resp.json()
-		news_list = []
-		for item in data.get("news", []):
-			symbol_in_news = next((s for s in symbols if s in item.get("title", "")), "OTHER")
-			asset_type = get_asset_type(symbol_in_news) if symbol_in_news != "OTHER" else ""
-			news_list.append({
-				"date": item.get("publish_date", ""),
-				"symbol": symbol_in_news,
-				"asset_type": asset_type,
-				"title": item.get("title", ""),
-				"author": ", ".join(item.get("authors", [])),
-				"content": item.get("text", ""),
-				"url": item.get("url", "")
-			})
-		return news_list, data.get("total_results", 0)
-	except Exception as e:
-		st.warning("News API unavailable, showing demo data.")
-		mock_news = [
-			{
-				"date": datetime.now().strftime("%Y-%m-%d"),
-				"symbol": symbols[0] if symbols else "AAPL",
-				"asset_type": get_asset_type(symbols[0]) if symbols else "Stock",
-				"title": "[Demo] Market News Example 1",
-				"author": "Demo Author",
-				"content": "This is demo news content. Displayed when API is unavailable.",
-				"url": "https://example.com/news1"
-			},
-			{
-				"date": datetime.now().strftime("%Y-%m-%d"),
-				"symbol": symbols[1] if len(symbols)>1 else "MSFT",
-				"asset_type": get_asset_type(symbols[1]) if len(symbols)>1 else "Stock",
-				"title": "[Demo] Market News Example 2",
-				"author": "Demo Author",
-				"content": "Second demo news content. Displayed when API is unavailable.",
-				"url": "https://example.com/news2"
-			}
-		]
-		return mock_news, len(mock_news)
-
-with tabs[1]:
+			if older:
+				_, progress["more"] = older_news(
+					get_news_store(), symbols, keyword, search=search_news_page, ticker_news=ticker_news_items
+				)
+			else:
+				refresh_news(get_news_store(), symbols, keyword, search=search_news_page, ticker_news=ticker_news_items)
+				progress["synced"] = True
+		progress["failed"] = False
+	except Exception:
+		progress["failed"] = True
+
+def holding_news(symbol, limit=5):
+	"""Latest stored articles about one holding; its ticker.news is stored once per session"""
+	store = get_news_store()
+	if symbol not in st.session_state["ticker_news_synced"]:
+		ingest([ticker_news_source(symbol, ticker_news_items)], store, [symbol])
+		st.session_state["ticker_news_synced"].add(symbol)
+	return store.headers(0, limit, symbols=[symbol], untagged=False)
+
+with tabs[1], span("tab.news"):
 	st.header("Portfolio News Aggregation and Filtering")
 	current_port = st.session_state.get("current_portfolio")
 	if current_port and st.session_state["portfolios"]:
@@ -242,44 +451,81 @@ with tabs[1]:
 		symbols = ["AAPL", "MSFT", "NVDA"]
 		st.info("No portfolio selected, showing default asset news.")
 	col_top = st.columns([3, 2, 1, 1])
-	news_keyword = col_top[0].text_input("News keyword search", "")
+	news_keyword = col_top[0].text_input("News keyword search", "").strip()
 	filter_type = col_top[1].selectbox(
 		"Asset type filter", 
-		["All Holdings", "Stocks", "ETFs", "Cryptocurrencies"]
+		list(ASSET_FILTERS)
 	)
-	page_size = 10
-	news_list, total_news = get_news(
-		symbols, 
-		st.session_state["news_page"], 
-		page_size, 
-		news_keyword,
-		filter_type
-	)
-	col_page = st.columns([1, 3, 1])
-	with col_page[0]:
-		if st.button("Previous Page") and st.session_state["news_page"] > 1:
-			st.session_state["news_page"] -= 1
-			st.rerun()
-	with col_page[1]:
-		st.write(f"Showing {(st.session_state['news_page']-1)*page_size+1} - {min(st.session_state['news_page']*page_size, total_news)} of {total_news} news items")
-	with col_page[2]:
-		if st.button("Next Page") and st.session_state["news_page"]*page_size < total_news:
-			st.session_state["news_page"] += 1
-			st.rerun()
+	news_period = col_top[3].selectbox("Published", list(NEWS_PERIODS))
+	# Articles are kept in the local store; the list reads headers from it.
+	# A query is synced once per session (or on Refresh), which only asks
+	# the API for articles newer than the stored ones
+	store = get_news_store()
+	query = (tuple(symbols), news_keyword)
+	progress = st.session_state["news_fetched"].setdefault(query, {"synced": False, "more": True, "failed": False})
+	if col_top[2].button("Refresh news"):
+		progress["synced"] = progress["failed"] = False
+	if not progress["synced"] and not progress["failed"]:
+		sync_news(symbols, news_keyword, progress)
+	news_filters = {
+		"symbols": symbols, "keyword": news_keyword or None, "asset_type": ASSET_FILTERS[filter_type],
+		"since": published_since(NEWS_PERIODS[news_period]),
+		# Untagged articles only from this query's searches, not other portfolios'
+		"untagged": news_query(symbols, news_keyword)
+	}
+	if st.session_state.get("news_query") != (query, filter_type, news_period):
+		st.session_state["news_query"] = (query, filter_type, news_period)
+		st.session_state["news_shown"] = NEWS_LIST_STEP
+		st.session_state["news_ids"] = []
+	total_news = store.count(**news_filters)
+	more_upstream = progress["more"]
+	if progress["failed"]:
+		st.warning("News API unavailable, showing stored news.")
+	with st.expander("Sentiment by holding (7-day rolling)"):
+		trend = store.sentiment_trend(symbols)
+		if trend:
+			st.line_chart(pd.DataFrame(trend).pivot(index="date", columns="symbol", values="sentiment"))
+		else:
+			st.info("No scored news for these holdings in the last 30 days.")
 	left, right = st.columns([2, 3])
 	with left:
 		st.subheader("News List")
-		if news_list:
-			for idx, news in enumerate(news_list):
-				btn_label = f"{news['date'][:10]} | {news['symbol']} | {news['title'][:60]}..."
-				if st.button(btn_label, key=f"news_{idx}"):
-					st.session_state["selected_news"] = news
-					st.rerun()
+		# The selection refers to the rows of the previous run's table
+		selected_rows = (st.session_state.get("news_table") or {}).get("selection", {}).get("rows")
+		if selected_rows and st.session_state["news_ids"]:
+			row = selected_rows[0]
+			if row < len(st.session_state["news_ids"]):
+				st.session_state["selected_news_id"] = st.session_state["news_ids"][row]
+		headers = store.headers(0, st.session_state["news_shown"], **news_filters)
+		st.session_state["news_ids"] = [h["id"] for h in headers]
+		if headers:
+			st.dataframe(
+				pd.DataFrame(
+					[(h["date"][:10], h["symbol"], h["title"], h["sentiment"], f"+{h['sources']}" if h["sources"] else "")
+					 for h in headers],
+					columns=["Date", "Asset", "Title", "Sentiment", "Sources"]
+				),
+				column_config={"Sentiment": st.column_config.NumberColumn(format="%+.2f")},
+				hide_index=True, height=420,
+				on_select="rerun", selection_mode="single-row", key="news_table"
+			)
 		else:
 			st.info("No related news found. Try other keywords or filters.")
+		st.caption(f"Showing {len(headers)} of {total_news} stored news items")
+		if (len(headers) < total_news or more_upstream) and st.button("Load more"):
+			st.session_state["news_shown"] = len(headers) + NEWS_LIST_STEP
+			# The API is only asked for older articles once the stored ones run out
+			if len(headers) >= total_news:
+				sync_news(symbols, news_keyword, progress, older=True)
+			st.rerun()
 	with right:
 		st.subheader("News Details")
-		news = st.session_state.get("selected_news")
+		selected_id = st.session_state.get("selected_news_id")
+		try:
+			news = store.article(selected_id, retrieve=retrieve_news_bodies) if selected_id else None
+		except Exception:
+			st.warning("Could not load the article text.")
+			news = store.article(selected_id)
 		if news:
 			col_font = st.columns([1, 1, 3])
 			with col_font[0]:
@@ -294,73 +540,26 @@ with tabs[1]:
 				f"<div style='font-size:{st.session_state['font_size']}px'><b>{news['title']}</b></div>",
 				unsafe_allow_html=True
 			)
-			st.write(f"Author: {news.get('author', 'Unknown')} | Date: {news['date'][:10]} | Related asset: {news['symbol']}")
+			st.write(
+				f"Author: {news['author'] or 'Unknown'} | Date: {news['date'][:10]} | Related asset: {news['symbol']}"
+				+ (f" | Sentiment: {news['sentiment']:+.2f}" if news["sentiment"] is not None else "")
+			)
 			content = news['content'][:1500] + ("..." if len(news['content']) > 1500 else "")
 			st.markdown(
 				f"<div style='font-size:{st.session_state['font_size']}px; line-height:1.6'>{content}</div>",
 				unsafe_allow_html=True
 			)
 			st.markdown(f"[Read full article]({news['url']})", unsafe_allow_html=True)
+			if news["sources"]:
+				# The same story as published by other outlets
+				with st.expander(f"+{news['sources']} sources"):
+					for copy in store.copies(news["id"]):
+						st.markdown(f"- [{copy['title']}]({copy['url']}) ({copy['date'][:10]})")
 		else:
 			st.info("Select a news item from the list to view details.")
 
 # --------- Page 3: Portfolio Analysis ---------
-def get_sector(symbol):
-	info = safe_get_ticker_info(symbol)
-	if info and "sector" in info:
-		sector_map = {
-			"Technology": "科技",
-			"Consumer Cyclical": "消费周期",
-			"Financial Services": "金融服务",
-			"Healthcare": "医疗健康",
-			"Energy": "能源",
-			"Consumer Defensive": "必选消费",
-			"Industrials": "工业",
-			"Real Estate": "房地产",
-			"Utilities": "公用事业",
-			"Communication Services": "通信服务",
-			"Basic Materials": "基础材料"
-		}
-		return sector_map.get(info["sector"], info["sector"])
-	default_map = {
-		"AAPL": "科技", "MSFT": "科技", "NVDA": "科技", "GOOGL": "科技", 
-		"AMZN": "消费", "TSLA": "汽车", "SPY": "ETF", "BTC-USD": "加密货币"
-	}
-	return default_map.get(symbol, "综合")
-
-def get_beta(symbol):
-	info = safe_get_ticker_info(symbol)
-	if info and "beta" in info and info["beta"] is not None:
-		return round(info["beta"], 2)
-	default_map = {"AAPL": 1.2, "MSFT": 1.1, "NVDA": 2.27, "GOOGL": 1.0, "AMZN": 1.3, "TSLA": 1.8, "BTC-USD": 1.39}
-	return default_map.get(symbol, 1.0)
-
-def get_pe(symbol):
-	if is_crypto(symbol):
-		return 0
-	info = safe_get_ticker_info(symbol)
-	if info and "trailingPE" in info and info["trailingPE"] is not None:
-		return round(info["trailingPE"], 2)
-	default_map = {"AAPL": 39.95, "MSFT": 32.1, "NVDA": 53.01, "GOOGL": 28.7, "AMZN": 41.2, "TSLA": 70.5}
-	return default_map.get(symbol, 20)
-
-def get_market_cap(symbol):
-	info = safe_get_ticker_info(symbol)
-	if info and "marketCap" in info and info["marketCap"] is not None:
-		return round(info["marketCap"] / 1e8, 1)
-	default_map = {"AAPL": 30000, "MSFT": 25000, "NVDA": 15000, "GOOGL": 18000, "AMZN": 17000, "TSLA": 8000, "BTC-USD": 9000}
-	return default_map.get(symbol, 5000)
-
-def get_dividend(symbol):
-	if is_crypto(symbol) or is_etf(symbol):
-		return 0
-	info = safe_get_ticker_info(symbol)
-	if info and "dividendYield" in info and info["dividendYield"] is not None:
-		return round(info["dividendYield"] * 100, 2)
-	default_map = {"AAPL": 0.6, "MSFT": 0.8, "NVDA": 0.1, "GOOGL": 0, "AMZN": 0, "TSLA": 0}
-	return default_map.get(symbol, 0)
-
-with tabs[2]:
+with tabs[2], span("tab.portfolio_analysis"):
 	st.header("Portfolio Analysis")
 	portfolios = st.session_state.get("portfolios", [])
 	if portfolios:
@@ -377,13 +576,11 @@ with tabs[2]:
 		holdings = ["AAPL", "MSFT", "NVDA", "SPY", "BTC-USD"]
 		weights = {s: 20 for s in holdings}
 		st.info(f"Using demo data: {', '.join(holdings)}")
+	metrics = portfolio_metrics(selected if portfolios else "__demo__", holdings, weights)
 	st.subheader("Asset Allocation Analysis")
 	analysis_tabs = st.tabs(["Asset Type", "Sector Distribution", "Region Distribution"])
 	with analysis_tabs[0]:
-		type_data = {}
-		for s in holdings:
-			asset_type = get_asset_type(s)
-			type_data[asset_type] = type_data.get(asset_type, 0) + weights[s]
+		type_data = metrics.allocation("asset_type")
 		fig, ax = plt.subplots(figsize=(8, 6))
 		wedges, texts, autotexts = ax.pie(
 			type_data.values(), 
@@ -393,13 +590,9 @@ with tabs[2]:
 		)
 		plt.setp(autotexts, size=10, weight="bold")
 		ax.set_title('Asset Type Distribution (by weight)')
-		st.pyplot(fig)
+		render_chart(fig, "asset_type")
 	with analysis_tabs[1]:
-		sector_data = {}
-		for s in holdings:
-			if get_asset_type(s) != "ETF" and not is_crypto(s):
-				sector = get_sector(s)
-				sector_data[sector] = sector_data.get(sector, 0) + weights[s]
+		sector_data = metrics.allocation("sector")
 		fig, ax = plt.subplots(figsize=(8, 6))
 		wedges, texts, autotexts = ax.pie(
 			sector_data.values(), 
@@ -409,17 +602,9 @@ with tabs[2]:
 		)
 		plt.setp(autotexts, size=10, weight="bold")
 		ax.set_title('Sector Distribution (by weight)')
-		st.pyplot(fig)
+		render_chart(fig, "sector")
 	with analysis_tabs[2]:
-		region_data = {"US": 0, "Europe": 0, "Asia": 0, "Other": 0}
-		us_stocks = ["AAPL", "MSFT", "NVDA", "GOOGL", "AMZN", "TSLA", "SPY"]
-		for s in holdings:
-			if s in us_stocks:
-				region_data["US"] += weights[s]
-			elif s in ["BTC-USD", "ETH-USD"]:
-				region_data["Other"] += weights[s]
-			else:
-				region_data["Asia"] += weights[s]
+		region_data = metrics.allocation("region")
 		fig, ax = plt.subplots(figsize=(8, 6))
 		wedges, texts, autotexts = ax.pie(
 			region_data.values(), 
@@ -429,14 +614,13 @@ with tabs[2]:
 		)
 		plt.setp(autotexts, size=10, weight="bold")
 		ax.set_title('Region Distribution (by weight)')
-		st.pyplot(fig)
+		render_chart(fig, "region")
 	st.subheader("Risk and Return Analysis")
-	betas = {s: get_beta(s) for s in holdings}
-	portfolio_beta = sum(betas[s] * weights[s] / 100 for s in holdings)
-	pes = {s: get_pe(s) for s in holdings}
-	portfolio_pe = sum(pes[s] * weights[s] / 100 for s in holdings if pes[s] > 0)
-	divs = {s: get_dividend(s) for s in holdings}
-	portfolio_div = sum(divs[s] * weights[s] / 100 for s in holdings)
+	betas = metrics.values("beta")
+	portfolio_beta = metrics.beta
+	pes = metrics.values("pe")
+	portfolio_pe = metrics.pe
+	portfolio_div = metrics.dividend
 	col_metrics = st.columns(3)
 	col_metrics[0].metric("Portfolio Beta", round(portfolio_beta, 2), help="Measures correlation with market. >1 means more volatile than market.")
 	col_metrics[1].metric("Portfolio P/E", round(portfolio_pe, 2) if portfolio_pe else "N/A", help="Reflects valuation level. Lower may mean cheaper.")
@@ -450,7 +634,7 @@ with tabs[2]:
 	ax.set_title('Beta Comparison by Asset')
 	ax.set_ylabel('Beta')
 	ax.legend()
-	st.pyplot(fig)
+	render_chart(fig, "beta")
 	pe_data = {s: pes[s] for s in holdings if pes[s] > 0}
 	if pe_data:
 		fig, ax = plt.subplots(figsize=(10, 6))
@@ -462,10 +646,139 @@ with tabs[2]:
 		ax.set_title('P/E Comparison by Asset')
 		ax.set_ylabel('P/E')
 		ax.legend()
-		st.pyplot(fig)
+		render_chart(fig, "pe")
+	st.subheader("Valuation History")
+	# Computed from the .info snapshots saved at each fetch; nothing is fetched here
+	fundamentals = get_fundamentals_store()
+	recorded = fundamentals.span(holdings)
+	if recorded is None:
+		st.info("No fundamentals history recorded for these holdings yet. A snapshot is saved whenever their data is fetched.")
+	else:
+		value_dates = pd.date_range(recorded[0], max(pd.Timestamp(recorded[1]), pd.Timestamp(datetime.now().date())), freq="D")
+		snapshots, known = fundamentals.as_of(holdings, value_dates)
+		value_history = analytics.valuation_history(holdings, weights, snapshots, known)
+		value_labels = {"beta": "Portfolio Beta", "pe": "Portfolio P/E", "dividend": "Portfolio Dividend Yield (%)"}
+		for col, (field, label) in zip(st.columns(3), value_labels.items()):
+			col.caption(label)
+			col.line_chart(pd.DataFrame({label: value_history[field]}, index=value_dates))
+	st.subheader("Rolling Risk")
+	col_roll = st.columns(2)
+	roll_periods = {"1 year": "1y", "2 years": "2y", "5 years": "5y", "10 years": "10y"}
+	roll_windows = {"1 month": 21, "3 months": 63, "6 months": 126, "1 year": 252}
+	roll_period = col_roll[0].selectbox("History", list(roll_periods), index=1, key="roll_period")
+	roll_window = col_roll[1].selectbox("Rolling window", list(roll_windows), index=1, key="roll_window")
+	calendar, closes = price_matrix(list(holdings) + ["SPY"], roll_periods[roll_period])
+	with span("rolling_risk.compute"):
+		rolling = analytics.rolling_risk(holdings, weights, closes, roll_windows[roll_window])
+	if rolling is None:
+		st.info("Not enough price history for this rolling window.")
+	else:
+		dates = calendar[rolling["rows"]]
+		portfolio_series = {
+			"Volatility (%)": rolling["volatility"][:, -1] * 100,
+			"Drawdown (%)": -rolling["drawdown"][:, -1] * 100,
+			"Sharpe": rolling["sharpe"][:, -1],
+			"Sortino": rolling["sortino"][:, -1],
+		}
+		if rolling["tracking_error"] is not None:
+			portfolio_series["Tracking Error vs SPY (%)"] = rolling["tracking_error"][:, -1] * 100
+		col_roll = st.columns(2)
+		col_roll[0].caption(f"Portfolio volatility and drawdown, {roll_window} window (%)")
+		col_roll[0].line_chart(pd.DataFrame(
+			{k: portfolio_series[k] for k in portfolio_series if k.endswith("(%)")}, index=dates
+		))
+		col_roll[1].caption(f"Portfolio Sharpe and Sortino, {roll_window} window")
+		col_roll[1].line_chart(pd.DataFrame({k: portfolio_series[k] for k in ("Sharpe", "Sortino")}, index=dates))
+		latest = {
+			"Asset": rolling["columns"],
+			"Volatility (%)": rolling["volatility"][-1] * 100,
+			"Sharpe": rolling["sharpe"][-1],
+			"Sortino": rolling["sortino"][-1],
+			"Max Drawdown (%)": rolling["max_drawdown"] * 100,
+		}
+		if rolling["tracking_error"] is not None:
+			latest["Tracking Error vs SPY (%)"] = rolling["tracking_error"][-1] * 100
+		st.caption(f"Latest {roll_window} figures; max drawdown over the whole history")
+		st.dataframe(pd.DataFrame(latest).round(2), hide_index=True)
+	st.subheader("Correlation Analysis")
+	corr_windows = {"3 months": "3mo", "6 months": "6mo", "1 year": "1y", "2 years": "2y"}
+	corr_window = st.selectbox("Return window", list(corr_windows), index=2, key="corr_window")
+	corr_symbols, corr, cov = holdings_correlation(holdings, corr_windows[corr_window])
+	avg_corr = analytics.average_correlation(corr)
+	if avg_corr is None:
+		st.info("Not enough price history to correlate these holdings.")
+	else:
+		col_corr = st.columns(3)
+		col_corr[0].metric("Average Pairwise Correlation", round(avg_corr, 2), help="Daily log returns; lower means better diversified.")
+		col_corr[1].metric("Assets with History", f"{len(corr_symbols)}/{len(holdings)}")
+		corr_view = col_corr[2].radio("Show", ["Correlation", "Covariance"], horizontal=True, key="corr_view")
+		size = min(4 + 0.12 * len(corr_symbols), 16)
+		fig, ax = plt.subplots(figsize=(size + 2, size))
+		if corr_view == "Correlation":
+			im = ax.imshow(corr, cmap="RdBu_r", vmin=-1, vmax=1)
+			label = "Correlation"
+		else:
+			# Annualised, in %^2; centred on 0 so negative covariances stand out
+			known = abs(cov[cov == cov]) * 1e4
+			limit = known.max() if known.size else 1.0
+			im = ax.imshow(cov * 1e4, cmap="RdBu_r", vmin=-limit, vmax=limit)
+			label = "Annualised covariance (%²)"
+		if len(corr_symbols) <= 60:
+			ax.set_xticks(range(len(corr_symbols)), corr_symbols, rotation=90, fontsize=8)
+			ax.set_yticks(range(len(corr_symbols)), corr_symbols, fontsize=8)
+		else:
+			ax.set_xticks([])
+			ax.set_yticks([])
+		fig.colorbar(im, ax=ax, label=label)
+		ax.set_title(f"Return {corr_view}, clustered ({corr_window})")
+		render_chart(fig, corr_view.lower())
+		st.caption("Most correlated pairs")
+		st.dataframe(pd.DataFrame(
+			analytics.correlated_pairs(corr_symbols, corr), columns=["Asset A", "Asset B", "Correlation"]
+		).round(2), hide_index=True)
+	st.subheader("Consolidated Exposure (all portfolios)")
+	if len(portfolios) > 1:
+		matrix = HoldingsMatrix(portfolios)
+		with st.expander("Capital per portfolio"):
+			capital_df = st.data_editor(
+				pd.DataFrame({"Portfolio": matrix.names, "Capital": [1.0] * len(matrix.names)}),
+				disabled=["Portfolio"], hide_index=True, key="portfolio_capital",
+				column_config={"Capital": st.column_config.NumberColumn(min_value=0.0, help="Relative capital; equal by default")}
+			)
+		with span("exposure.consolidate"):
+			# .info is fetched once per process; betas are taken from it first, as above
+			betas = fill_fundamentals(matrix.symbols, _quiet_info)
+			exposure = consolidate(matrix, capital_df["Capital"].fillna(0).to_numpy(), betas)
+		if exposure is None:
+			st.warning("Total capital is zero. Give at least one portfolio some capital.")
+		else:
+			col_exp = st.columns(3)
+			col_exp[0].metric("Portfolios", matrix.shape[0])
+			col_exp[1].metric("Distinct assets", matrix.shape[1])
+			col_exp[2].metric("Consolidated Beta", round(exposure["beta"], 2))
+			sector_exposure = {}
+			for sector, pct in exposure["sector"].items():
+				sector_exposure[sector_label(sector)] = sector_exposure.get(sector_label(sector), 0) + pct
+			col_exp = st.columns(3)
+			for col, title, data in zip(
+				col_exp,
+				["Asset Type (%)", "Sector, stocks only (%)", "Region (%)"],
+				[exposure["asset_type"], sector_exposure, exposure["region"]]
+			):
+				col.caption(title)
+				col.bar_chart(pd.Series(data, name="%"))
+			top = exposure["symbols"].argsort()[::-1][:20]
+			st.caption("Largest consolidated positions")
+			st.dataframe(pd.DataFrame({
+				"Asset": [matrix.symbols[i] for i in top],
+				"Exposure (%)": exposure["symbols"][top].round(2),
+				"Portfolios": [int((matrix.cols == i).sum()) for i in top]
+			}), hide_index=True)
+	else:
+		st.info("Create more than one portfolio to see their consolidated exposure.")
 
 # --------- Page 4: Stock Analysis ---------
-with tabs[3]:
+with tabs[3], span("tab.stock_analysis"):
 	st.header("Stock Market and Technical Chart Analysis")
 	all_symbols = ["AAPL", "MSFT", "NVDA", "SPY", "BTC-USD"]
 	for portfolio in st.session_state["portfolios"]:
@@ -480,14 +793,13 @@ with tabs[3]:
 	period = st.selectbox("选择时间周期", list(period_map.keys()), index=2)
 	try:
 		with st.spinner(f"获取{symbol}数据中..."):
-			ticker = yf.Ticker(symbol)
-			hist = ticker.history(period=period_map[period], interval="1d")
+			hist = fetch_history(symbol, period_map[period], priority=INTERACTIVE)
 			if not hist.empty:
 				price = hist["Close"].iloc[-1]
 				prev_price = hist["Close"].iloc[-2] if len(hist) > 1 else price
 				change = price - prev_price
 				pct_change = (change / prev_price * 100) if prev_price != 0 else 0
-				info = ticker.info
+				info = safe_get_ticker_info(symbol, INTERACTIVE) or {}
 				name = info.get("shortName", symbol)
 				st.subheader(f"{name} ({symbol})")
 				st.metric(
@@ -506,8 +818,7 @@ with tabs[3]:
 				fig, ax = plt.subplots(figsize=(12, 6))
 				ax.plot(hist.index, hist["Close"], label=symbol, linewidth=2)
 				for cs in compare_symbols:
-					cs_ticker = yf.Ticker(cs)
-					cs_hist = cs_ticker.history(period=period_map[period], interval="1d")
+					cs_hist = fetch_history(cs, period_map[period], priority=INTERACTIVE)
 					if not cs_hist.empty:
 						ax.plot(cs_hist.index, cs_hist["Close"], label=cs, linestyle='--')
 				studies = st.multiselect("Add technical indicators", ["5-day MA", "10-day MA", "20-day MA", "60-day MA"], default=["5-day MA", "20-day MA"])
@@ -523,19 +834,19 @@ with tabs[3]:
 				ax.set_ylabel("价格 (USD)")
 				ax.grid(True, alpha=0.3)
 				ax.legend()
-				st.pyplot(fig)
+				render_chart(fig, "price")
 				st.subheader("Volume Analysis")
 				fig, ax = plt.subplots(figsize=(12, 4))
 				ax.bar(hist.index, hist["Volume"], color='blue', alpha=0.6)
 				ax.set_ylabel("Volume")
 				ax.set_title(f"{symbol} Volume Trend")
 				ax.grid(True, alpha=0.3)
-				st.pyplot(fig)
+				render_chart(fig, "volume")
 				st.subheader("Latest News")
-				news = ticker.news if hasattr(ticker, "news") else []
+				news = holding_news(symbol)
 				if news:
-					for n in news[:5]:
-						st.markdown(f"[{n['title']}]({n['link']})")
+					for n in news:
+						st.markdown(f"[{n['title']}]({n['url']}) ({n['date'][:10]})")
 				else:
 					st.info("No news available.")
 			else:
@@ -548,16 +859,89 @@ with tabs[3]:
 		selected_port = st.selectbox("Select portfolio to monitor", portfolio_names)
 		if selected_port:
 			port_idx = portfolio_names.index(selected_port)
-			port_holdings = portfolios[port_idx]["holdings"]
-			cols = st.columns(3)
-			for i, s in enumerate(port_holdings):
+			watch = monitor_watchlist(portfolios[port_idx])
+			col_w = st.columns([3, 2, 1])
+			watch_filter = col_w[0].text_input("Filter assets", key="monitor_filter")
+			sort_columns = {"Symbol": "symbol", "Weight": "weight", "Price": "price", "Change (%)": "change_pct"}
+			watch_sort = col_w[1].selectbox("Sort by", list(sort_columns), key="monitor_sort")
+			descending = col_w[2].toggle("Descending", key="monitor_desc")
+			shown = watch.update(watch_filter, sort_columns[watch_sort], descending)
+			pages = max(1, -(-shown // MONITOR_PAGE_SIZE))
+			if st.session_state.get("monitor_page", 1) > pages:
+				st.session_state["monitor_page"] = pages
+			page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, key="monitor_page") if pages > 1 else 1
+			start = (page - 1) * MONITOR_PAGE_SIZE
+			quotes = {}
+			for s in watch.symbols_at(start, MONITOR_PAGE_SIZE):
 				try:
-					ticker = yf.Ticker(s)
-					hist = ticker.history(period="5d", interval="1d")
+					hist = fetch_history(s, "5d", priority=BACKGROUND)
 					price = hist["Close"].iloc[-1] if not hist.empty else None
+					prev_close = float(hist["Close"].iloc[-2]) if len(hist) > 1 else None
+					watch.set_quote(s, float(price) if price else None, prev_close)
 					if price:
-						cols[i%3].metric(s, f"${price:.2f}")
+						quotes[s] = {"price": float(price), "prev_close": prev_close}
 				except:
+					watch.set_quote(s, None)
+			cols = st.columns(3)
+			for i, (s, _, price, change, change_pct, failed) in enumerate(watch.rows(start, MONITOR_PAGE_SIZE)):
+				if failed or price != price:
 					cols[i%3].metric(s, "N/A")
+				else:
+					cols[i%3].metric(s, f"${price:.2f}", f"{change_pct:+.2f}%" if change_pct == change_pct else None)
+			st.caption(
+				f"{start + 1 if shown else 0}-{min(start + MONITOR_PAGE_SIZE, shown)} of {shown} assets. "
+				"Prices load page by page; assets not loaded yet sort last."
+			)
+			check_alerts(quotes)
 	else:
 		st.info("No portfolios available for monitoring")
+	with st.expander("Price Alerts"):
+		engine = get_alert_engine()
+		alert_labels = {
+			"above": "Price above", "below": "Price below", "move_up": "Day move up (%)",
+			"move_down": "Day move down (%)", "ma_above": "Crosses above MA (days)", "ma_below": "Crosses below MA (days)"
+		}
+		with st.form("alert_rule", clear_on_submit=True):
+			col_al = st.columns([2, 2, 1, 2])
+			alert_symbol = col_al[0].selectbox("Asset", all_symbols, key="alert_symbol")
+			alert_kind = col_al[1].selectbox("Condition", ALERT_KINDS, format_func=alert_labels.get, key="alert_kind")
+			alert_value = col_al[2].number_input("Value", min_value=0.0, value=0.0, key="alert_value")
+			alert_note = col_al[3].text_input("Note", key="alert_note")
+			if st.form_submit_button("Add alert"):
+				try:
+					rule = engine.add_rule(alert_symbol, alert_kind, alert_value, alert_note)
+					st.success(f"Alert added: {describe_alert(rule)}")
+				except ValueError as e:
+					st.error(str(e))
+		rules = engine.rules()
+		if rules:
+			st.caption(f"{len(rules)} alert rules; checked against the monitored portfolio's prices")
+			remove = st.multiselect(
+				"Remove alerts", [r["id"] for r in rules],
+				format_func={r["id"]: describe_alert(r) for r in rules}.get, key="alert_remove"
+			)
+			if remove and st.button("Remove selected alerts"):
+				for rule_id in remove:
+					engine.remove_rule(rule_id)
+				st.rerun()
+		recent = engine.recent(20)
+		if recent:
+			st.caption("Recent alerts")
+			st.dataframe(pd.DataFrame(recent, columns=["time", "message", "price", "note"]).round(2), hide_index=True)
+
+# --------- Debug Panel (opt-in: ?debug=1 or PORTFOLIO_DEBUG=1) ---------
+run = finish_run()
+if run:
+	with st.sidebar:
+		st.header("Debug: Rerun Timings")
+		st.metric("Rerun time (ms)", f"{run.duration * 1000:.1f}")
+		st.dataframe(pd.DataFrame(
+			[{"span": name, "calls": n, "total (ms)": round(total * 1000, 2)} for name, (n, total) in run.span_totals().items()]
+		), hide_index=True)
+		st.subheader("Counters (this rerun)")
+		st.dataframe(pd.DataFrame(
+			[{"counter": name, "kind": label, "value": value} for (name, label), value in sorted(run.counters.items())]
+		), hide_index=True)
+		st.subheader("Coalescer (process-wide)")
+		st.json(get_coalescer().stats())
+		st.caption(f"Prometheus metrics: {METRICS_FILE}")
@@ -1,64 +1,71 @@
+import importlib.util
+import queue
+import threading
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import yfinance as yf
-import pandas as pd
-import numpy as np
-import random
-from datetime import datetime, timedelta
-import matplotlib.dates as mdates
-from matplotlib.figure import Figure
-import requests  # 新增：用于调用真实API
+from lazy_import import lazy_module
+from asset_registry import get_registry
+from rate_limit import RateLimited, INTERACTIVE, BACKGROUND
+from data_provider import get_provider, news_query
+from news_store import get_news_store, retrieve_news, published_since, NewsWindow, ASSET_FILTERS, NEWS_PERIODS
+from news_ingest import refresh_news, older_news
 
-# Set font for international support
-plt.rcParams["font.family"] = ["Arial", "DejaVu Sans", "Liberation Sans"]
-plt.rcParams['axes.unicode_minus'] = False  # Solve the problem of negative sign display
+def _setup_matplotlib(module):
+    import matplotlib
+    # Set font for international support
+    matplotlib.rcParams["font.family"] = ["Arial", "DejaVu Sans", "Liberation Sans"]
+    matplotlib.rcParams['axes.unicode_minus'] = False  # Solve the problem of negative sign display
 
-# Configure real news API (use your API Key)
-WORLD_NEWS_API_KEY = "6d6d5f5d55b64eab94814259cb0a0841"
-WORLD_NEWS_API_URL = "https://api.worldnewsapi.com/search-news"
+# matplotlib, numpy and requests load on first use so the window shows up
+# without waiting for them. Charts use Figure + FigureCanvasTkAgg directly;
+# pyplot (and its backend selection) is not needed.
+mpl_figure = lazy_module("matplotlib.figure", on_load=_setup_matplotlib)
+backend_tkagg = lazy_module("matplotlib.backends.backend_tkagg")
+mdates = lazy_module("matplotlib.dates")
+np = lazy_module("numpy")
+requests = lazy_module("requests")  # 新增：用于调用真实API
+watchlist = lazy_module("watchlist")  # 监控列表的数组存储（依赖 numpy）
+
+# News API key/URL and the live/record/replay switch live in data_provider.py
 
 
 class InvestmentPortfolioApp:
     def __init__(self, root):
         self.root = root
-    self.root.title("Investment Portfolio Management System")
+        self.root.title("Investment Portfolio Management System")
         self.root.geometry("1200x800")
         
-    # Data storage
-    self.portfolios = {}  # All portfolios
-    self.current_portfolio = None  # Currently selected portfolio
-    self.your_picks = []  # Selected assets
-    self.news_data = []  # News data from real API (replaces mock)
-    self.current_news_page = 1
-    self.news_per_page = 12
-    self.selected_stock = "AAPL"  # Default selected stock
-        
-    # Create notebook container
-    self.notebook = ttk.Notebook(root)
-    self.notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        # Data storage
+        self.portfolios = {}  # All portfolios
+        self.current_portfolio = None  # Currently selected portfolio
+        self.your_picks = []  # Selected assets
+        self.news_per_page = 12
+        self.selected_stock = "AAPL"  # Default selected stock
+        
+        # Create notebook container
+        self.notebook = ttk.Notebook(root)
+        self.notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
-    # Create four pages
-    self.page1 = ttk.Frame(self.notebook)
-    self.page2 = ttk.Frame(self.notebook)
-    self.page3 = ttk.Frame(self.notebook)
-    self.page4 = ttk.Frame(self.notebook)
+        # Create four pages
+        self.page1 = ttk.Frame(self.notebook)
+        self.page2 = ttk.Frame(self.notebook)
+        self.page3 = ttk.Frame(self.notebook)
+        self.page4 = ttk.Frame(self.notebook)
 
-    # Add pages to notebook
-    self.notebook.add(self.page1, text="Create Portfolio")
-    self.notebook.add(self.page2, text="News Aggregation")
-    self.notebook.add(self.page3, text="Portfolio Analysis")
-    self.notebook.add(self.page4, text="Stock Analysis")
-        
-    # Initialize each page
-    self.init_page1()
-    self.init_page2()
-    self.init_page3()
-    self.init_page4()
+        # Add pages to notebook
+        self.notebook.add(self.page1, text="Create Portfolio")
+        self.notebook.add(self.page2, text="News Aggregation")
+        self.notebook.add(self.page3, text="Portfolio Analysis")
+        self.notebook.add(self.page4, text="Stock Analysis")
+        
+        # Initialize each page
+        self.init_page1()
+        self.init_page2()
+        self.init_page3()
+        self.init_page4()
 
-    # Bind tab change event (auto-load news on news tab)
-    self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
+        # Bind tab change event (auto-load news on news tab)
+        self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
     
     def on_tab_changed(self, event):
         """Update data on tab change (load real news on news tab)"""
@@ -79,20 +86,20 @@ class InvestmentPortfolioApp:
         right_frame.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=5, pady=5)
         
         # 左侧：手动创建投资组合
-    manual_frame = ttk.LabelFrame(left_frame, text="Manual Create Portfolio")
+        manual_frame = ttk.LabelFrame(left_frame, text="Manual Create Portfolio")
         manual_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         
         # 搜索框
         search_frame = ttk.Frame(manual_frame)
         search_frame.pack(fill=tk.X, padx=5, pady=5)
         
-    ttk.Label(search_frame, text="Search Stock, Crypto or ETF:").pack(side=tk.LEFT, padx=5)
+        ttk.Label(search_frame, text="Search Stock, Crypto or ETF:").pack(side=tk.LEFT, padx=5)
         self.search_entry = ttk.Entry(search_frame)
         self.search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
-    ttk.Button(search_frame, text="Add", command=self.add_from_search).pack(side=tk.LEFT, padx=5)
+        ttk.Button(search_frame, text="Add", command=self.add_from_search).pack(side=tk.LEFT, padx=5)
         
         # 热门股票快捷入口
-    ttk.Label(manual_frame, text="Popular Stocks:").pack(anchor=tk.W, padx=5, pady=5)
+        ttk.Label(manual_frame, text="Popular Stocks:").pack(anchor=tk.W, padx=5, pady=5)
         popular_frame = ttk.Frame(manual_frame)
         popular_frame.pack(fill=tk.X, padx=5, pady=5)
         
@@ -111,7 +118,7 @@ class InvestmentPortfolioApp:
             ).pack(side=tk.LEFT, padx=2, pady=2)
         
         # Your Picks区域
-    picks_frame = ttk.LabelFrame(manual_frame, text="Your Picks")
+        picks_frame = ttk.LabelFrame(manual_frame, text="Your Picks")
         picks_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=10)
         
         self.picks_listbox = tk.Listbox(picks_frame)
@@ -136,10 +143,10 @@ class InvestmentPortfolioApp:
         ).pack(pady=10)
         
         # 右侧：连接经纪商同步投资组合
-    broker_frame = ttk.LabelFrame(right_frame, text="Sync Portfolio from Broker")
+        broker_frame = ttk.LabelFrame(right_frame, text="Sync Portfolio from Broker")
         broker_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         
-    ttk.Label(broker_frame, text="Select Broker:").pack(anchor=tk.W, padx=5, pady=5)
+        ttk.Label(broker_frame, text="Select Broker:").pack(anchor=tk.W, padx=5, pady=5)
         
         brokers = [
             "ally", "robinhood", "Fidelity", "Interactive Brokers",
@@ -170,7 +177,7 @@ class InvestmentPortfolioApp:
         more_brokers_frame = ttk.Frame(broker_frame)
         more_brokers_frame.pack(fill=tk.X, padx=5, pady=20)
         
-    ttk.Label(more_brokers_frame, text="Can't find your broker?").pack(side=tk.LEFT)
+        ttk.Label(more_brokers_frame, text="Can't find your broker?").pack(side=tk.LEFT)
         ttk.Button(
             more_brokers_frame, 
             text="More Brokers", 
@@ -180,7 +187,7 @@ class InvestmentPortfolioApp:
         
         # 创建链接样式
         style = ttk.Style()
-    style.configure("Link.TButton", foreground="blue", background="transparent", borderwidth=0)
+        style.configure("Link.TButton", foreground="blue", background="transparent", borderwidth=0)
     
     def add_from_search(self):
         """Add asset from search box"""
@@ -188,8 +195,7 @@ class InvestmentPortfolioApp:
         if symbol and symbol not in self.your_picks:
             try:
                 # 尝试获取股票信息验证有效性
-                stock = yf.Ticker(symbol)
-                info = stock.info
+                info = get_provider().info(symbol, priority=INTERACTIVE)
                 name = info.get('shortName', symbol)
                 self.your_picks.append(symbol)
                 self.picks_listbox.insert(tk.END, f"{symbol} - {name}")
@@ -201,8 +207,7 @@ class InvestmentPortfolioApp:
         """Add popular stock"""
         if symbol not in self.your_picks:
             try:
-                stock = yf.Ticker(symbol)
-                info = stock.info
+                info = get_provider().info(symbol, priority=INTERACTIVE)
                 name = info.get('shortName', symbol)
                 self.your_picks.append(symbol)
                 self.picks_listbox.insert(tk.END, f"{symbol} - {name}")
@@ -229,15 +234,15 @@ class InvestmentPortfolioApp:
             
         # 创建一个简单的对话框获取投资组合名称
         dialog = tk.Toplevel(self.root)
-    dialog.title("Create Portfolio")
+        dialog.title("Create Portfolio")
         dialog.geometry("300x150")
         dialog.transient(self.root)
         dialog.grab_set()
         
-    ttk.Label(dialog, text="Enter portfolio name:").pack(padx=10, pady=10)
+        ttk.Label(dialog, text="Enter portfolio name:").pack(padx=10, pady=10)
         name_entry = ttk.Entry(dialog)
         name_entry.pack(fill=tk.X, padx=10, pady=5)
-    name_entry.insert(0, f"My Portfolio {len(self.portfolios) + 1}")
+        name_entry.insert(0, f"My Portfolio {len(self.portfolios) + 1}")
         
         def save_portfolio():
             name = name_entry.get().strip()
@@ -270,8 +275,8 @@ class InvestmentPortfolioApp:
         button_frame = ttk.Frame(dialog)
         button_frame.pack(fill=tk.X, padx=10, pady=10)
         
-    ttk.Button(button_frame, text="Create", command=save_portfolio).pack(side=tk.RIGHT, padx=5)
-    ttk.Button(button_frame, text="Cancel", command=dialog.destroy).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(button_frame, text="Create", command=save_portfolio).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(button_frame, text="Cancel", command=dialog.destroy).pack(side=tk.RIGHT, padx=5)
         
         name_entry.focus()
         self.root.wait_window(dialog)
@@ -283,7 +288,7 @@ class InvestmentPortfolioApp:
             messagebox.showwarning("Warning", "Please select a broker")
             return
             
-    messagebox.showinfo("Sync", f"Syncing portfolio from {broker}...\n(Mock)")
+        messagebox.showinfo("Sync", f"Syncing portfolio from {broker}...\n(Mock)")
         
         # 模拟同步结果
         sample_portfolio = {
@@ -297,9 +302,9 @@ class InvestmentPortfolioApp:
             }
         }
         
-    self.portfolios[sample_portfolio["name"]] = sample_portfolio
-    self.current_portfolio = sample_portfolio["name"]
-    messagebox.showinfo("Success", f"Portfolio from {broker} synced")
+        self.portfolios[sample_portfolio["name"]] = sample_portfolio
+        self.current_portfolio = sample_portfolio["name"]
+        messagebox.showinfo("Success", f"Portfolio from {broker} synced")
     
     def upload_csv(self):
         """Upload CSV file (mock)"""
@@ -351,25 +356,48 @@ class InvestmentPortfolioApp:
         ttk.Label(search_frame, text="筛选:").pack(side=tk.LEFT, padx=5)
         self.news_filter = ttk.Combobox(
             search_frame, 
-            values=["All Holdings", "Stocks", "ETFs", "Cryptocurrencies"],
+            values=list(ASSET_FILTERS),
             state="readonly"
         )
         self.news_filter.current(0)
         self.news_filter.pack(side=tk.LEFT, padx=5)
+        self.news_period = ttk.Combobox(
+            search_frame,
+            values=list(NEWS_PERIODS),
+            state="readonly",
+            width=14
+        )
+        self.news_period.current(0)
+        self.news_period.pack(side=tk.LEFT, padx=5)
         ttk.Button(search_frame, text="应用", command=self.filter_news).pack(side=tk.LEFT, padx=5)
         
+        # 各标的近7日新闻情绪（滚动平均，-1 最负面 ~ +1 最正面）
+        self.news_sentiment_label = ttk.Label(self.page2, text="")
+        self.news_sentiment_label.pack(fill=tk.X, padx=10)
+        
         # 新闻列表和详情区域
         content_frame = ttk.Frame(self.page2)
         content_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         
-        # 左侧新闻列表
-        self.news_listbox = tk.Listbox(content_frame, width=50, height=25)
-        self.news_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5, pady=5)
+        # 左侧新闻列表：只放可见的行，滚动时从本地新闻库按窗口读取标题
+        self.news_store = get_news_store()
+        self.news_window = None
+        self.news_first = 0  # 列表第一行在筛选结果中的位置
+        self.news_selected_id = None
+        self.news_more = True  # API 是否可能还有更早的新闻
+        list_frame = ttk.Frame(content_frame, width=420)
+        list_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5, pady=5)
+        list_frame.pack_propagate(False)  # 行数跟随区域大小
+        self.news_listbox = tk.Listbox(list_frame, width=50, height=25, exportselection=False)
+        self.news_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         self.news_listbox.bind('<<ListboxSelect>>', self.show_news_details)
         
-        scrollbar = ttk.Scrollbar(content_frame, orient=tk.VERTICAL, command=self.news_listbox.yview)
-        scrollbar.pack(side=tk.LEFT, fill=tk.Y, pady=5)
-        self.news_listbox.config(yscrollcommand=scrollbar.set)
+        self.news_scroll = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.scroll_news)
+        self.news_scroll.pack(side=tk.LEFT, fill=tk.Y)
+        self.news_listbox.bind("<MouseWheel>", self.on_news_wheel)
+        self.news_listbox.bind("<Button-4>", self.on_news_wheel)
+        self.news_listbox.bind("<Button-5>", self.on_news_wheel)
+        list_frame.bind("<Configure>", self.on_news_resize)
         
         # 右侧新闻详情
         self.news_details_frame = ttk.LabelFrame(content_frame, text="新闻详情")
@@ -407,144 +435,192 @@ class InvestmentPortfolioApp:
         self.page_info_label = ttk.Label(pagination_frame, text="")
         self.page_info_label.pack(side=tk.LEFT, padx=5)
         
-        ttk.Button(pagination_frame, text="上一页", command=self.prev_news_page).pack(side=tk.RIGHT, padx=5)
-        ttk.Button(pagination_frame, text="下一页", command=self.next_news_page).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(pagination_frame, text="加载更多", command=self.load_more_news).pack(side=tk.RIGHT, padx=5)
         
         # 初始化时加载真实新闻
         self.load_real_news()
 
-    def load_real_news(self):
-        """调用worldnewsapi获取真实新闻（核心修改）"""
-        # 清空现有新闻数据
-        self.news_data.clear()
-        self.news_listbox.delete(0, tk.END)
-        
-        # 1. 确定搜索关键词（优先用当前投资组合的标的，无则用热门标的）
+    def news_symbols(self):
+        """新闻关联的标的（优先用当前投资组合的标的，无则用热门标的）"""
         if self.current_portfolio and self.portfolios.get(self.current_portfolio):
             # 从当前投资组合提取标的（如AAPL、NVDA）
-            symbols = list(self.portfolios[self.current_portfolio]["holdings"].keys())
-        else:
-            # 无投资组合时，用热门标的作为默认关键词
-            symbols = ["AAPL", "NVDA", "MSFT", "SPY", "BTC-USD"]
-        
-        # 处理加密货币标的格式（如BTC-USD → Bitcoin）
-        keyword_map = {
-            "BTC-USD": "Bitcoin",
-            "ETH-USD": "Ethereum"
-        }
-        # 生成关键词（用OR连接多个标的，扩大搜索范围）
-        keywords = " OR ".join([keyword_map.get(s, s) for s in symbols])
-        
-        # 2. 构造API请求参数（参考worldnewsapi文档）
-        params = {
-            "api-key": WORLD_NEWS_API_KEY,
-            "q": keywords,  # 搜索关键词（投资组合标的）
-            "language": "en",  # 财经新闻以英文为主
-            "sort": "date",  # 按日期排序（最新优先）
-            "page": self.current_news_page,  # 当前页码
-            "page-size": self.news_per_page,  # 每页新闻数量
-            "earliest-publish-date": (datetime.now() - timedelta(days=30)).isoformat()  # 只获取30天内的新闻
-        }
+            return list(self.portfolios[self.current_portfolio]["holdings"].keys())
+        # 无投资组合时，用热门标的作为默认关键词
+        return ["AAPL", "NVDA", "MSFT", "SPY", "BTC-USD"]
+    
+    def load_real_news(self, more=False):
+        """调用worldnewsapi（并同时读取各标的的yfinance新闻）增量同步新闻到本地新闻库；more=True 时拉取更早的一页"""
+        # 搜索关键词为投资组合标的（加密货币按名称搜索，如BTC-USD → Bitcoin），由 news_search_params 生成
+        symbols = self.news_symbols()
         
         try:
-            # 3. 发送API请求
-            response = requests.get(WORLD_NEWS_API_URL, params=params, timeout=10)
-            response.raise_for_status()  # 触发HTTP错误（如401密钥无效、429请求超限）
-            api_data = response.json()
-            
-            # 4. 解析API响应，适配原有新闻数据结构
-            if api_data.get("news"):
-                for idx, news_item in enumerate(api_data["news"]):
-                    # 提取核心字段（标题、日期、内容、链接、关联标的）
-                    related_symbol = self._match_news_to_symbol(news_item["title"], symbols)
-                    self.news_data.append({
-                        "id": idx,
-                        "symbol": related_symbol,  # 匹配的投资组合标的
-                        "date": news_item["publish-date"].split("T")[0],  # 格式：2024-05-20
-                        "title": news_item["title"],
-                        "content": news_item.get("text", "无详细内容"),  # 新闻摘要
-                        "full_content": news_item.get("text", "无详细内容"),  # 真实新闻无"更多内容"，复用摘要
-                        "url": news_item.get("url", "")  # 新闻原链接（用于跳转）
-                    })
+            # 只请求比库中最新一条更新的新闻（首次同步取30天内最新一页）；
+            # 请求经共享限流器，429时自动按Retry-After退避重试
+            if more:
+                added, self.news_more = older_news(self.news_store, symbols, page_size=self.news_per_page)
+            else:
+                added, total_news = refresh_news(self.news_store, symbols, page_size=self.news_per_page)
             
-            # 5. 更新新闻列表和分页信息
-            self.filtered_news = self.news_data
-            self.update_news_list()
+            # 更新新闻列表（保持当前滚动位置）
+            self.refresh_news_view(keep_position=more)
             
-            # 提示用户新闻加载结果
-            total_news = api_data.get("total-results", 0)
-            messagebox.showinfo("新闻加载成功", f"共获取到 {total_news} 条相关新闻（30天内）")
+            if not more:
+                # 提示用户新闻加载结果
+                messagebox.showinfo("新闻加载成功", f"本次同步获取到 {total_news} 条新闻，新增 {added} 条")
         
         except requests.exceptions.HTTPError as e:
             # 处理HTTP错误（如密钥无效、请求超限）
             error_msg = f"API请求失败: {e}\n"
-            if response.status_code == 401:
+            if e.response is not None and e.response.status_code == 401:
                 error_msg += "可能原因：API密钥无效或已过期"
-            elif response.status_code == 429:
-                error_msg += "可能原因：API请求次数超限（请检查worldnewsapi账户配额）"
             messagebox.showerror("新闻加载失败", error_msg)
+        except RateLimited as e:
+            messagebox.showerror("新闻加载失败", f"API请求次数超限，多次退避重试后仍失败（请检查worldnewsapi账户配额）\n{e}")
         except requests.exceptions.Timeout:
             messagebox.showerror("新闻加载失败", "API请求超时，请检查网络连接")
         except Exception as e:
             messagebox.showerror("新闻加载失败", f"未知错误: {str(e)}")
-
-    def _match_news_to_symbol(self, news_title, symbols):
-        """辅助方法：将新闻标题与投资组合标的匹配（如标题含AAPL则关联AAPL）"""
-        title_lower = news_title.lower()
-        for symbol in symbols:
-            # 处理加密货币（如BTC-USD → BTC）
-            symbol_simple = symbol.replace("-USD", "")
-            if symbol.lower() in title_lower or symbol_simple.lower() in title_lower:
-                return symbol
-        return "OTHER"  # 无匹配标的时标记为OTHER
-
+        finally:
+            if self.news_window is None:
+                # 请求失败时仍可浏览库中已有的新闻
+                self.refresh_news_view()
+    
+    def has_more_news(self):
+        """API 是否可能还有更早的新闻"""
+        return self.news_more
+    
+    def load_more_news(self):
+        """加载更多：先显示库中已有的行，到底后再向API请求下一页"""
+        visible = self.news_visible_rows()
+        total = len(self.news_window) if self.news_window is not None else 0
+        if self.news_first + visible >= total and self.has_more_news():
+            self.load_real_news(more=True)
+        self.news_first += visible
+        self.render_news()
+    
+    def selected_news_header(self):
+        """列表中选中行的标题信息（不含正文）"""
+        selected_indices = self.news_listbox.curselection()
+        if not selected_indices or self.news_window is None:
+            return None
+        rows = self.news_window.rows(self.news_first + selected_indices[0], 1)
+        return rows[0] if rows else None
+    
     def open_news_link(self):
         """打开新闻原链接（替换原"继续阅读"功能，真实新闻需跳转原网站）"""
-        selected_indices = self.news_listbox.curselection()
-        if not selected_indices:
+        news = self.news_store.article(self.news_selected_id) if self.news_selected_id else None
+        if news is None:
             return
         
-        idx = selected_indices[0]
-        start_idx = (self.current_news_page - 1) * self.news_per_page
-        news = self.filtered_news[start_idx + idx]
-        
         if news.get("url"):
             import webbrowser
             webbrowser.open(news["url"])  # 调用默认浏览器打开链接
         else:
             messagebox.showwarning("无链接", "该新闻无可用原链接")
-
-    def update_news_list(self):
-        """更新新闻列表（无修改，适配真实数据）"""
+    
+    def refresh_news_view(self, keep_position=False):
+        """按当前搜索词和筛选条件重新建立列表窗口"""
+        self.news_window = NewsWindow(
+            self.news_store,
+            symbols=self.news_symbols(),
+            keyword=self.news_search_entry.get().strip(),
+            asset_type=ASSET_FILTERS.get(self.news_filter.get()),
+            since=published_since(NEWS_PERIODS.get(self.news_period.get())),
+            untagged=news_query(self.news_symbols())  # 未标注的新闻只显示本组合的搜索返回的
+        )
+        if not keep_position:
+            self.news_first = 0
+        self.render_news()
+        self.render_news_sentiment()
+    
+    def render_news_sentiment(self):
+        """显示各标的最近一天的7日滚动情绪"""
+        latest = {}
+        for row in self.news_store.sentiment_trend(self.news_symbols()):
+            latest[row["symbol"]] = row["sentiment"]
+        text = " | ".join(f"{symbol} {score:+.2f}" for symbol, score in latest.items())
+        self.news_sentiment_label.config(text=f"新闻情绪(7日): {text}" if text else "")
+    
+    def news_visible_rows(self):
+        return max(1, int(self.news_listbox.cget("height")))
+    
+    def render_news(self):
+        """只插入可见的行，耗时与新闻总数无关"""
+        total = len(self.news_window) if self.news_window is not None else 0
+        visible = self.news_visible_rows()
+        self.news_first = max(0, min(self.news_first, total - visible))
+        rows = self.news_window.rows(self.news_first, visible) if total else []
         self.news_listbox.delete(0, tk.END)
-        
-        total_news = len(self.filtered_news)
-        start_idx = (self.current_news_page - 1) * self.news_per_page
-        end_idx = min(start_idx + self.news_per_page, total_news)
+        for news in rows:
+            sources = f" (+{news['sources']})" if news["sources"] else ""
+            self.news_listbox.insert(tk.END, f"{news['date'][:10]} | {news['symbol']} | {news['title'][:50]}...{sources}")
+        # 选中的新闻滚出再滚回时保持选中
+        for i, news in enumerate(rows):
+            if news["id"] == self.news_selected_id:
+                self.news_listbox.selection_set(i)
         
         # 更新页面信息
-        self.page_info_label.config(text=f"{start_idx + 1} - {end_idx} of {total_news}")
-        
-        # 添加当前页的新闻
-        for news in self.filtered_news[start_idx:end_idx]:
-            self.news_listbox.insert(tk.END, f"{news['date']} | {news['symbol']} | {news['title'][:50]}...")
+        end_idx = self.news_first + len(rows)
+        self.page_info_label.config(text=f"{self.news_first + 1 if rows else 0} - {end_idx} of {total}")
+        if total:
+            self.news_scroll.set(self.news_first / total, end_idx / total)
+        else:
+            self.news_scroll.set(0, 1)
+    
+    def scroll_news(self, action, amount, unit=None):
+        """滚动条回调: ("moveto", 比例) 或 ("scroll", 步数, "units"/"pages")；滚到底时自动加载下一页"""
+        total = len(self.news_window) if self.news_window is not None else 0
+        visible = self.news_visible_rows()
+        if action == "moveto":
+            self.news_first = int(float(amount) * total)
+        else:
+            step = visible if unit == "pages" else 1
+            self.news_first += int(amount) * step
+        # 拖动滚动条不触发加载，避免拖到底时连续请求
+        if action != "moveto" and self.news_first + visible >= total and self.has_more_news():
+            self.load_real_news(more=True)
+        else:
+            self.render_news()
+    
+    def on_news_wheel(self, event):
+        steps = -3 if event.num == 4 or event.delta > 0 else 3
+        self.scroll_news("scroll", steps, "units")
+        return "break"
+    
+    def on_news_resize(self, event):
+        # 按区域高度调整可见行数（默认行高约 17 像素）
+        rows = max(1, event.height // 17)
+        if rows != self.news_visible_rows():
+            self.news_listbox.configure(height=rows)
+            self.render_news()
     
     def show_news_details(self, event):
-        """显示新闻详情（适配真实数据，添加链接跳转按钮）"""
-        selected_indices = self.news_listbox.curselection()
-        if not selected_indices:
+        """显示新闻详情：选中时才从新闻库读取正文"""
+        header = self.selected_news_header()
+        if header is None:
             return
-            
-        idx = selected_indices[0]
-        start_idx = (self.current_news_page - 1) * self.news_per_page
-        news = self.filtered_news[start_idx + idx]
+        try:
+            # 正文不在本地缓存时按id向API取回
+            news = self.news_store.article(header["id"], retrieve=retrieve_news)
+        except Exception:
+            news = self.news_store.article(header["id"])
+        if news is None:
+            return
+        self.news_selected_id = news["id"]
+        content = news["content"] or "无详细内容"
         
         # 显示新闻详情
         self.news_text.config(state=tk.NORMAL)
         self.news_text.delete(1.0, tk.END)
         self.news_text.insert(tk.END, f"{news['title']}\n\n")
-        self.news_text.insert(tk.END, f"日期: {news['date']} | 关联标的: {news['symbol']}\n\n")
-        self.news_text.insert(tk.END, f"{news['content'][:500]}..." if len(news['content']) > 500 else news['content'])
+        self.news_text.insert(tk.END, f"日期: {news['date'][:10]} | 关联标的: {news['symbol']}\n")
+        if news["sentiment"] is not None:
+            self.news_text.insert(tk.END, f"情绪: {news['sentiment']:+.2f}\n")
+        if news["sources"]:
+            # 同一篇通稿被其他媒体转载的次数
+            self.news_text.insert(tk.END, f"另有 {news['sources']} 家媒体转载\n")
+        self.news_text.insert(tk.END, "\n")
+        self.news_text.insert(tk.END, f"{content[:500]}..." if len(content) > 500 else content)
         self.news_text.config(state=tk.DISABLED)
         
         # 显示"跳转原链接"按钮（如果有链接）
@@ -563,53 +639,13 @@ class InvestmentPortfolioApp:
         self.news_text.configure(font=new_font)
     
     def search_news(self):
-        """搜索新闻（适配真实数据，按关键词过滤）"""
-        keyword = self.news_search_entry.get().strip().lower()
-        if not keyword:
-            self.filtered_news = self.news_data
-        else:
-            self.filtered_news = [
-                news for news in self.news_data 
-                if keyword in news["title"].lower() or 
-                   keyword in news["content"].lower() or
-                   keyword in news["symbol"].lower()
-            ]
-        
-        self.current_news_page = 1
-        self.update_news_list()
+        """搜索新闻（在本地新闻库中按标题、正文、标的匹配关键词）"""
+        self.refresh_news_view()
     
     def filter_news(self):
-        """筛选新闻（按标的类型：股票/ETF/加密货币，无修改）"""
-        filter_type = self.news_filter.get()
-        
-        if filter_type == "All Holdings":
-            self.filtered_news = self.news_data
-        elif filter_type == "Stocks":
-            # 筛选股票（排除ETF和加密货币）
-            self.filtered_news = [
-                news for news in self.news_data 
-                if "-" not in news["symbol"] and news["symbol"] not in ["SPY"]
-            ]
-        elif filter_type == "ETFs":
-            self.filtered_news = [news for news in self.news_data if news["symbol"] in ["SPY"]]
-        elif filter_type == "Cryptocurrencies":
-            self.filtered_news = [news for news in self.news_data if "-USD" in news["symbol"]]
-        
-        self.current_news_page = 1
-        self.update_news_list()
-    
-    def prev_news_page(self):
-        """Previous page (no change)"""
-        if self.current_news_page > 1:
-            self.current_news_page -= 1
-            self.load_real_news()  # 分页时重新调用API获取对应页数据
-    
-    def next_news_page(self):
-        """Next page (no change)"""
-        # 直接调用API加载下一页（worldnewsapi支持分页）
-        self.current_news_page += 1
-        self.load_real_news()
-    
+        """筛选新闻（按标的类型：股票/ETF/加密货币，类型取自资产登记表；按发布时间）"""
+        self.refresh_news_view()
+
     def add_portfolio(self):
         """Add new portfolio (reuse page 1 function)"""
         self.notebook.select(self.page1)
@@ -626,7 +662,7 @@ class InvestmentPortfolioApp:
         top_frame = ttk.Frame(self.page3)
         top_frame.pack(fill=tk.X, padx=5, pady=5)
         
-    ttk.Label(top_frame, text="Select Portfolio:").pack(side=tk.LEFT, padx=5)
+        ttk.Label(top_frame, text="Select Portfolio:").pack(side=tk.LEFT, padx=5)
         self.portfolio_combobox = ttk.Combobox(top_frame, state="readonly")
         self.portfolio_combobox.pack(side=tk.LEFT, padx=5)
         self.portfolio_combobox.bind("<<ComboboxSelected>>", lambda e: self.update_portfolio_analysis())
@@ -637,19 +673,19 @@ class InvestmentPortfolioApp:
         
         # 资产配置分析
         self.asset_allocation_frame = ttk.Frame(self.analysis_notebook)
-    self.analysis_notebook.add(self.asset_allocation_frame, text="Asset Allocation Analysis")
+        self.analysis_notebook.add(self.asset_allocation_frame, text="Asset Allocation Analysis")
         
         # 持仓分布分析
         self.holdings_distribution_frame = ttk.Frame(self.analysis_notebook)
-    self.analysis_notebook.add(self.holdings_distribution_frame, text="Holdings Distribution Analysis")
+        self.analysis_notebook.add(self.holdings_distribution_frame, text="Holdings Distribution Analysis")
         
         # 波动率分析
         self.volatility_frame = ttk.Frame(self.analysis_notebook)
-    self.analysis_notebook.add(self.volatility_frame, text="Volatility Analysis")
+        self.analysis_notebook.add(self.volatility_frame, text="Volatility Analysis")
         
         # 市盈率分析
         self.pe_ratio_frame = ttk.Frame(self.analysis_notebook)
-    self.analysis_notebook.add(self.pe_ratio_frame, text="P/E Ratio Analysis")
+        self.analysis_notebook.add(self.pe_ratio_frame, text="P/E Ratio Analysis")
         
         # 初始化资产配置分析的标签
         self.asset_tabs = ttk.Notebook(self.asset_allocation_frame)
@@ -659,15 +695,15 @@ class InvestmentPortfolioApp:
         self.top_stocks_frame = ttk.Frame(self.asset_tabs)
         self.geo_allocation_frame = ttk.Frame(self.asset_tabs)
         
-    self.asset_tabs.add(self.asset_type_frame, text="Asset Type")
-    self.asset_tabs.add(self.top_stocks_frame, text="Top Stocks")
-    self.asset_tabs.add(self.geo_allocation_frame, text="Geographic Allocation")
+        self.asset_tabs.add(self.asset_type_frame, text="Asset Type")
+        self.asset_tabs.add(self.top_stocks_frame, text="Top Stocks")
+        self.asset_tabs.add(self.geo_allocation_frame, text="Geographic Allocation")
         
         # 初始化持仓分布分析的筛选器
         self.holdings_filter_frame = ttk.Frame(self.holdings_distribution_frame)
         self.holdings_filter_frame.pack(fill=tk.X, padx=5, pady=5)
         
-    ttk.Label(self.holdings_filter_frame, text="Filter by:").pack(side=tk.LEFT, padx=5)
+        ttk.Label(self.holdings_filter_frame, text="Filter by:").pack(side=tk.LEFT, padx=5)
         self.holdings_filter = ttk.Combobox(
             self.holdings_filter_frame,
             values=["By Sector", "By Market Cap", "By Dividend", "By Beta", "By P/E Ratio"],
@@ -678,14 +714,14 @@ class InvestmentPortfolioApp:
         self.holdings_filter.bind("<<ComboboxSelected>>", lambda e: self.update_holdings_distribution())
     
     def update_portfolio_combobox(self):
-    """Update portfolio dropdown"""
+        """Update portfolio dropdown"""
         portfolio_names = list(self.portfolios.keys())
         self.portfolio_combobox['values'] = portfolio_names
         if portfolio_names and not self.portfolio_combobox.get() and self.current_portfolio:
             self.portfolio_combobox.set(self.current_portfolio)
     
     def update_portfolio_analysis(self):
-    """Update portfolio analysis data"""
+        """Update portfolio analysis data"""
         self.update_portfolio_combobox()
         
         selected_portfolio = self.portfolio_combobox.get()
@@ -702,7 +738,7 @@ class InvestmentPortfolioApp:
         self.update_pe_analysis(portfolio)
     
     def update_asset_allocation(self, portfolio):
-    """Update asset allocation analysis"""
+        """Update asset allocation analysis"""
         # 清空现有图表
         for widget in self.asset_type_frame.winfo_children():
             widget.destroy()
@@ -712,65 +748,57 @@ class InvestmentPortfolioApp:
             widget.destroy()
         
         # 资产类型分析
-    asset_types = {"Stock": 0, "ETF": 0, "Crypto": 0, "Fund": 0, "Cash": 0}
+        asset_types = {"Stock": 0, "ETF": 0, "Crypto": 0, "Fund": 0, "Cash": 0}
         
-        for symbol, data in portfolio["holdings"].items():
-            weight = data["weight"]
-            if "-USD" in symbol:  # Crypto
-                asset_types["Crypto"] += weight
-            elif symbol in ["SPY", "QQQ", "DIA"]:  # ETF
-                asset_types["ETF"] += weight
-            else:  # Stock
-                asset_types["Stock"] += weight
+        registry = get_registry()
+        symbols = list(portfolio["holdings"].keys())
+        weights = {symbol: data["weight"] for symbol, data in portfolio["holdings"].items()}
+        type_labels = {"Cryptocurrency": "Crypto"}
+        for asset_type, weight in registry.breakdown(symbols, weights, "asset_type").items():
+            label = type_labels.get(asset_type, asset_type)
+            asset_types[label] = asset_types.get(label, 0) + weight
         
         # 过滤掉0值
         asset_types = {k: v for k, v in asset_types.items() if v > 0}
         
         # 创建饼图
-        fig = Figure(figsize=(6, 5), dpi=100)
+        fig = mpl_figure.Figure(figsize=(6, 5), dpi=100)
         ax = fig.add_subplot(111)
         ax.pie(asset_types.values(), labels=asset_types.keys(), autopct='%1.1f%%', startangle=90)
         ax.axis('equal')
-    ax.set_title('Asset Type Distribution')
+        ax.set_title('Asset Type Distribution')
         
-        canvas = FigureCanvasTkAgg(fig, master=self.asset_type_frame)
+        canvas = backend_tkagg.FigureCanvasTkAgg(fig, master=self.asset_type_frame)
         canvas.draw()
         canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
         
         # 顶级股票分析
-        top_stocks = {k: v["weight"] for k, v in portfolio["holdings"].items() if "-USD" not in k and k not in ["SPY", "QQQ", "DIA"]}
+        top_stocks = {k: v["weight"] for k, v in portfolio["holdings"].items() if registry.asset_type(k) == "Stock"}
         top_stocks = dict(sorted(top_stocks.items(), key=lambda x: x[1], reverse=True)[:5])
         
-        fig = Figure(figsize=(6, 5), dpi=100)
+        fig = mpl_figure.Figure(figsize=(6, 5), dpi=100)
         ax = fig.add_subplot(111)
         ax.bar(top_stocks.keys(), top_stocks.values())
-    ax.set_title('Top Stocks Weight')
-    ax.set_ylabel('Weight (%)')
+        ax.set_title('Top Stocks Weight')
+        ax.set_ylabel('Weight (%)')
         
-        canvas = FigureCanvasTkAgg(fig, master=self.top_stocks_frame)
+        canvas = backend_tkagg.FigureCanvasTkAgg(fig, master=self.top_stocks_frame)
         canvas.draw()
         canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
         
         # 地域配置分析（模拟数据）
-    regions = {"USA": 0, "Europe": 0, "Asia": 0, "Other": 0}
-    us_stocks = ["AAPL", "MSFT", "NVDA", "GOOGL", "AMZN", "TSLA", "SPY"]
+        regions = {"USA": 0, "Europe": 0, "Asia": 0, "Other": 0}
+        for region, weight in registry.breakdown(symbols, weights, "region").items():
+            label = "USA" if region == "US" else region
+            regions[label] = regions.get(label, 0) + weight
         
-        for symbol, data in portfolio["holdings"].items():
-            weight = data["weight"]
-            if symbol in us_stocks:
-                regions["USA"] += weight
-            else:
-                # Randomly assign other regions
-                region = random.choice(["Europe", "Asia", "Other"])
-                regions[region] += weight
-        
-        fig = Figure(figsize=(6, 5), dpi=100)
+        fig = mpl_figure.Figure(figsize=(6, 5), dpi=100)
         ax = fig.add_subplot(111)
         ax.pie(regions.values(), labels=regions.keys(), autopct='%1.1f%%', startangle=90)
         ax.axis('equal')
-    ax.set_title('Geographic Allocation Distribution')
+        ax.set_title('Geographic Allocation Distribution')
         
-        canvas = FigureCanvasTkAgg(fig, master=self.geo_allocation_frame)
+        canvas = backend_tkagg.FigureCanvasTkAgg(fig, master=self.geo_allocation_frame)
         canvas.draw()
         canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
     
@@ -808,13 +836,13 @@ class InvestmentPortfolioApp:
                 sectors[sector] += data["weight"]
             
             # 创建饼图
-            fig = Figure(figsize=(8, 6), dpi=100)
+            fig = mpl_figure.Figure(figsize=(8, 6), dpi=100)
             ax = fig.add_subplot(111)
             ax.pie(sectors.values(), labels=sectors.keys(), autopct='%1.1f%%', startangle=90)
             ax.axis('equal')
             ax.set_title('按行业分布')
             
-            canvas = FigureCanvasTkAgg(fig, master=self.holdings_distribution_frame)
+            canvas = backend_tkagg.FigureCanvasTkAgg(fig, master=self.holdings_distribution_frame)
             canvas.draw()
             canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
             
@@ -829,33 +857,29 @@ class InvestmentPortfolioApp:
         elif filter_type == "市值（By Market Cap）":
             # 模拟市值数据
             market_caps = {"大盘": 0, "中盘": 0, "小盘": 0}
-            large_cap = ["AAPL", "MSFT", "GOOGL", "AMZN", "SPY"]
+            cap_labels = {"Large": "大盘", "Mid": "中盘"}
+            weights = {symbol: data["weight"] for symbol, data in portfolio["holdings"].items()}
             
-            for symbol, data in portfolio["holdings"].items():
-                if symbol in large_cap:
-                    market_caps["大盘"] += data["weight"]
-                elif symbol in ["NVDA", "TSLA"]:
-                    market_caps["中盘"] += data["weight"]
-                else:
-                    market_caps["小盘"] += data["weight"]
+            for bucket, weight in get_registry().breakdown(list(weights), weights, "cap_bucket").items():
+                market_caps[cap_labels.get(bucket, "小盘")] += weight
             
-            fig = Figure(figsize=(8, 6), dpi=100)
+            fig = mpl_figure.Figure(figsize=(8, 6), dpi=100)
             ax = fig.add_subplot(111)
             ax.bar(market_caps.keys(), market_caps.values())
             ax.set_title('按市值分布')
             ax.set_ylabel('占比 (%)')
             
-            canvas = FigureCanvasTkAgg(fig, master=self.holdings_distribution_frame)
+            canvas = backend_tkagg.FigureCanvasTkAgg(fig, master=self.holdings_distribution_frame)
             canvas.draw()
             canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
         
         else:  # 其他筛选类型，简化处理
-            fig = Figure(figsize=(8, 6), dpi=100)
+            fig = mpl_figure.Figure(figsize=(8, 6), dpi=100)
             ax = fig.add_subplot(111)
             ax.text(0.5, 0.5, f"{filter_type} 分析", ha='center', va='center', transform=ax.transAxes, fontsize=14)
             ax.set_title(filter_type)
             
-            canvas = FigureCanvasTkAgg(fig, master=self.holdings_distribution_frame)
+            canvas = backend_tkagg.FigureCanvasTkAgg(fig, master=self.holdings_distribution_frame)
             canvas.draw()
             canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
     
@@ -865,18 +889,11 @@ class InvestmentPortfolioApp:
         for widget in self.volatility_frame.winfo_children():
             widget.destroy()
         
-        # 模拟贝塔值数据
+        # 贝塔值取自分类注册表
+        registry = get_registry()
         beta_values = {}
         for symbol in portfolio["holdings"].keys():
-            if symbol == "NVDA":
-                beta = 2.27
-            elif "-USD" in symbol:
-                beta = 1.39
-            elif symbol in ["AAPL", "MSFT"]:
-                beta = round(random.uniform(1.1, 1.3), 2)
-            else:
-                beta = round(random.uniform(0.8, 1.5), 2)
-            beta_values[symbol] = beta
+            beta_values[symbol] = registry.value(symbol, "beta", 1.0)
         
         # 计算组合贝塔值（加权平均）
         portfolio_beta = 0
@@ -936,19 +953,14 @@ class InvestmentPortfolioApp:
         for widget in self.pe_ratio_frame.winfo_children():
             widget.destroy()
         
-        # 模拟市盈率数据
+        # 市盈率取自分类注册表
+        registry = get_registry()
         pe_values = {}
         for symbol in portfolio["holdings"].keys():
-            if symbol == "NVDA":
-                pe = 53.01
-            elif symbol == "AAPL":
-                pe = 39.95
-            elif symbol == "MSFT":
-                pe = 35.78
-            elif "-USD" in symbol:
+            if registry.asset_type(symbol) == "Cryptocurrency":
                 pe = "N/A"  # 加密货币没有市盈率
             else:
-                pe = round(random.uniform(15, 45), 2)
+                pe = registry.value(symbol, "pe", 20)
             pe_values[symbol] = pe
         
         # 计算组合市盈率（加权平均，忽略N/A值）
@@ -1071,19 +1083,37 @@ class InvestmentPortfolioApp:
         self.monitor_portfolio.pack(fill=tk.X, padx=5, pady=5)
         self.monitor_portfolio.bind("<<ComboboxSelected>>", lambda e: self.update_monitor())
         
-        # 监控列表
+        # 筛选
+        filter_frame = ttk.Frame(self.monitor_frame)
+        filter_frame.pack(fill=tk.X, padx=5)
+        ttk.Label(filter_frame, text="筛选:").pack(side=tk.LEFT)
+        self.monitor_filter = tk.StringVar()
+        self.monitor_filter.trace_add("write", lambda *args: self.refresh_monitor_view())
+        ttk.Entry(filter_frame, textvariable=self.monitor_filter).pack(side=tk.LEFT, fill=tk.X, expand=True)
+        
+        # 监控列表（虚拟化：只创建可见的行，排序和筛选在 watchlist.Watchlist 的数组上完成）
+        self.monitor_watchlist = None
+        self.monitor_first = 0
+        self.monitor_sort = ("symbol", False)
+        self.monitor_generation = 0
+        self.monitor_visible_symbols = ()  # 当前可见的标的，供后台线程决定加载顺序
+        tree_frame = ttk.Frame(self.monitor_frame)
+        tree_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        tree_frame.pack_propagate(False)  # 行数跟随区域大小，而不是反过来
         self.monitor_tree = ttk.Treeview(
-            self.monitor_frame, 
+            tree_frame, 
             columns=("symbol", "price", "change", "change_pct"),
             show="headings",
             height=15
         )
+        self.monitor_scroll = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.scroll_monitor)
+        self.monitor_scroll.pack(side=tk.RIGHT, fill=tk.Y)
         
-        # 设置列标题
-        self.monitor_tree.heading("symbol", text="标的")
-        self.monitor_tree.heading("price", text="价格")
-        self.monitor_tree.heading("change", text="涨跌额")
-        self.monitor_tree.heading("change_pct", text="涨跌幅(%)")
+        # 设置列标题（点击排序）
+        self.monitor_tree.heading("symbol", text="标的", command=lambda: self.sort_monitor("symbol"))
+        self.monitor_tree.heading("price", text="价格", command=lambda: self.sort_monitor("price"))
+        self.monitor_tree.heading("change", text="涨跌额", command=lambda: self.sort_monitor("change"))
+        self.monitor_tree.heading("change_pct", text="涨跌幅(%)", command=lambda: self.sort_monitor("change_pct"))
         
         # 设置列宽
         self.monitor_tree.column("symbol", width=80)
@@ -1093,8 +1123,12 @@ class InvestmentPortfolioApp:
         
         # 双击选择股票
         self.monitor_tree.bind("<Double-1>", self.on_monitor_item_double_click)
+        # 滚轮和窗口大小变化只改变可见窗口
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.monitor_tree.bind(sequence, self.on_monitor_wheel)
+        tree_frame.bind("<Configure>", self.on_monitor_resize)
         
-        self.monitor_tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.monitor_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         
         # 初始化股票列表
         self.init_stock_list()
@@ -1120,23 +1154,25 @@ class InvestmentPortfolioApp:
         period = self.time_period.get()
         
         try:
-            # 获取股票数据
+            # 获取股票数据（当前查看的图表优先于后台刷新）
+            def download(period, interval):
+                return get_provider().download(symbol, period, interval, priority=INTERACTIVE)
             if period == "1D":
-                df = yf.download(symbol, period="1d", interval="5m")
+                df = download(period="1d", interval="5m")
             elif period == "5D":
-                df = yf.download(symbol, period="5d", interval="30m")
+                df = download(period="5d", interval="30m")
             elif period == "1M":
-                df = yf.download(symbol, period="1mo", interval="1d")
+                df = download(period="1mo", interval="1d")
             elif period == "3M":
-                df = yf.download(symbol, period="3mo", interval="1d")
+                df = download(period="3mo", interval="1d")
             elif period == "6M":
-                df = yf.download(symbol, period="6mo", interval="1d")
+                df = download(period="6mo", interval="1d")
             elif period == "YTD":
-                df = yf.download(symbol, period="ytd", interval="1d")
+                df = download(period="ytd", interval="1d")
             elif period == "1Y":
-                df = yf.download(symbol, period="1y", interval="1d")
+                df = download(period="1y", interval="1d")
             elif period == "5Y":
-                df = yf.download(symbol, period="5y", interval="1wk")
+                df = download(period="5y", interval="1wk")
             
             if df.empty:
                 raise Exception("没有数据")
@@ -1173,7 +1209,7 @@ class InvestmentPortfolioApp:
             ttk.Label(price_frame, text="Real Time", font=("SimHei", 10, "italic")).pack(side=tk.LEFT, padx=10)
             
             # 创建K线图
-            fig = Figure(figsize=(8, 5), dpi=100)
+            fig = mpl_figure.Figure(figsize=(8, 5), dpi=100)
             ax = fig.add_subplot(111)
             
             ax.plot(df.index, df['Close'], 'b-', linewidth=2)
@@ -1187,7 +1223,7 @@ class InvestmentPortfolioApp:
             # 添加网格
             ax.grid(True, linestyle='--', alpha=0.7)
             
-            canvas = FigureCanvasTkAgg(fig, master=self.chart_frame)
+            canvas = backend_tkagg.FigureCanvasTkAgg(fig, master=self.chart_frame)
             canvas.draw()
             canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True, pady=5)
             
@@ -1210,58 +1246,146 @@ class InvestmentPortfolioApp:
             self.monitor_portfolio.current(0)
     
     def update_monitor(self):
-        """更新监控列表"""
-        # 清空现有内容
-        for item in self.monitor_tree.get_children():
-            self.monitor_tree.delete(item)
-        
+        """更新监控列表：标的立即显示，行情在后台线程加载（可见的行优先）"""
         selected_portfolio = self.monitor_portfolio.get()
         
         # 确定要显示的标的
         if selected_portfolio == "所有标的" or not self.portfolios:
             # 显示预设的标的列表
             symbols = ["AAPL", "MSFT", "NVDA", "GOOGL", "AMZN", "TSLA", "SPY", "BTC-USD", "AMD"]
+            weights = {}
         else:
             # 显示选中投资组合的标的
-            symbols = list(self.portfolios[selected_portfolio]["holdings"].keys())
-        
-        # 获取并显示每个标的的信息
-        for symbol in symbols:
+            holdings = self.portfolios[selected_portfolio]["holdings"]
+            symbols = list(holdings.keys())
+            weights = {s: h.get("weight") for s, h in holdings.items()}
+        
+        self.monitor_watchlist = watchlist.Watchlist(symbols, weights)
+        self.refresh_monitor_view()
+        
+        # 旧的加载线程看到编号变化后自行退出
+        self.monitor_generation += 1
+        quotes = queue.Queue()
+        threading.Thread(
+            target=self._load_monitor_quotes,
+            args=(list(self.monitor_watchlist.symbols), self.monitor_generation, quotes),
+            daemon=True
+        ).start()
+        self.root.after(200, self._poll_monitor, self.monitor_generation, quotes)
+    
+    def _fetch_monitor_quote(self, symbol):
+        """(最新价, 前收盘价)"""
+        hist = get_provider().history(symbol, "1d", priority=BACKGROUND)
+        if hist.empty:
+            # 如果没有当日数据，尝试获取最新信息
+            info = get_provider().info(symbol, priority=BACKGROUND)
+            last_price = info.get('regularMarketPrice', 0)
+            return last_price, info.get('regularMarketPreviousClose', last_price)
+        last_price = hist['Close'].iloc[-1]
+        return last_price, hist['Close'].iloc[0] if len(hist) > 1 else last_price
+    
+    def _load_monitor_quotes(self, symbols, generation, quotes):
+        """后台线程：不碰 Tk 和 watchlist，行情放入 quotes 队列，由 _poll_monitor 在主线程写入"""
+        remaining = dict.fromkeys(symbols)
+        while remaining and generation == self.monitor_generation:
+            visible = [s for s in self.monitor_visible_symbols if s in remaining]
+            symbol = visible[0] if visible else next(iter(remaining))
+            del remaining[symbol]
             try:
-                # 获取最新数据
-                ticker = yf.Ticker(symbol)
-                hist = ticker.history(period="1d")
-                
-                if hist.empty:
-                    # 如果没有当日数据，尝试获取最新信息
-                    info = ticker.info
-                    last_price = info.get('regularMarketPrice', 0)
-                    prev_close = info.get('regularMarketPreviousClose', last_price)
-                else:
-                    last_price = hist['Close'].iloc[-1]
-                    prev_close = hist['Close'].iloc[0] if len(hist) > 1 else last_price
-                
-                change = last_price - prev_close
-                change_pct = (change / prev_close) * 100 if prev_close != 0 else 0
-                
-                # 添加到表格
-                self.monitor_tree.insert(
-                    "", 
-                    tk.END, 
-                    values=(
-                        symbol, 
-                        f"${last_price:.2f}", 
-                        f"{change:+.2f}", 
-                        f"{change_pct:+.2f}%"
-                    )
-                )
-            except:
+                last_price, prev_close = self._fetch_monitor_quote(symbol)
+                quotes.put((symbol, float(last_price), float(prev_close) or None))
+            except Exception:
                 # 如果获取失败，显示占位符
-                self.monitor_tree.insert(
-                    "", 
-                    tk.END, 
-                    values=(symbol, "N/A", "N/A", "N/A")
-                )
+                quotes.put((symbol, None, None))
+        quotes.put(None)  # 加载结束
+    
+    def _poll_monitor(self, generation, quotes):
+        """主线程：取出队列中的行情写入 watchlist 并刷新可见的行"""
+        if generation != self.monitor_generation:
+            return
+        done = False
+        while True:
+            try:
+                quote = quotes.get_nowait()
+            except queue.Empty:
+                break
+            if quote is None:
+                done = True
+                break
+            self.monitor_watchlist.set_quote(*quote)
+        if done:
+            # 行情加载完后按当前排序重排一次
+            self.refresh_monitor_view(keep_position=True)
+        else:
+            self.render_monitor()
+            self.root.after(200, self._poll_monitor, generation, quotes)
+    
+    def monitor_visible_rows(self):
+        return max(1, int(self.monitor_tree.cget("height")))
+    
+    def refresh_monitor_view(self, keep_position=False):
+        """重新筛选、排序后回到顶部"""
+        if self.monitor_watchlist is None:
+            return
+        column, descending = self.monitor_sort
+        self.monitor_watchlist.update(self.monitor_filter.get(), column, descending)
+        if not keep_position:
+            self.monitor_first = 0
+        self.render_monitor()
+    
+    def render_monitor(self):
+        """只刷新可见的行：复用已有的行，耗时与列表长度无关"""
+        watch = self.monitor_watchlist
+        total = len(watch) if watch is not None else 0
+        visible = self.monitor_visible_rows()
+        self.monitor_first = max(0, min(self.monitor_first, total - visible))
+        rows = watch.rows(self.monitor_first, visible) if total else []
+        self.monitor_visible_symbols = tuple(row[0] for row in rows)
+        items = self.monitor_tree.get_children()
+        for item in items[len(rows):]:
+            self.monitor_tree.delete(item)
+        for _ in range(len(items), len(rows)):
+            self.monitor_tree.insert("", tk.END)
+        for item, (symbol, _, price, change, change_pct, failed) in zip(self.monitor_tree.get_children(), rows):
+            if failed:
+                values = (symbol, "N/A", "N/A", "N/A")
+            elif price != price:
+                values = (symbol, "...", "", "")
+            else:
+                values = (symbol, f"${price:.2f}", f"{change:+.2f}", f"{change_pct:+.2f}%")
+            self.monitor_tree.item(item, values=values)
+        if total:
+            self.monitor_scroll.set(self.monitor_first / total, (self.monitor_first + len(rows)) / total)
+        else:
+            self.monitor_scroll.set(0, 1)
+    
+    def scroll_monitor(self, action, amount, unit=None):
+        """滚动条回调: ("moveto", 比例) 或 ("scroll", 步数, "units"/"pages")"""
+        total = len(self.monitor_watchlist) if self.monitor_watchlist is not None else 0
+        if action == "moveto":
+            self.monitor_first = int(float(amount) * total)
+        else:
+            step = self.monitor_visible_rows() if unit == "pages" else 1
+            self.monitor_first += int(amount) * step
+        self.render_monitor()
+    
+    def on_monitor_wheel(self, event):
+        steps = -3 if event.num == 4 or event.delta > 0 else 3
+        self.scroll_monitor("scroll", steps, "units")
+        return "break"
+    
+    def on_monitor_resize(self, event):
+        # 按区域高度调整可见行数（默认行高约 20 像素，表头约 25 像素）
+        rows = max(1, (event.height - 25) // 20)
+        if rows != self.monitor_visible_rows():
+            self.monitor_tree.configure(height=rows)
+            self.render_monitor()
+    
+    def sort_monitor(self, column):
+        """点击列标题排序，再次点击反向"""
+        current, descending = self.monitor_sort
+        self.monitor_sort = (column, not descending if column == current else False)
+        self.refresh_monitor_view()
     
     def on_monitor_item_double_click(self, event):
         """双击监控列表中的项目，切换到该股票"""
@@ -1364,9 +1488,7 @@ class InvestmentPortfolioApp:
 
 if __name__ == "__main__":
     # 提示用户安装依赖
-    try:
-        import requests
-    except ImportError:
+    if importlib.util.find_spec("requests") is None:
         print("请先安装requests库：pip install requests")
         exit()
     
@@ -0,0 +1,204 @@
+"""Off-hours batch warmer for the local market data and news stores.
+
+Enumerates the symbols of every saved portfolio (data/portfolios.json, all
+owners) and fetches what the apps ask for on a portfolio's first view:
+
+    info          fundamentals for every holding         -> data/cache
+    history       the one-year daily bars behind the     -> data/cache
+                  risk figures (the app's and
+                  report_portfolios.py's)
+    news          every portfolio's World News search    -> data/news.db
+                  and its holdings' ticker.news
+
+Responses go to the cache the apps read in live mode
+(data_provider.CachedProvider, data/cache). Only those the cache keeps for at
+least MIN_HOURS are fetched (see data_provider.CACHE_MAX_AGE and
+PORTFOLIO_CACHE_MAX_AGE). News is ingested into the news store
+(news_ingest.refresh_news), which keeps articles indefinitely: the news tab
+lists them from there, and its first sync only asks for what was published
+since the warm run.
+
+Not warmed: quotes and the 1mo / 5d charts. The cache serves them for
+minutes, so they are fetched on the first view whatever runs at night.
+
+Requests run in parallel on a thread pool but go through the process-wide
+rate limiters at BACKGROUND priority, so the upstream quotas are respected.
+
+The run is resumable: a response cached (or a portfolio's news synced)
+within --fresh-hours is skipped, so an interrupted run picks up where it
+stopped.
+
+Usage:
+    python warm_cache.py                      # warm everything
+    python warm_cache.py --workers 8 --fresh-hours 2
+    python warm_cache.py --dry-run            # list what would be fetched
+
+Nightly, e.g. from cron:
+    30 2 * * *  cd /path/to/app && python warm_cache.py >> data/warm_cache.log 2>&1
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from data_provider import (
+    CACHE_DIR, FixtureStore, LiveProvider, RecordingProvider, cache_max_age, fixture_key, news_query,
+    parse_max_age
+)
+from news_ingest import ingest, refresh_news, ticker_news_source
+from news_store import get_news_store
+from portfolio_analytics import RISK_PERIOD
+from portfolio_store import get_portfolio_store
+from rate_limit import BACKGROUND
+
+# Symbols streamlit_app.py shows before any portfolio is selected
+APP_DEFAULT_SYMBOLS = ["AAPL", "MSFT", "NVDA", "SPY", "BTC-USD"]
+APP_DEFAULT_NEWS_SYMBOLS = ["AAPL", "MSFT", "NVDA"]
+# Stock Analysis default period, the Portfolio Asset Monitoring window and
+# the history behind the risk figures
+DEFAULT_PERIODS = ("1mo", "5d", RISK_PERIOD)
+# Responses the cache serves for less time than this are not warmed
+MIN_HOURS = 12
+
+
+def plan(portfolios, extra_symbols=(), periods=DEFAULT_PERIODS, max_age=None):
+    """[(kind, key, method name, args)] for every request to warm, deduplicated.
+
+    Kinds (and history periods) cached for less than MIN_HOURS under
+    max_age ({kind: hours}, PORTFOLIO_CACHE_MAX_AGE by default) are left out.
+    News tasks are ("news", query, "news", (holdings,)), one per distinct
+    portfolio query.
+    """
+    max_age = parse_max_age(os.environ.get("PORTFOLIO_CACHE_MAX_AGE")) if max_age is None else max_age
+    lasts = lambda kind, period=None: cache_max_age(max_age, kind, period) >= MIN_HOURS
+    symbols = list(dict.fromkeys(
+        [s for p in portfolios for s in p.get("holdings", [])] + APP_DEFAULT_SYMBOLS + list(extra_symbols)
+    ))
+    tasks = []
+    for symbol in symbols:
+        if lasts("info"):
+            tasks.append(("info", fixture_key("info", symbol), "info", (symbol,)))
+        for period in periods:
+            if lasts("history", period):
+                tasks.append(("history", fixture_key("history", symbol, period, "1d"), "history", (symbol, period, "1d")))
+    seen = set()
+    for holdings in [list(p.get("holdings", [])) for p in portfolios] + [APP_DEFAULT_NEWS_SYMBOLS]:
+        query = news_query(holdings)
+        if holdings and query not in seen:
+            seen.add(query)
+            tasks.append(("news", query, "news", (holdings,)))
+    return tasks
+
+
+def sync_news(news_store, holdings, live, read, lock):
+    """Ingest a portfolio's new World News articles, and the ticker.news of
+    its holdings not read yet in this run (read, guarded by lock)"""
+    refresh_news(
+        news_store, holdings,
+        search=lambda params: live.news("search-news", params, priority=BACKGROUND), ticker_news=None
+    )
+    with lock:
+        due = [s for s in dict.fromkeys(holdings) if s not in read]
+        read.update(due)
+    fetch = lambda symbol: live.ticker_news(symbol, priority=BACKGROUND)
+    ingest([ticker_news_source(s, fetch, required=False) for s in due], news_store, holdings,
+           news_query(holdings))
+
+
+class Progress:
+    """Thread-safe counters printed as one line per finished request"""
+
+    def __init__(self, total, out=sys.stdout):
+        self.total = total
+        self.out = out
+        self.done = 0
+        self.counts = {"fetched": 0, "skipped": 0, "failed": 0}
+        self.start = time.monotonic()
+        self._lock = threading.Lock()
+
+    def update(self, outcome, kind, args, detail=""):
+        with self._lock:
+            self.done += 1
+            self.counts[outcome] += 1
+            if outcome != "skipped":
+                elapsed = time.monotonic() - self.start
+                label = news_query(args[0])[:40] if kind == "news" else " ".join(args[:2])
+                print(f"[{self.done}/{self.total} {elapsed:6.1f}s] {outcome:<7} {kind:<11} {label} {detail}".rstrip(),
+                      file=self.out, flush=True)
+
+    def summary(self):
+        elapsed = time.monotonic() - self.start
+        c = self.counts
+        return f"{self.done}/{self.total} requests in {elapsed:.1f}s: {c['fetched']} fetched, {c['skipped']} already fresh, {c['failed']} failed"
+
+
+def warm(tasks, provider, store, fresh_seconds, workers, progress, news_store=None):
+    """Fetch every task not cached (or synced) within fresh_seconds; returns the failures"""
+    failures = []
+    news_store = news_store or get_news_store()
+    read, read_lock = set(), threading.Lock()
+
+    def run(task):
+        kind, key, method, args = task
+        saved = news_store.synced_at(key) if kind == "news" else store.recorded_at(kind, key)
+        if saved is not None and time.time() - saved <= fresh_seconds:
+            progress.update("skipped", kind, args)
+            return
+        try:
+            if kind == "news":
+                sync_news(news_store, args[0], provider.live, read, read_lock)
+            else:
+                getattr(provider, method)(*args, priority=BACKGROUND)
+        except Exception as e:
+            failures.append((task, e))
+            progress.update("failed", kind, args, f"({type(e).__name__}: {e})")
+            return
+        progress.update("fetched", kind, args)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run, task) for task in tasks]
+        try:
+            for future in as_completed(futures):
+                future.result()
+        except KeyboardInterrupt:
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--fresh-hours", type=float, default=12.0,
+                        help="skip responses cached (and news synced) more recently than this")
+    parser.add_argument("--periods", nargs="+", default=list(DEFAULT_PERIODS),
+                        help=f"daily history periods to fetch (only those cached for at least {MIN_HOURS}h are)")
+    parser.add_argument("--symbols", nargs="*", default=[], help="extra symbols to warm")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args(argv)
+
+    portfolios = get_portfolio_store().load()
+    tasks = plan(portfolios, args.symbols, args.periods)
+    print(f"{len(portfolios)} saved portfolios, {len(tasks)} requests to warm into {args.cache_dir}", flush=True)
+    if args.dry_run:
+        for kind, _, _, task_args in tasks:
+            print(f"  {kind:<11} {task_args[0] if kind != 'news' else news_query(task_args[0])}")
+        return 0
+
+    store = FixtureStore(args.cache_dir)
+    provider = RecordingProvider(store, LiveProvider())
+    progress = Progress(len(tasks))
+    try:
+        failures = warm(tasks, provider, store, args.fresh_hours * 3600, args.workers, progress)
+    except KeyboardInterrupt:
+        print(f"Interrupted: {progress.summary()}. Run again to resume.")
+        return 130
+    print(progress.summary())
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
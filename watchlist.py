@@ -0,0 +1,96 @@
+"""Watchlist rows kept in arrays, for views that only show a window of them.
+
+Symbols, weights and quotes live in NumPy arrays. Filtering and sorting
+produce one index array (the view) and a widget asks only for the rows it
+shows, rows(start, count), so drawing or scrolling costs the same for 10 or
+10,000 symbols. Re-sorting is a single argsort over the backing arrays.
+Quotes may arrive later, from another thread, through set_quote();
+rows without one yet sort last.
+"""
+from lazy_import import lazy_module
+
+np = lazy_module("numpy")
+
+COLUMNS = ("symbol", "weight", "price", "change", "change_pct")
+
+
+class Watchlist:
+    """Symbols with their latest quote, filtered and sorted into a view"""
+
+    def __init__(self, symbols, weights=None):
+        self.symbols = list(dict.fromkeys(symbols))
+        n = len(self.symbols)
+        self._index = dict(zip(self.symbols, range(n)))
+        self._names = np.array([s.upper() for s in self.symbols], dtype=str) if n else np.zeros(0, dtype=str)
+        self.weight = np.array([(weights or {}).get(s, np.nan) for s in self.symbols], dtype=np.float64)
+        self.price = np.full(n, np.nan)
+        self.prev_close = np.full(n, np.nan)
+        self.failed = np.zeros(n, dtype=bool)
+        self._text = ""
+        self._order = ("symbol", False)
+        self.view = np.arange(n)
+
+    def __len__(self):
+        return len(self.view)
+
+    @property
+    def change(self):
+        return self.price - self.prev_close
+
+    @property
+    def change_pct(self):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return (self.price / self.prev_close - 1) * 100
+
+    def set_quote(self, symbol, price, prev_close=None):
+        i = self._index.get(symbol)
+        if i is None:
+            return
+        if price is None:
+            self.failed[i] = True
+            return
+        self.price[i] = price
+        self.prev_close[i] = price if prev_close is None else prev_close
+        self.failed[i] = False
+
+    def has_quote(self, symbol):
+        i = self._index.get(symbol)
+        return i is not None and not np.isnan(self.price[i])
+
+    def update(self, text=None, column=None, descending=None):
+        """Re-filter and re-sort; arguments left as None keep their last value"""
+        self._text = self._text if text is None else text.strip().upper()
+        column = self._order[0] if column is None else column
+        descending = self._order[1] if descending is None else descending
+        self._order = (column, descending)
+        if column == "symbol":
+            order = np.argsort(self._names, kind="stable")
+            if descending:
+                order = order[::-1]
+        else:
+            keys = getattr(self, column)
+            # Negating keeps NaN (no quote yet) last in both directions
+            order = np.argsort(-keys if descending else keys, kind="stable")
+        if self._text:
+            order = order[np.char.find(self._names[order], self._text) >= 0]
+        self.view = order
+        return len(order)
+
+    def window(self, start, count):
+        """Backing-array indices of the view rows start .. start + count"""
+        start = max(0, start)
+        return self.view[start:start + count]
+
+    def symbols_at(self, start, count):
+        return [self.symbols[i] for i in self.window(start, count).tolist()]
+
+    def rows(self, start, count):
+        """[(symbol, weight, price, change, change_pct, failed)] for the visible rows only"""
+        rows = self.window(start, count)
+        price, prev_close = self.price[rows], self.prev_close[rows]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            change_pct = (price / prev_close - 1) * 100
+        return list(zip(
+            [self.symbols[i] for i in rows.tolist()], self.weight[rows].tolist(), price.tolist(),
+            (price - prev_close).tolist(), change_pct.tolist(), self.failed[rows].tolist()
+        ))